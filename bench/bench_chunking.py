@@ -0,0 +1,98 @@
+# bench/bench_chunking.py
+#
+# chunks.json 규모의 마크다운 코퍼스로 청커의 처리량과 청크 크기 분포를 측정합니다.
+# 릴리스 간 비교를 위해 --output으로 결과를 JSON 파일로 저장할 수 있습니다.
+# 사용법: python bench/bench_chunking.py [--scales 1,4,16] [--repeat 3] [--output chunking_bench.json]
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+# lambda/의 모듈은 Lambda 배포 패키지처럼 평면 구조로 서로 임포트하므로 경로에 추가합니다. (bench/는 배포 패키지에 포함하지 않음)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "lambda"))
+
+from chunker import MAX_CHUNK_SIZE, chunk_pages
+
+CHUNKS_JSON_PATH = os.path.join(os.path.dirname(__file__), "..", "chunks.json")
+PAGES_PER_CORPUS_CHUNK = 3  # chunks.json의 청크 몇 개를 한 페이지로 묶을지
+
+
+def build_corpus(scale: int):
+    """chunks.json의 청크를 페이지 단위로 묶고 scale배로 반복하여 페이지 청크 목록을 만듭니다."""
+    with open(CHUNKS_JSON_PATH, encoding='utf-8') as f:
+        chunks = json.load(f)
+    pages = []
+    for _ in range(scale):
+        for i in range(0, len(chunks), PAGES_PER_CORPUS_CHUNK):
+            text = "\n\n".join(chunks[i:i + PAGES_PER_CORPUS_CHUNK])
+            pages.append({"metadata": {"page_number": len(pages) + 1}, "text": text})
+    return pages
+
+
+def percentile(sorted_values, q: float):
+    index = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run(pages, repeat: int, **chunk_kwargs):
+    corpus_bytes = sum(len(page["text"].encode('utf-8')) for page in pages)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        chunks = list(chunk_pages(pages, **chunk_kwargs))
+        timings.append(time.perf_counter() - start)
+    best = min(timings)
+    sizes = sorted(len(chunk.text) for chunk in chunks)
+    return {
+        "settings": chunk_kwargs,
+        "pages": len(pages),
+        "corpus_mb": round(corpus_bytes / 1e6, 3),
+        "chunks": len(chunks),
+        "seconds": round(best, 4),
+        "mb_per_sec": round(corpus_bytes / 1e6 / best, 2),
+        "chunks_per_sec": round(len(chunks) / best, 1),
+        "chunk_chars": {
+            "min": sizes[0],
+            "p50": percentile(sizes, 0.5),
+            "p90": percentile(sizes, 0.9),
+            "max": sizes[-1],
+            "mean": round(statistics.mean(sizes), 1),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark markdown chunking throughput and chunk size distribution.")
+    parser.add_argument("--scales", default="1,4,16", help="Corpus size multipliers of chunks.json.")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="Write results as JSON to this file.")
+    args = parser.parse_args()
+
+    settings = [
+        {"max_size": MAX_CHUNK_SIZE, "unit": "chars"},
+        {"max_size": 256, "unit": "tokens", "overlap": 32},
+    ]
+    results = []
+    for scale in [int(s) for s in args.scales.split(",")]:
+        pages = build_corpus(scale)
+        for chunk_kwargs in settings:
+            result = run(pages, args.repeat, **chunk_kwargs)
+            result["scale"] = scale
+            results.append(result)
+            dist = result["chunk_chars"]
+            print(f"scale={scale:<3} {chunk_kwargs['unit']:>6}/{chunk_kwargs['max_size']:<5} "
+                  f"{result['corpus_mb']:>7.2f} MB {result['chunks']:>7} chunks "
+                  f"{result['mb_per_sec']:>7.2f} MB/s {result['chunks_per_sec']:>10.1f} chunks/s | "
+                  f"chars min/p50/p90/max {dist['min']}/{dist['p50']}/{dist['p90']}/{dist['max']}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# bench/bench_context_packing.py
+#
+# 프롬프트 컨텍스트 구성 방식별 토큰 수와 정답 청크 포함률을 오프라인으로 비교합니다.
+#   - top3: 이전 방식. 검색 상위 3개 청크를 그대로 사용
+#   - packed: 상위 CONTEXT_CANDIDATES개 후보를 ContextPacker로 중복 제거/MMR 선택/인접 청크 병합하여 토큰 예산 안에서 사용
+# 질의와 정답은 bench_retrieval.py와 같은 방식(identifier, passage)으로 만들고, 검색은 로컬 검색 엔진으로 수행합니다.
+# 사용법:
+#   python bench/bench_context_packing.py
+#   python bench/bench_context_packing.py --bedrock --cache /tmp/emb.sqlite3 --budgets 800,1200,1600 --output packing.json
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+
+# lambda/의 모듈은 Lambda 배포 패키지처럼 평면 구조로 서로 임포트하므로 경로에 추가합니다. (bench/는 배포 패키지에 포함하지 않음)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "lambda"))
+
+from bench_retrieval import CHUNKS_JSON_PATH, CORPUS_SOURCE, identifier_queries, passage_queries
+from bench_vector_compression import embed_all
+from chunker import approximate_token_count
+from context_packer import DEFAULT_MMR_LAMBDA, ContextPacker
+from fake_bedrock import FakeBedrockRuntime
+from local_retriever import LocalVectorRetriever, load_documents
+from vector_format import VectorConfig
+
+BASELINE_TOP_K = 3
+
+
+def evaluate(queries, query_vectors, retriever, candidates: int, packer=None):
+    tokens, covered = [], []
+    for query, query_vector in zip(queries, query_vectors):
+        if packer is None:
+            chunks = retriever.search(query_vector, BASELINE_TOP_K)
+            texts = [chunk['text'] for chunk in chunks]
+            chunk_ids = {chunk['chunk_id'] for chunk in chunks}
+        else:
+            documents, _ = packer.pack(retriever.search(query_vector, candidates))
+            texts = [document.text for document in documents]
+            chunk_ids = {chunk_id for document in documents for chunk_id in document.chunk_ids}
+        tokens.append(sum(approximate_token_count(text) for text in texts))
+        covered.append(bool(chunk_ids & set(query["relevant"])))
+    return {
+        "context_tokens_p50": statistics.median(tokens),
+        "context_tokens_max": max(tokens),
+        "relevant_chunk_included": round(sum(covered) / len(covered), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare prompt context size and coverage of top-3 vs packed context.")
+    parser.add_argument("--model", default="amazon.titan-embed-text-v2:0")
+    parser.add_argument("--dimension", type=int, default=1024)
+    parser.add_argument("--candidates", type=int, default=8, help="Search hits passed to the packer (CONTEXT_CANDIDATES).")
+    parser.add_argument("--budgets", default="700,1200", help="Comma-separated token budgets (CONTEXT_TOKEN_BUDGET).")
+    parser.add_argument("--mmr-lambda", type=float, default=DEFAULT_MMR_LAMBDA)
+    parser.add_argument("--num-queries", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--bedrock", action="store_true", help="Call the real Bedrock runtime instead of the local fake.")
+    parser.add_argument("--cache", help="SQLite embedding cache path to avoid re-embedding between runs.")
+    parser.add_argument("--max-in-flight", type=int, default=8)
+    parser.add_argument("--output", help="Write results as JSON to this file.")
+    args = parser.parse_args()
+
+    if args.bedrock:
+        import boto3
+        client = boto3.client('bedrock-runtime')
+    else:
+        client = FakeBedrockRuntime(latency=0, capacity=1_000_000, dimension=args.dimension, semantic=True)
+    config = VectorConfig(args.model, args.dimension)
+
+    documents = load_documents(CHUNKS_JSON_PATH, CORPUS_SOURCE)
+    corpus = [doc["text"] for doc in documents]
+    rng = random.Random(args.seed)
+    query_sets = {
+        "identifier": identifier_queries(corpus, args.num_queries, rng),
+        "passage": passage_queries(corpus, args.num_queries, rng),
+    }
+    retriever = LocalVectorRetriever(documents, embed_all(client, config, corpus, args.cache, args.max_in_flight))
+    print(f"Corpus: {len(corpus)} chunks, candidates={args.candidates}, "
+          f"model={args.model}{'' if args.bedrock else ' (fake)'}")
+
+    configurations = {"top3": None}
+    for budget in args.budgets.split(","):
+        configurations[f"packed@{budget}"] = ContextPacker(token_budget=int(budget), mmr_lambda=args.mmr_lambda)
+    results = {}
+    for name, queries in query_sets.items():
+        query_vectors = embed_all(client, config, [query["query"] for query in queries], args.cache,
+                                  args.max_in_flight)
+        for label, packer in configurations.items():
+            results[f"{name}/{label}"] = evaluate(queries, query_vectors, retriever, args.candidates, packer)
+
+    print(f"{'query set/context':>24} | {'tokens p50':>10} | {'tokens max':>10} | {'relevant included':>17}")
+    for label, result in results.items():
+        print(f"{label:>24} | {result['context_tokens_p50']:>10} | {result['context_tokens_max']:>10} | "
+              f"{result['relevant_chunk_included']:>17.3f}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# bench/bench_embedding.py
+#
+# 로컬 가짜 Bedrock 클라이언트를 대상으로 EmbeddingExecutor의 처리량(chunks/sec)을 측정합니다.
+# 사용법: python bench/bench_embedding.py [--chunks 200] [--latency 0.05] [--capacity 16] [--concurrency 1,4,8,16,32]
+
+import argparse
+import json
+import os
+import sys
+import time
+
+# lambda/의 모듈은 Lambda 배포 패키지처럼 평면 구조로 서로 임포트하므로 경로에 추가합니다. (bench/는 배포 패키지에 포함하지 않음)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "lambda"))
+
+from embedding_engine import EmbeddingExecutor
+from fake_bedrock import FakeBedrockRuntime
+
+CHUNKS_JSON_PATH = os.path.join(os.path.dirname(__file__), "..", "chunks.json")
+
+
+def load_chunks(limit: int):
+    """chunks.json이 있으면 실제 청크를, 없으면 더미 텍스트를 사용합니다."""
+    if os.path.exists(CHUNKS_JSON_PATH):
+        with open(CHUNKS_JSON_PATH, encoding='utf-8') as f:
+            chunks = json.load(f)
+    else:
+        chunks = [f"dummy chunk {i}" for i in range(limit)]
+    # 요청한 개수만큼 반복하여 채움
+    return [chunks[i % len(chunks)] for i in range(limit)]
+
+
+def run(chunks, concurrency: int, latency: float, capacity: int):
+    client = FakeBedrockRuntime(latency=latency, capacity=capacity)
+
+    def embed(text):
+        response = client.invoke_model(
+            body=json.dumps({"inputText": text}),
+            modelId="amazon.titan-embed-text-v1",
+            accept='application/json',
+            contentType='application/json'
+        )
+        return json.loads(response['body'].read())['embedding']
+
+    executor = EmbeddingExecutor(embed, max_in_flight=concurrency)
+    start = time.perf_counter()
+    results = list(executor.map(chunks))
+    elapsed = time.perf_counter() - start
+
+    # 순서가 보존되었는지 확인
+    assert [item for item, _ in results] == chunks, "Output order does not match input order."
+    return elapsed, client
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark concurrent embedding against a fake Bedrock client.")
+    parser.add_argument("--chunks", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated Bedrock latency per call (seconds).")
+    parser.add_argument("--capacity", type=int, default=16, help="Concurrent requests before throttling.")
+    parser.add_argument("--concurrency", default="1,4,8,16,32")
+    args = parser.parse_args()
+
+    chunks = load_chunks(args.chunks)
+    print(f"{'concurrency':>11} | {'seconds':>8} | {'chunks/sec':>10} | {'calls':>6} | {'throttled':>9}")
+    for concurrency in [int(c) for c in args.concurrency.split(",")]:
+        elapsed, client = run(chunks, concurrency, args.latency, args.capacity)
+        print(f"{concurrency:>11} | {elapsed:>8.2f} | {len(chunks) / elapsed:>10.1f} | {client.calls:>6} | {client.throttled:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+# bench/bench_pipeline.py
+#
+# docs/test_scenario.md의 테스트 질문을 가짜 Bedrock/OpenSearch를 대상으로 동시에 반복 실행하여
+# 파이프라인의 처리량과 꼬리 지연 시간을 오프라인으로 측정합니다.
+#   - target=handler: lambda_handler (버퍼링 응답, 배포 경로와 같음)
+#   - target=app: 컴파일된 LangGraph 앱(get_app().invoke)을 직접 실행
+# 노드/외부 호출별 지연 시간은 tracing의 InMemorySink에 기록된 span으로 집계하며, 질의당 LLM 호출 수도 함께 셉니다.
+# 가짜 백엔드의 지연 시간은 분포로 지정합니다: 0.05(고정), uniform:0.02,0.08, lognormal:0.05,0.4(중앙값, sigma),
+# exponential:0.05(평균). Bedrock 동시 처리 한도(--bedrock-capacity)를 넘는 요청은 ThrottlingException을 받습니다.
+# LLM 라우터는 시나리오 유형에 따라 정해진 분류(JSON)를 반환합니다. (보안/견고성 질문은 general_chat, 나머지는 manual_query)
+# 결과는 릴리스 간 비교를 위해 JSON 파일로 저장할 수 있습니다.
+# 사용법:
+#   python bench/bench_pipeline.py
+#   python bench/bench_pipeline.py --concurrency 8 --repeats 20 --llm-first-token lognormal:0.6,0.4 --output pipeline.json
+#   python bench/bench_pipeline.py --baseline pipeline.json     # 이전 결과와 종단 간 지연/처리량 비교
+
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import random
+import re
+import subprocess
+import sys
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+# lambda/의 모듈은 Lambda 배포 패키지처럼 평면 구조로 서로 임포트하므로 경로에 추가합니다. (bench/는 배포 패키지에 포함하지 않음)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "lambda"))
+
+# query_pipeline 임포트 전에 필요한 환경 변수 (로컬 실행용 기본값)
+os.environ.setdefault('OPENSEARCH_HOST', 'localhost')
+os.environ.setdefault('OPENSEARCH_INDEX', 'bench')
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ['ANSWER_CACHE_BACKEND'] = 'none'  # 반복 질문도 실제로 답변을 생성하도록 캐시 사용 안 함
+os.environ.setdefault('QUERY_EMBEDDING_CACHE_SIZE', '0')  # 반복 질문의 임베딩도 매번 계산
+os.environ['TRACE_SINK'] = 'memory'
+
+import query_pipeline
+import templates
+import tracing
+from fake_bedrock import DEFAULT_LLM_ANSWER, FakeBedrockRuntime
+from fake_opensearch import FakeOpenSearch, load_sample_documents
+from manual_catalog import CatalogSnapshot, ManualEntry, ManualCatalog, generate_aliases
+
+SCENARIO_PATH = os.path.join(os.path.dirname(__file__), "..", "docs", "test_scenario.md")
+SCENARIO_ROW_PATTERN = re.compile(r"^\|\s*\*\*(?P<id>[A-Z0-9-]+)\*\*\s*\|(?P<type>[^|]*)\|(?P<query>[^|]*)\|")
+QUESTION_PATTERN = re.compile(r"<question>(.*?)</question>", re.DOTALL)
+MANUAL_NAME = "Bobcat-T590-Operating-Manual"
+MANUAL_SOURCE = f"{MANUAL_NAME}.pdf"
+OUT_OF_SCOPE_TYPES = ("보안", "견고성")  # 라우터가 매뉴얼 질문이 아니라고 분류해야 하는 시나리오 유형
+
+
+class _StaticCatalogLoader:
+    def load(self, previous=None):
+        return CatalogSnapshot([ManualEntry(MANUAL_NAME, MANUAL_SOURCE, generate_aliases(MANUAL_NAME), "bench")])
+
+
+def load_scenarios(path: str, mention_manual: bool):
+    """시나리오 표의 각 행을 {'id', 'type', 'query', 'route'}로 읽습니다."""
+    scenarios = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            match = SCENARIO_ROW_PATTERN.match(line)
+            if not match:
+                continue
+            scenario_type = match.group("type").strip()
+            in_scope = not any(keyword in scenario_type for keyword in OUT_OF_SCOPE_TYPES)
+            query = match.group("query").strip()
+            if mention_manual and in_scope:
+                # 매뉴얼 이름을 언급하면 결정적 라우터(fast path)가 LLM 없이 분류
+                query = f"{MANUAL_NAME} {query}"
+            scenarios.append({"id": match.group("id"), "type": scenario_type, "query": query,
+                              "route": "manual_query" if in_scope else "general_chat"})
+    if not scenarios:
+        raise ValueError(f"No scenarios found in {path}.")
+    return scenarios
+
+
+def latency_distribution(spec: str, rng: random.Random):
+    """지연 시간 분포 문자열을 초 단위 숫자 또는 값을 뽑는 함수로 바꿉니다."""
+    kind, _, params = spec.partition(":")
+    if not params:
+        return float(kind)
+    values = [float(value) for value in params.split(",")]
+    if kind == "uniform":
+        low, high = values
+        return lambda: rng.uniform(low, high)
+    if kind == "lognormal":
+        median, sigma = values
+        return lambda: rng.lognormvariate(math.log(median), sigma)
+    if kind == "exponential":
+        mean, = values
+        return lambda: rng.expovariate(1 / mean)
+    raise ValueError(f"Unsupported latency distribution '{spec}'.")
+
+
+def router_responder(scenarios):
+    """라우터 요청에는 시나리오에 정해진 분류를, 답변 생성 요청에는 기본 답변을 반환하는 가짜 LLM 응답 함수입니다."""
+    routes = {scenario["query"]: scenario["route"] for scenario in scenarios}
+
+    def respond(request):
+        system = " ".join(block.get("text", "") for block in request.get("system", []))
+        if templates.ROUTER_SYSTEM_PROMPT not in system:
+            return DEFAULT_LLM_ANSWER
+        match = QUESTION_PATTERN.search(request["messages"][-1]["content"])
+        route = routes.get(match.group(1).strip() if match else None, "general_chat")
+        if route == "manual_query":
+            return json.dumps({"scenario": route, "manual_name": MANUAL_NAME})
+        return json.dumps({"scenario": route})
+    return respond
+
+
+def install_fakes(args, scenarios):
+    rng = random.Random(args.seed)
+    bedrock = FakeBedrockRuntime(
+        latency=latency_distribution(args.embedding_latency, rng),
+        capacity=args.bedrock_capacity,
+        llm_first_token_latency=latency_distribution(args.llm_first_token, rng),
+        llm_token_latency=latency_distribution(args.llm_token, rng),
+        llm_responder=router_responder(scenarios),
+    )
+    opensearch = FakeOpenSearch(load_sample_documents(MANUAL_SOURCE),
+                                latency=latency_distribution(args.search_latency, rng))
+    query_pipeline._resources['bedrock_runtime'] = bedrock
+    query_pipeline._resources['opensearch_client'] = opensearch
+    query_pipeline._resources['manual_discovery'] = ManualCatalog(_StaticCatalogLoader())
+    return bedrock, opensearch
+
+
+def run_request(target: str, query: str, trace_id: str) -> bool:
+    """요청 하나를 실행하고 성공 여부를 반환합니다."""
+    if target == "handler":
+        response = query_pipeline.lambda_handler({"body": json.dumps({"query": query})},
+                                                 SimpleNamespace(aws_request_id=trace_id))
+        return response["statusCode"] == 200
+    with tracing.trace("query", trace_id):
+        try:
+            query_pipeline.get_app().invoke({"query": query})
+        except Exception as e:
+            print(f"Request failed: {e}")
+            return False
+    return True
+
+
+def percentiles(values):
+    """nearest-rank 방식의 p50/p95/p99 (ms)."""
+    if not values:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None, "max_ms": None}
+    ordered = sorted(values)
+
+    def rank(q):
+        return round(ordered[max(0, math.ceil(q * len(ordered)) - 1)], 1)
+    return {"p50_ms": rank(0.50), "p95_ms": rank(0.95), "p99_ms": rank(0.99), "max_ms": round(ordered[-1], 1)}
+
+
+def is_llm_span(span: dict) -> bool:
+    return span["kind"] == "bedrock" and span["name"] != "bedrock.embed"
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def summarize(records, requests, wall_seconds, bedrock):
+    """trace 기록과 요청별 결과로 결과 JSON을 만듭니다."""
+    by_trace = {record["trace_id"]: record for record in records}
+    node_durations = defaultdict(list)
+    for record in records:
+        for span in record["spans"]:
+            node_durations[span["name"]].append(span["duration_ms"])
+    llm_calls = {trace_id: sum(1 for span in record["spans"] if is_llm_span(span))
+                 for trace_id, record in by_trace.items()}
+
+    per_scenario = defaultdict(list)
+    for request in requests:
+        per_scenario[request["scenario"]["id"]].append(request)
+    scenarios = {}
+    for scenario_id, items in per_scenario.items():
+        traced = [by_trace[item["trace_id"]] for item in items if item["trace_id"] in by_trace]
+        scenarios[scenario_id] = {
+            "type": items[0]["scenario"]["type"],
+            "requests": len(items),
+            "errors": sum(1 for item in items if not item["ok"]),
+            "routed_to": sorted({record.get("scenario") or "error" for record in traced}),
+            "end_to_end": percentiles([item["latency_ms"] for item in items]),
+            "llm_calls_per_query": round(sum(llm_calls.get(item["trace_id"], 0) for item in items) / len(items), 2),
+        }
+
+    latencies = [request["latency_ms"] for request in requests]
+    calls = [llm_calls.get(request["trace_id"], 0) for request in requests]
+    return {
+        "requests": len(requests),
+        "errors": sum(1 for request in requests if not request["ok"]),
+        "bedrock_throttled": bedrock.throttled,
+        "wall_seconds": round(wall_seconds, 3),
+        "requests_per_second": round(len(requests) / wall_seconds, 2) if wall_seconds else None,
+        "end_to_end": percentiles(latencies),
+        "llm_calls_per_query": {"mean": round(sum(calls) / len(calls), 2), "max": max(calls)},
+        "nodes": {name: {"count": len(values), **percentiles(values)}
+                  for name, values in sorted(node_durations.items())},
+        "scenarios": scenarios,
+    }
+
+
+def print_report(result):
+    print(f"{result['requests']} requests, {result['errors']} errors, {result['bedrock_throttled']} throttled, "
+          f"{result['requests_per_second']} req/s, LLM calls/query {result['llm_calls_per_query']['mean']}")
+    print(f"{'span':>28} | {'count':>5} | {'p50 ms':>8} | {'p95 ms':>8} | {'p99 ms':>8}")
+    rows = [("end_to_end", {"count": result["requests"], **result["end_to_end"]})] + list(result["nodes"].items())
+    for name, stats in rows:
+        print(f"{name:>28} | {stats['count']:>5} | {stats['p50_ms']:>8} | {stats['p95_ms']:>8} | {stats['p99_ms']:>8}")
+    print(f"{'scenario':>16} | {'routed to':>14} | {'p50 ms':>8} | {'p95 ms':>8} | {'LLM calls':>9}")
+    for scenario_id, stats in result["scenarios"].items():
+        print(f"{scenario_id:>16} | {','.join(stats['routed_to']):>14} | {stats['end_to_end']['p50_ms']:>8} | "
+              f"{stats['end_to_end']['p95_ms']:>8} | {stats['llm_calls_per_query']:>9}")
+
+
+def print_comparison(result, baseline):
+    """이전 결과(--baseline)와 종단 간 지연 시간과 처리량을 비교합니다."""
+    print(f"Compared with baseline ({baseline.get('config', {}).get('git_revision')}):")
+    for key in ("p50_ms", "p95_ms", "p99_ms"):
+        before, after = baseline["end_to_end"][key], result["end_to_end"][key]
+        if before:
+            print(f"  end_to_end {key}: {before} -> {after} ({(after - before) / before:+.1%})")
+    before, after = baseline["requests_per_second"], result["requests_per_second"]
+    if before:
+        print(f"  requests_per_second: {before} -> {after} ({(after - before) / before:+.1%})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay test scenarios against the query pipeline with fake backends.")
+    parser.add_argument("--scenarios", default=SCENARIO_PATH, help="Markdown file with the scenario table.")
+    parser.add_argument("--target", choices=("handler", "app"), default="handler")
+    parser.add_argument("--concurrency", type=int, default=4, help="Requests in flight at the same time.")
+    parser.add_argument("--repeats", type=int, default=5, help="Times each scenario is replayed.")
+    parser.add_argument("--mention-manual", action="store_true",
+                        help="Prefix in-scope questions with the manual name (fast router path).")
+    parser.add_argument("--embedding-latency", default="lognormal:0.05,0.3")
+    parser.add_argument("--search-latency", default="lognormal:0.03,0.4")
+    parser.add_argument("--llm-first-token", default="lognormal:0.5,0.3")
+    parser.add_argument("--llm-token", default="0.02", help="Latency per generated token.")
+    parser.add_argument("--bedrock-capacity", type=int, default=16,
+                        help="Concurrent Bedrock requests before ThrottlingException.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results as JSON to this file.")
+    parser.add_argument("--baseline", help="Previous results JSON to compare against.")
+    parser.add_argument("--verbose", action="store_true", help="Show pipeline logs.")
+    args = parser.parse_args()
+
+    scenarios = load_scenarios(args.scenarios, args.mention_manual)
+    bedrock, _ = install_fakes(args, scenarios)
+    sink = tracing.get_sink()
+    schedule = [scenario for _ in range(args.repeats) for scenario in scenarios]
+    print(f"Replaying {len(scenarios)} scenarios x {args.repeats} against {args.target} "
+          f"with concurrency {args.concurrency}.")
+
+    def timed(scenario):
+        trace_id = uuid.uuid4().hex
+        start = time.perf_counter()
+        ok = run_request(args.target, scenario["query"], trace_id)
+        return {"scenario": scenario, "trace_id": trace_id, "ok": ok,
+                "latency_ms": (time.perf_counter() - start) * 1000}
+
+    # 파이프라인 로그(print, 오류 traceback)는 기본적으로 숨김
+    with contextlib.ExitStack() as stack:
+        if not args.verbose:
+            stack.enter_context(contextlib.redirect_stdout(io.StringIO()))
+            stack.enter_context(contextlib.redirect_stderr(io.StringIO()))
+        timed(scenarios[0])  # 그래프 컴파일 등 초기화 비용 제외
+        sink.clear()
+        bedrock.throttled = 0
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            requests = list(pool.map(timed, schedule))
+        wall_seconds = time.perf_counter() - start
+
+    result = {
+        "config": {**vars(args), "scenario_count": len(scenarios), "git_revision": git_revision()},
+        **summarize(sink.records, requests, wall_seconds, bedrock),
+    }
+    print_report(result)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            print_comparison(result, json.load(f))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+        print(f"Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+# bench/bench_retrieval.py
+#
+# 검색 모드(knn, bm25, hybrid)별 recall@k를 오프라인으로 비교합니다. RETRIEVAL_MODE를 바꾸기 전에 효과를 확인하는 용도입니다.
+# 질의 세트는 두 가지입니다.
+#   - identifier: 부품 번호/오류 코드/토크 값처럼 정확히 일치해야 하는 표현을 묻는 질의. 정답은 그 표현이 들어 있는 청크
+#   - passage: 무작위 청크 본문의 일부를 질의로 사용. 정답은 원래 청크
+# 검색은 로컬 검색 엔진(local_retriever.LocalVectorRetriever)으로 수행합니다. BM25는 OpenSearch 기본값(k1=1.2, b=0.75)과
+# standard 분석기를 흉내 낸 구현이며 (match_phrase 가산점은 제외), 결합은 query_pipeline과 같은 RRF 함수를 사용합니다.
+# --index flat,ivf로 전수 탐색과 근사 인덱스의 recall/지연 시간도 비교할 수 있습니다.
+# 사용법:
+#   python bench/bench_retrieval.py                        # 로컬 가짜 Bedrock (하네스 동작 확인용)
+#   python bench/bench_retrieval.py --bedrock --cache /tmp/emb.sqlite3 --rrf-k 10,60 --index flat,ivf --output retrieval.json
+#   python bench/bench_retrieval.py --bedrock --queries labeled.jsonl   # {"query": ..., "relevant": [청크 번호, ...]} 한 줄씩
+
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+from collections import Counter
+
+# lambda/의 모듈은 Lambda 배포 패키지처럼 평면 구조로 서로 임포트하므로 경로에 추가합니다. (bench/는 배포 패키지에 포함하지 않음)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "lambda"))
+
+from bench_vector_compression import embed_all
+from fake_bedrock import FakeBedrockRuntime
+from local_retriever import INDEX_TYPES, LocalVectorRetriever, load_documents
+from retrieval import DEFAULT_HYBRID_CANDIDATES, reciprocal_rank_fusion
+from vector_format import VectorConfig
+
+CHUNKS_JSON_PATH = os.path.join(os.path.dirname(__file__), "..", "chunks.json")
+CORPUS_SOURCE = "chunks.json"
+# 부품 번호(6987790, NA1721), 오류/문서 코드(E-05, W-2737-0508), 단위가 붙은 토크/압력 값
+IDENTIFIER_PATTERN = re.compile(
+    r"\b(?:[A-Z]{1,4}-?\d{2,}[A-Z0-9-]*|\d{5,}|\d+(?:\.\d+)?\s?(?:N·m|Nm|ft\.?-?lb|lbf|kPa|psi|bar))\b")
+IDENTIFIER_QUESTIONS = ("{} 부품은 어디에 사용되나요?", "{} 관련 내용을 알려줘", "What does {} refer to?")
+MAX_RELEVANT_CHUNKS = 3  # 너무 흔한 표현은 질의로 쓰지 않음
+
+
+def identifier_queries(corpus, num_queries: int, rng: random.Random):
+    occurrences = {}
+    for i, chunk in enumerate(corpus):
+        for identifier in set(IDENTIFIER_PATTERN.findall(chunk)):
+            occurrences.setdefault(identifier, set()).add(i)
+    candidates = sorted(identifier for identifier, chunks in occurrences.items()
+                        if len(chunks) <= MAX_RELEVANT_CHUNKS)
+    return [
+        {"query": rng.choice(IDENTIFIER_QUESTIONS).format(identifier), "relevant": sorted(occurrences[identifier])}
+        for identifier in rng.sample(candidates, min(num_queries, len(candidates)))
+    ]
+
+
+def passage_queries(corpus, num_queries: int, rng: random.Random):
+    queries = []
+    for i in rng.sample(range(len(corpus)), min(num_queries, len(corpus))):
+        words = corpus[i].replace('*', '').replace('#', '').split()
+        start = rng.randint(0, max(0, len(words) - 12))
+        queries.append({"query": " ".join(words[start:start + 12]), "relevant": [i]})
+    return queries
+
+
+def recall_at_k(hits, relevant, k: int) -> float:
+    found = {int(hit["_id"]) for hit in hits[:k]}
+    return len(found & set(relevant)) / min(k, len(relevant))
+
+
+def evaluate(queries, query_vectors, retriever: LocalVectorRetriever, k: int, candidates: int, rrf_ks):
+    totals = Counter()
+    knn_seconds = 0.0
+    for query, query_vector in zip(queries, query_vectors):
+        start = time.perf_counter()
+        knn_hits = retriever.knn_hits(query_vector, candidates)
+        knn_seconds += time.perf_counter() - start
+        bm25_hits = retriever.bm25_hits(query["query"], candidates)
+        totals["knn"] += recall_at_k(knn_hits, query["relevant"], k)
+        totals["bm25"] += recall_at_k(bm25_hits, query["relevant"], k)
+        for rrf_k in rrf_ks:
+            fused = reciprocal_rank_fusion([bm25_hits, knn_hits], k=rrf_k, limit=k)
+            totals[f"hybrid(rrf_k={rrf_k})"] += recall_at_k(fused, query["relevant"], k)
+    result = {mode: round(total / len(queries), 4) for mode, total in totals.items()}
+    result["knn_ms_per_query"] = round(knn_seconds * 1000 / len(queries), 3)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare recall@k of k-NN, BM25 and hybrid (RRF) retrieval.")
+    parser.add_argument("--model", default="amazon.titan-embed-text-v2:0")
+    parser.add_argument("--dimension", type=int, default=1024)
+    parser.add_argument("--k", type=int, default=3, help="Number of chunks passed to the prompt (SEARCH_TOP_K).")
+    parser.add_argument("--candidates", type=int, default=DEFAULT_HYBRID_CANDIDATES,
+                        help="Hits per method before fusion (HYBRID_CANDIDATES).")
+    parser.add_argument("--rrf-k", default="60", help="Comma-separated RRF k values to compare.")
+    parser.add_argument("--index", default="flat", help=f"Comma-separated local index types {INDEX_TYPES}.")
+    parser.add_argument("--num-queries", type=int, default=100, help="Queries per generated query set.")
+    parser.add_argument("--queries", help="JSONL file of labeled queries to evaluate instead of generated ones.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--bedrock", action="store_true", help="Call the real Bedrock runtime instead of the local fake.")
+    parser.add_argument("--cache", help="SQLite embedding cache path to avoid re-embedding between runs.")
+    parser.add_argument("--max-in-flight", type=int, default=8)
+    parser.add_argument("--output", help="Write results as JSON to this file.")
+    args = parser.parse_args()
+
+    if args.bedrock:
+        import boto3
+        client = boto3.client('bedrock-runtime')
+    else:
+        client = FakeBedrockRuntime(latency=0, capacity=1_000_000, dimension=args.dimension, semantic=True)
+    config = VectorConfig(args.model, args.dimension)
+
+    documents = load_documents(CHUNKS_JSON_PATH, CORPUS_SOURCE)
+    corpus = [doc["text"] for doc in documents]
+    if args.queries:
+        with open(args.queries, encoding='utf-8') as f:
+            query_sets = {os.path.basename(args.queries): [json.loads(line) for line in f if line.strip()]}
+    else:
+        rng = random.Random(args.seed)
+        query_sets = {
+            "identifier": identifier_queries(corpus, args.num_queries, rng),
+            "passage": passage_queries(corpus, args.num_queries, rng),
+        }
+    rrf_ks = [int(value) for value in args.rrf_k.split(",")]
+    print(f"Corpus: {len(corpus)} chunks, k={args.k}, candidates={args.candidates}, "
+          f"model={args.model}{'' if args.bedrock else ' (fake)'}")
+
+    corpus_vectors = embed_all(client, config, corpus, args.cache, args.max_in_flight)
+    vectors_by_set = {name: embed_all(client, config, [query["query"] for query in queries], args.cache,
+                                      args.max_in_flight)
+                      for name, queries in query_sets.items()}
+    results = {}
+    for index in args.index.split(","):
+        retriever = LocalVectorRetriever(documents, corpus_vectors, index=index)
+        for name, queries in query_sets.items():
+            results[f"{name}/{index}"] = {"queries": len(queries), **evaluate(
+                queries, vectors_by_set[name], retriever, args.k, args.candidates, rrf_ks)}
+
+    columns = [column for column in results[next(iter(results))] if column != "queries"]
+    print(f"{'query set/index':>16} | {'queries':>7} | " + " | ".join(f"{column:>17}" for column in columns))
+    for name, result in results.items():
+        print(f"{name:>16} | {result['queries']:>7} | "
+              + " | ".join(f"{result[column]:>17.3f}" for column in columns))
+    print(f"(recall@{args.k}, k-NN search time per query over {len(corpus)} chunks)")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
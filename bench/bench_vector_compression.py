@@ -0,0 +1,143 @@
+# bench/bench_vector_compression.py
+#
+# 임베딩 차원 축소와 양자화(fp16/int8) 설정별로 recall@k와 검색 지연 시간을 오프라인으로 평가합니다.
+# 가장 큰 차원의 float32 벡터로 찾은 top-k를 기준(ground truth)으로, 각 설정의 top-k가 얼마나 일치하는지 측정합니다.
+# 사용법:
+#   python bench/bench_vector_compression.py                 # 로컬 가짜 Bedrock (하네스 동작 확인용)
+#   python bench/bench_vector_compression.py --bedrock       # 실제 Bedrock Titan v2 호출 (AWS 자격 증명 필요)
+#   python bench/bench_vector_compression.py --bedrock --cache /tmp/emb.sqlite3 --output compression.json
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+# lambda/의 모듈은 Lambda 배포 패키지처럼 평면 구조로 서로 임포트하므로 경로에 추가합니다. (bench/는 배포 패키지에 포함하지 않음)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "lambda"))
+
+from embedding_cache import EmbeddingCache, SQLiteCacheBackend
+from embedding_service import EmbeddingService
+from fake_bedrock import FakeBedrockRuntime
+from vector_format import VectorConfig, encode_vector
+
+CHUNKS_JSON_PATH = os.path.join(os.path.dirname(__file__), "..", "chunks.json")
+BYTES_PER_COMPONENT = {"none": 4, "fp16": 2, "int8": 1}
+# 저장 형태 그대로 내적을 계산할 때 누적에 쓰는 타입 (int8끼리의 곱은 int8 범위를 넘으므로 int32로 누적)
+ACCUMULATOR_DTYPE = {"none": np.float32, "fp16": np.float32, "int8": np.int32}
+
+
+def load_corpus_and_queries(num_queries: int, seed: int = 0):
+    """chunks.json을 코퍼스로, 무작위 청크 본문의 앞부분 일부를 질의로 사용합니다."""
+    with open(CHUNKS_JSON_PATH, encoding='utf-8') as f:
+        corpus = [chunk for chunk in json.load(f) if chunk.strip()]
+    rng = random.Random(seed)
+    queries = []
+    for chunk in rng.sample(corpus, min(num_queries, len(corpus))):
+        words = chunk.replace('*', '').replace('#', '').split()
+        start = rng.randint(0, max(0, len(words) - 12))
+        queries.append(" ".join(words[start:start + 12]))
+    return corpus, queries
+
+
+def embed_all(client, config: VectorConfig, texts, cache_path, max_in_flight: int):
+    cache = None
+    if cache_path:
+        cache = EmbeddingCache(SQLiteCacheBackend(cache_path), config.model_id, config.dimension)
+    service = EmbeddingService(client, config, cache=cache, max_in_flight=max_in_flight)
+    return np.array([vector for _, vector in service.embed_batch(texts)], dtype=np.float32)
+
+
+def represent(config: VectorConfig, matrix: np.ndarray) -> np.ndarray:
+    """색인에 저장되는 형태(none: float32, fp16: float16, int8: int8)로 변환합니다."""
+    if config.quantization == "fp16":
+        return matrix.astype(np.float16)
+    if config.quantization == "int8":
+        return np.array([encode_vector(config, row.tolist()) for row in matrix], dtype=np.int8)
+    return matrix
+
+
+def top_k(corpus: np.ndarray, queries: np.ndarray, k: int, accumulate=np.float32):
+    """
+    내적(정규화된 벡터이면 코사인)으로 질의별 top-k 인덱스와 질의당 평균 검색 시간(ms)을 반환합니다.
+    벡터는 저장 형태 그대로 읽고 accumulate 타입으로 누적하므로, 시간에는 양자화된 벡터를 읽고 계산하는 비용이 반영됩니다.
+    (모든 설정에 같은 einsum 커널을 사용. OpenSearch 엔진의 절대 지연 시간은 bench_retrieval.py로 측정)
+    """
+    results = []
+    start = time.perf_counter()
+    for query in queries:
+        scores = np.einsum('ij,j->i', corpus, query, dtype=accumulate)
+        candidates = np.argpartition(-scores, k)[:k]
+        results.append(set(candidates[np.argsort(-scores[candidates])].tolist()))
+    elapsed_ms = (time.perf_counter() - start) * 1000 / len(queries)
+    return results, elapsed_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate recall@k and latency of reduced/quantized embeddings.")
+    parser.add_argument("--model", default="amazon.titan-embed-text-v2:0")
+    parser.add_argument("--dimensions", default="256,512,1024")
+    parser.add_argument("--quantizations", default="none,fp16,int8")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--bedrock", action="store_true", help="Call the real Bedrock runtime instead of the local fake.")
+    parser.add_argument("--cache", help="SQLite embedding cache path to avoid re-embedding between runs.")
+    parser.add_argument("--max-in-flight", type=int, default=8)
+    parser.add_argument("--output", help="Write results as JSON to this file.")
+    args = parser.parse_args()
+
+    if args.bedrock:
+        import boto3
+        client = boto3.client('bedrock-runtime')
+    else:
+        client = FakeBedrockRuntime(latency=0, capacity=1_000_000, dimension=1024, semantic=True)
+
+    corpus_texts, query_texts = load_corpus_and_queries(args.queries)
+    dimensions = sorted(int(d) for d in args.dimensions.split(","))
+    quantizations = args.quantizations.split(",")
+    print(f"Corpus: {len(corpus_texts)} chunks, {len(query_texts)} queries, k={args.k}, "
+          f"model={args.model}{'' if args.bedrock else ' (fake)'}")
+
+    embedded = {}
+    for dimension in dimensions:
+        config = VectorConfig(args.model, dimension)
+        embedded[dimension] = (
+            embed_all(client, config, corpus_texts, args.cache, args.max_in_flight),
+            embed_all(client, config, query_texts, args.cache, args.max_in_flight),
+        )
+
+    # 기준: 가장 큰 차원의 float32 벡터
+    baseline_corpus, baseline_queries = embedded[dimensions[-1]]
+    baseline, _ = top_k(baseline_corpus, baseline_queries, args.k)
+
+    results = []
+    print(f"{'dimension':>9} | {'quant':>5} | {'bytes/vec':>9} | {'recall@' + str(args.k):>9} | {'ms/query':>8}")
+    for dimension in dimensions:
+        corpus, queries = embedded[dimension]
+        for quantization in quantizations:
+            config = VectorConfig(args.model, dimension, quantization)
+            found, latency_ms = top_k(represent(config, corpus), represent(config, queries), args.k,
+                                      accumulate=ACCUMULATOR_DTYPE[quantization])
+            recall = float(np.mean([len(f & b) / args.k for f, b in zip(found, baseline)]))
+            result = {
+                "dimension": dimension,
+                "quantization": quantization,
+                "bytes_per_vector": dimension * BYTES_PER_COMPONENT[quantization],
+                f"recall@{args.k}": round(recall, 4),
+                "ms_per_query": round(latency_ms, 3),
+            }
+            results.append(result)
+            print(f"{dimension:>9} | {quantization:>5} | {result['bytes_per_vector']:>9} | "
+                  f"{recall:>9.3f} | {latency_ms:>8.3f}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
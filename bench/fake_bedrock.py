@@ -0,0 +1,206 @@
+# bench/fake_bedrock.py
+
+import functools
+import hashlib
+import io
+import json
+import math
+import random
+import re
+import threading
+import time
+from array import array
+
+from chunker import approximate_token_count
+
+TOKEN_PATTERN = re.compile(r'\w+')
+OUTPUT_TOKEN_PATTERN = re.compile(r'\S+\s*')  # 가짜 LLM 출력을 토큰처럼 나누는 단위
+
+DEFAULT_LLM_ANSWER = (
+    "엔진 오일은 매일 작업 전에 점검합니다. 장비를 평평한 곳에 세우고 엔진을 정지한 뒤 몇 분 기다립니다. "
+    "딥스틱을 뽑아 깨끗이 닦은 다음 다시 끝까지 꽂았다가 뽑아 오일 레벨이 두 표시 사이에 있는지 확인합니다. "
+    "부족하면 지정된 등급의 오일을 보충하고, 오일이 오염되었거나 변색되었으면 교환 주기와 관계없이 교환합니다. "
+    "(출처: Bobcat-T590-Operating-Manual, Page 42)"
+)
+
+
+class FakeClientError(Exception):
+    """botocore의 ClientError와 같은 형태(response['Error']['Code'])를 갖는 예외입니다."""
+
+    def __init__(self, code: str, message: str = ""):
+        super().__init__(f"An error occurred ({code}): {message}")
+        self.response = {"Error": {"Code": code, "Message": message}}
+
+
+class FakeBedrockRuntime:
+    """
+    벤치마크용 로컬 Bedrock Runtime 대체 클라이언트입니다.
+    invoke_model의 요청/응답 형식만 흉내내며, 네트워크 지연과 동시 처리 한도를 시뮬레이션합니다.
+    지연 시간 인자(latency, llm_*_latency)는 초 단위 숫자 또는 호출마다 값을 뽑는 함수입니다. (지연 시간 분포 주입용)
+    동시 요청 수가 capacity를 넘으면 ThrottlingException을 발생시킵니다.
+    semantic=True이면 단어별 무작위 벡터의 합으로 임베딩을 만들어, 단어가 겹치는 텍스트끼리 가까워집니다.
+    (검색 품질 평가 하네스를 로컬에서 돌려보기 위한 용도이며, 실제 모델의 품질을 대신하지는 않습니다.)
+    Anthropic messages 형식의 요청은 LLM 호출로 취급하여, 첫 토큰까지의 지연(llm_first_token_latency)과
+    토큰당 생성 지연(llm_token_latency)을 흉내 낸 응답을 반환합니다. (invoke_model_with_response_stream 지원)
+    응답 텍스트는 llm_responder(request)로 바꿀 수 있습니다.
+    프롬프트 캐싱도 흉내 냅니다. 마지막 cache_control 블록까지의 접두사가 prompt_cache_min_tokens 이상이면
+    처음에는 cache_creation_input_tokens로, 같은 접두사가 다시 오면 cache_read_input_tokens로 집계합니다.
+    llm_prefill_latency_per_1k_tokens를 주면 캐시되지 않은 입력 토큰 수에 비례해 첫 토큰 지연이 늘어납니다.
+    """
+
+    def __init__(self, latency=0.05, capacity: int = 16, dimension: int = 1536,
+                 semantic: bool = False, llm_first_token_latency=0.5,
+                 llm_token_latency=0.02, llm_responder=None, prompt_cache_min_tokens: int = 1024,
+                 llm_prefill_latency_per_1k_tokens: float = 0.0):
+        self.latency = latency
+        self.capacity = capacity
+        self.dimension = dimension
+        self.semantic = semantic
+        self.llm_first_token_latency = llm_first_token_latency
+        self.llm_token_latency = llm_token_latency
+        self.llm_responder = llm_responder
+        self.prompt_cache_min_tokens = prompt_cache_min_tokens
+        self.llm_prefill_latency_per_1k_tokens = llm_prefill_latency_per_1k_tokens
+        self.prompt_cache_hits = 0
+        self._prompt_cache = set()
+        self.calls = 0
+        self.throttled = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _seeded_vector(key: str, dimension: int):
+        # 같은 키는 항상 같은 벡터를 반환하도록 해시로 시드를 고정
+        seed = int.from_bytes(hashlib.sha256(key.encode('utf-8')).digest()[:8], 'big')
+        rng = random.Random(seed)
+        return array('d', (rng.uniform(-1.0, 1.0) for _ in range(dimension)))
+
+    # 단어 벡터는 자주 반복되므로 캐시 (array로 저장하여 메모리 사용을 줄임)
+    _token_vector = staticmethod(functools.lru_cache(maxsize=4096)(_seeded_vector.__func__))
+
+    def _fake_embedding(self, text: str, dimension: int, normalize: bool):
+        # 앞쪽 성분이 차원과 무관하게 같도록 기본 차원으로 만든 뒤 잘라냄 (Matryoshka 방식의 축소 흉내)
+        base_dimension = max(dimension, self.dimension)
+        if self.semantic:
+            vector = [0.0] * base_dimension
+            for token in TOKEN_PATTERN.findall(text.lower()):
+                for i, value in enumerate(self._token_vector(token, base_dimension)):
+                    vector[i] += value
+        else:
+            vector = list(self._seeded_vector(text, base_dimension))
+        vector = vector[:dimension]
+        if normalize:
+            norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+            vector = [value / norm for value in vector]
+        return vector
+
+    def _acquire(self):
+        with self._lock:
+            self.calls += 1
+            if self._in_flight >= self.capacity:
+                self.throttled += 1
+                raise FakeClientError("ThrottlingException", "Too many requests, please wait before trying again.")
+            self._in_flight += 1
+
+    def _release(self):
+        with self._lock:
+            self._in_flight -= 1
+
+    def _llm_tokens(self, request):
+        text = self.llm_responder(request) if self.llm_responder else DEFAULT_LLM_ANSWER
+        return OUTPUT_TOKEN_PATTERN.findall(text) or [text]
+
+    @staticmethod
+    def _prompt_blocks(request):
+        """시스템 프롬프트와 메시지 내용을 (텍스트, cache_control 여부) 목록으로 펼칩니다."""
+        system = request.get("system", [])
+        blocks = [{"text": system}] if isinstance(system, str) else list(system)
+        for message in request.get("messages", []):
+            content = message.get("content", "")
+            blocks.extend([{"text": content}] if isinstance(content, str) else content)
+        return [(block.get("text", ""), "cache_control" in block) for block in blocks]
+
+    def _usage(self, request, output_tokens: int) -> dict:
+        blocks = self._prompt_blocks(request)
+        counts = [approximate_token_count(text) for text, _ in blocks]
+        cache_end = max((i + 1 for i, (_, cached) in enumerate(blocks) if cached), default=0)
+        prefix_tokens = sum(counts[:cache_end])
+        usage = {"input_tokens": sum(counts), "output_tokens": output_tokens,
+                 "cache_read_input_tokens": 0, "cache_creation_input_tokens": 0}
+        if cache_end and prefix_tokens >= self.prompt_cache_min_tokens:
+            key = hashlib.sha256(json.dumps([text for text, _ in blocks[:cache_end]]).encode('utf-8')).digest()
+            with self._lock:
+                hit = key in self._prompt_cache
+                self._prompt_cache.add(key)
+                self.prompt_cache_hits += hit
+            # Anthropic 응답과 같이 input_tokens에는 캐시 접두사 이후의 토큰만 포함
+            usage["cache_read_input_tokens" if hit else "cache_creation_input_tokens"] = prefix_tokens
+            usage["input_tokens"] -= prefix_tokens
+        return usage
+
+    @staticmethod
+    def _seconds(latency) -> float:
+        return latency() if callable(latency) else latency
+
+    def _first_token_latency(self, usage: dict) -> float:
+        uncached = usage["input_tokens"] + usage["cache_creation_input_tokens"]
+        return self._seconds(self.llm_first_token_latency) + self.llm_prefill_latency_per_1k_tokens * uncached / 1000
+
+    def invoke_model(self, body, modelId, accept='application/json', contentType='application/json'):
+        self._acquire()
+        try:
+            request = json.loads(body)
+            if "messages" in request:
+                tokens = self._llm_tokens(request)
+                usage = self._usage(request, len(tokens))
+                time.sleep(self._first_token_latency(usage)
+                           + sum(self._seconds(self.llm_token_latency) for _ in tokens))
+                payload = {
+                    "content": [{"type": "text", "text": "".join(tokens)}],
+                    "stop_reason": "end_turn",
+                    "usage": usage,
+                }
+                return {"body": io.BytesIO(json.dumps(payload).encode('utf-8'))}
+            time.sleep(self._seconds(self.latency))
+            payload = {
+                "embedding": self._fake_embedding(
+                    request["inputText"],
+                    request.get("dimensions", self.dimension),
+                    request.get("normalize", False)
+                ),
+                "inputTextTokenCount": len(request["inputText"].split()),
+            }
+            return {"body": io.BytesIO(json.dumps(payload).encode('utf-8'))}
+        finally:
+            self._release()
+
+    def invoke_model_with_response_stream(self, body, modelId, accept='application/json',
+                                          contentType='application/json'):
+        """Anthropic messages 스트리밍 이벤트(content_block_delta 등)를 토큰 단위 지연과 함께 흘려보냅니다."""
+        self._acquire()
+        request = json.loads(body)
+
+        def event(payload):
+            return {"chunk": {"bytes": json.dumps(payload).encode('utf-8')}}
+
+        def events():
+            try:
+                tokens = self._llm_tokens(request)
+                usage = self._usage(request, len(tokens))
+                time.sleep(self._first_token_latency(usage))
+                yield event({"type": "message_start",
+                             "message": {"usage": dict(usage, output_tokens=0)}})
+                yield event({"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}})
+                for i, token in enumerate(tokens):
+                    if i:
+                        time.sleep(self._seconds(self.llm_token_latency))
+                    yield event({"type": "content_block_delta", "index": 0,
+                                 "delta": {"type": "text_delta", "text": token}})
+                yield event({"type": "content_block_stop", "index": 0})
+                yield event({"type": "message_delta", "delta": {"stop_reason": "end_turn"},
+                             "usage": {"output_tokens": usage["output_tokens"]}})
+                yield event({"type": "message_stop"})
+            finally:
+                self._release()
+
+        return {"body": events()}
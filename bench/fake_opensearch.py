@@ -0,0 +1,107 @@
+# bench/fake_opensearch.py
+
+import json
+import os
+import threading
+import time
+from typing import List, Optional
+
+CHUNKS_JSON_PATH = os.path.join(os.path.dirname(__file__), "..", "chunks.json")
+
+
+def _document_id(source: str, chunk_id: int) -> str:
+    return f"{source}-{chunk_id}"
+
+
+def load_sample_documents(source: str, limit: Optional[int] = None) -> List[dict]:
+    """chunks.json의 청크를 하나의 매뉴얼(source) 문서 목록으로 만듭니다."""
+    with open(CHUNKS_JSON_PATH, encoding='utf-8') as f:
+        chunks = [chunk for chunk in json.load(f) if chunk.strip()][:limit]
+    return [
+        {"text": text, "source": source, "page": i // 3 + 1, "chunk_id": i,
+         "prev_id": _document_id(source, i - 1) if i > 0 else None,
+         "next_id": _document_id(source, i + 1) if i + 1 < len(chunks) else None}
+        for i, text in enumerate(chunks)
+    ]
+
+
+class FakeOpenSearch:
+    """
+    벤치마크용 로컬 OpenSearch 대체 클라이언트입니다.
+    search/msearch/mget 요청/응답 형식만 흉내내며, 지연 시간 후 source 필터에 맞는 문서를 앞에서부터 반환합니다.
+    latency는 초 단위 숫자 또는 호출마다 지연 시간을 뽑는 함수입니다. (지연 시간 분포 주입용)
+    (검색 품질이 아니라 파이프라인의 지연 시간과 호출 흐름을 측정하기 위한 용도입니다.)
+    """
+
+    def __init__(self, documents: List[dict], latency=0.02):
+        self.documents = documents
+        self.by_id = {_document_id(doc["source"], doc["chunk_id"]): doc for doc in documents}
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _term_filters(body: dict) -> dict:
+        """k-NN/bool 쿼리의 term 필터를 {필드: 값}으로 모읍니다."""
+        query = body.get("query", {})
+        filters = [field.get("filter", {}) for field in query.get("knn", {}).values()]
+        filters += query.get("bool", {}).get("filter", [])
+        terms = {}
+        for query_filter in filters:
+            for nested in query_filter.get("bool", {}).get("filter", [query_filter]):
+                terms.update(nested.get("term", {}))
+        return terms
+
+    def _wait(self) -> int:
+        """호출 수를 세고 지연 시간만큼 기다린 뒤, 응답의 took(ms)으로 쓸 값을 반환합니다."""
+        with self._lock:
+            self.calls += 1
+        latency = self.latency() if callable(self.latency) else self.latency
+        time.sleep(latency)
+        return int(latency * 1000)
+
+    def search(self, body, index=None, **kwargs):
+        took = self._wait()
+        return dict(self._respond(body, index), took=took)
+
+    def msearch(self, body, index=None, **kwargs):
+        """헤더/본문 쌍의 목록을 받아 한 번의 지연 시간으로 모든 검색에 응답합니다."""
+        took = self._wait()
+        return {
+            "took": took,
+            "responses": [self._respond(query, header.get("index", index))
+                          for header, query in zip(body[::2], body[1::2])],
+        }
+
+    def mget(self, body, index=None, **kwargs):
+        self._wait()
+        docs = []
+        for item in body["docs"]:
+            doc = self.by_id.get(item["_id"])
+            if doc is None:
+                docs.append({"_index": index, "_id": item["_id"], "found": False})
+            else:
+                docs.append({"_index": index, "_id": item["_id"], "found": True,
+                             "_source": self._project(doc, item.get("_source"))})
+        return {"docs": docs}
+
+    @staticmethod
+    def _project(doc: dict, fields) -> dict:
+        return {field: doc[field] for field in fields if field in doc} if fields else doc
+
+    def _respond(self, body: dict, index) -> dict:
+        terms = self._term_filters(body)
+        size = body.get("size", 10)
+        matched = [doc for doc in self.documents
+                   if all(doc.get(field) == value for field, value in terms.items())][:size]
+        return {
+            "took": 0,
+            "hits": {
+                "total": {"value": len(matched), "relation": "eq"},
+                "hits": [
+                    {"_index": index, "_id": _document_id(doc['source'], doc['chunk_id']), "_score": 1.0 / (rank + 1),
+                     "_source": self._project(doc, body.get("_source"))}
+                    for rank, doc in enumerate(matched)
+                ],
+            },
+        }
@@ -0,0 +1,234 @@
+# lambda/answer_cache.py
+
+import hashlib
+import math
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from manual_catalog import normalize_name
+
+# --- 상수 ---
+DEFAULT_MAX_ENTRIES = 1000               # 메모리 백엔드의 최대 항목 수 (정확 일치/의미 일치 각각)
+DEFAULT_MAX_CANDIDATES_PER_SCOPE = 200   # 의미 일치 비교 대상 최대 수 (매뉴얼/버전 범위당)
+DEFAULT_SIMILARITY_THRESHOLD = 0.95      # 의미 일치로 인정할 최소 코사인 유사도
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600      # 공유 저장소 항목 만료 시간
+
+
+class CachedAnswer(NamedTuple):
+    answer: str
+    manual_name: str
+    index_version: str   # 답변을 만들 때 사용한 매뉴얼 색인 버전 (바뀌면 무효)
+
+
+def query_key(query: str) -> str:
+    """정확 일치 계층의 키입니다. 대소문자, 공백, 기호 차이는 같은 질문으로 취급합니다."""
+    return hashlib.sha256(normalize_name(query).encode('utf-8')).hexdigest()
+
+
+def scope_key(manual_name: str, index_version: str) -> str:
+    """의미 일치 계층의 범위입니다. 매뉴얼의 색인 버전이 바뀌면 범위가 달라져 이전 항목은 조회되지 않습니다."""
+    return f"{manual_name}#{index_version}"
+
+
+def _unit_vector(vector) -> array:
+    norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+    return array('f', (value / norm for value in vector))
+
+
+def _dot(a, b) -> float:
+    return sum(x * y for x, y in zip(a, b))
+
+
+# --- 백엔드 ---
+
+class InMemoryAnswerBackend:
+    """컨테이너 메모리에 저장하는 LRU 백엔드입니다. (테스트 및 단일 컨테이너용)"""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 max_candidates_per_scope: int = DEFAULT_MAX_CANDIDATES_PER_SCOPE):
+        self.max_entries = max_entries
+        self.max_candidates_per_scope = max_candidates_per_scope
+        self._exact: "OrderedDict[str, CachedAnswer]" = OrderedDict()
+        self._semantic: "OrderedDict[str, OrderedDict[str, Tuple[array, CachedAnswer]]]" = OrderedDict()
+        self._semantic_count = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get_exact(self, key: str) -> Optional[CachedAnswer]:
+        with self._lock:
+            entry = self._exact.get(key)
+            if entry is not None:
+                self._exact.move_to_end(key)
+            return entry
+
+    def put_exact(self, key: str, entry: CachedAnswer) -> None:
+        with self._lock:
+            self._exact[key] = entry
+            self._exact.move_to_end(key)
+            while len(self._exact) > self.max_entries:
+                self._exact.popitem(last=False)
+                self.evictions += 1
+
+    def semantic_candidates(self, scope: str) -> List[Tuple[array, CachedAnswer]]:
+        with self._lock:
+            entries = self._semantic.get(scope)
+            if not entries:
+                return []
+            self._semantic.move_to_end(scope)
+            return list(entries.values())
+
+    def put_semantic(self, scope: str, key: str, embedding: array, entry: CachedAnswer) -> None:
+        with self._lock:
+            entries = self._semantic.setdefault(scope, OrderedDict())
+            if key not in entries:
+                self._semantic_count += 1
+            entries[key] = (embedding, entry)
+            entries.move_to_end(key)
+            self._semantic.move_to_end(scope)
+            if len(entries) > self.max_candidates_per_scope:
+                entries.popitem(last=False)
+                self._semantic_count -= 1
+                self.evictions += 1
+            # 전체 한도를 넘으면 가장 오래 사용되지 않은 범위부터 제거 (이전 색인 버전 범위가 먼저 정리됨)
+            while self._semantic_count > self.max_entries and len(self._semantic) > 1:
+                _, removed = self._semantic.popitem(last=False)
+                self._semantic_count -= len(removed)
+                self.evictions += len(removed)
+
+
+class DynamoDBAnswerBackend:
+    """
+    여러 Lambda 컨테이너가 공유하는 DynamoDB 백엔드입니다.
+    테이블 키: pk(S, 파티션 키), sk(S, 정렬 키). expires_at(N) 속성에 DynamoDB TTL을 설정하면 오래된 항목이 자동 삭제됩니다.
+    - 정확 일치: pk='exact#<질문 해시>', sk='-'
+    - 의미 일치: pk='semantic#<매뉴얼>#<색인 버전>', sk='t#<저장 시각(ms)>#<질문 해시>'
+    의미 일치는 최근에 저장한 max_candidates_per_scope개만 비교합니다. 정렬 키가 저장 시각 순이므로 범위의 항목이
+    한도를 넘어도 새 질문이 비교 대상에서 빠지지 않고, 오래된 항목은 읽히지 않다가 TTL로 삭제됩니다.
+    (정렬 키가 질문 해시뿐이던 이전 항목은 't#' 접두어 조건으로 제외)
+    """
+
+    SEMANTIC_SK_PREFIX = "t#"
+
+    def __init__(self, dynamodb_client, table_name: str, ttl_seconds: int = DEFAULT_TTL_SECONDS,
+                 max_candidates_per_scope: int = DEFAULT_MAX_CANDIDATES_PER_SCOPE, clock=time.time):
+        self.client = dynamodb_client
+        self.table_name = table_name
+        self.ttl_seconds = ttl_seconds
+        self.max_candidates_per_scope = max_candidates_per_scope
+        self.clock = clock
+        self.evictions = 0  # 만료는 DynamoDB TTL이 처리
+
+    @staticmethod
+    def _entry(item: dict) -> CachedAnswer:
+        return CachedAnswer(item['answer']['S'], item['manual_name']['S'], item['index_version']['S'])
+
+    def _item(self, pk: str, sk: str, entry: CachedAnswer) -> dict:
+        return {
+            'pk': {'S': pk},
+            'sk': {'S': sk},
+            'answer': {'S': entry.answer},
+            'manual_name': {'S': entry.manual_name},
+            'index_version': {'S': entry.index_version},
+            'expires_at': {'N': str(int(self.clock()) + self.ttl_seconds)},
+        }
+
+    def get_exact(self, key: str) -> Optional[CachedAnswer]:
+        response = self.client.get_item(TableName=self.table_name, Key={'pk': {'S': f"exact#{key}"}, 'sk': {'S': '-'}})
+        item = response.get('Item')
+        if item is None or int(item['expires_at']['N']) < self.clock():
+            return None
+        return self._entry(item)
+
+    def put_exact(self, key: str, entry: CachedAnswer) -> None:
+        self.client.put_item(TableName=self.table_name, Item=self._item(f"exact#{key}", '-', entry))
+
+    def semantic_candidates(self, scope: str) -> List[Tuple[array, CachedAnswer]]:
+        response = self.client.query(
+            TableName=self.table_name,
+            KeyConditionExpression='pk = :pk AND begins_with(sk, :prefix)',
+            ExpressionAttributeValues={':pk': {'S': f"semantic#{scope}"}, ':prefix': {'S': self.SEMANTIC_SK_PREFIX}},
+            ScanIndexForward=False,  # 최근에 저장한 항목부터
+            Limit=self.max_candidates_per_scope
+        )
+        now = self.clock()
+        candidates = []
+        for item in response.get('Items', []):
+            if int(item['expires_at']['N']) >= now:
+                embedding = array('f')
+                embedding.frombytes(item['embedding']['B'])
+                candidates.append((embedding, self._entry(item)))
+        return candidates
+
+    def put_semantic(self, scope: str, key: str, embedding: array, entry: CachedAnswer) -> None:
+        sort_key = f"{self.SEMANTIC_SK_PREFIX}{int(self.clock() * 1000):013d}#{key}"
+        item = self._item(f"semantic#{scope}", sort_key, entry)
+        item['embedding'] = {'B': embedding.tobytes()}
+        self.client.put_item(TableName=self.table_name, Item=item)
+
+
+# --- 답변 캐시 ---
+
+class AnswerCache:
+    """
+    2단계 답변 캐시입니다.
+    1. 정확 일치: 정규화된 질문이 같으면 라우터/임베딩/검색/생성을 모두 생략
+    2. 의미 일치: 같은 매뉴얼(같은 색인 버전) 안에서 질문 임베딩의 코사인 유사도가 임계값 이상이면 검색/생성을 생략
+    두 계층 모두 답변을 만들 때의 매뉴얼 색인 버전을 함께 저장하여, 매뉴얼이 다시 색인되면 무효가 됩니다.
+    """
+
+    def __init__(self, backend, similarity_threshold: float = DEFAULT_SIMILARITY_THRESHOLD):
+        self.backend = backend
+        self.similarity_threshold = similarity_threshold
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _count(self, attribute: str) -> None:
+        with self._lock:
+            setattr(self, attribute, getattr(self, attribute) + 1)
+
+    def lookup_exact(self, query: str, current_versions: Dict[str, str]) -> Optional[CachedAnswer]:
+        """
+        정확 일치 계층을 조회합니다. current_versions는 {매뉴얼 이름: 현재 색인 버전}이며,
+        답변의 매뉴얼이 없어졌거나 버전이 바뀌었으면 무시합니다. (miss 집계는 의미 일치 단계에서 수행)
+        """
+        entry = self.backend.get_exact(query_key(query))
+        if entry is None or current_versions.get(entry.manual_name) != entry.index_version:
+            return None
+        self._count('exact_hits')
+        return entry
+
+    def lookup_semantic(self, embedding, manual_name: str, index_version: str) -> Optional[Tuple[CachedAnswer, float]]:
+        """같은 매뉴얼/색인 버전 범위에서 가장 유사한 질문의 답변과 유사도를 반환합니다."""
+        query_vector = _unit_vector(embedding)
+        best, best_score = None, -1.0
+        for candidate_vector, entry in self.backend.semantic_candidates(scope_key(manual_name, index_version)):
+            score = _dot(query_vector, candidate_vector)
+            if score > best_score:
+                best, best_score = entry, score
+        if best is not None and best_score >= self.similarity_threshold:
+            self._count('semantic_hits')
+            return best, best_score
+        self._count('misses')
+        return None
+
+    def store(self, query: str, embedding, answer: str, manual_name: str, index_version: str) -> None:
+        entry = CachedAnswer(answer, manual_name, index_version)
+        key = query_key(query)
+        self.backend.put_exact(key, entry)
+        if embedding:
+            self.backend.put_semantic(scope_key(manual_name, index_version), key, _unit_vector(embedding), entry)
+
+    def stats(self) -> dict:
+        total = self.exact_hits + self.semantic_hits + self.misses
+        return {
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.exact_hits + self.semantic_hits) / total, 4) if total else 0.0,
+            "evictions": getattr(self.backend, 'evictions', 0),
+        }
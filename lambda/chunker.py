@@ -0,0 +1,138 @@
+# lambda/chunker.py
+
+import re
+from typing import Callable, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+# --- 상수 ---
+MAX_CHUNK_SIZE = 1000  # 청크의 최대 크기 (unit='chars'이면 문자 수, 'tokens'이면 토큰 수)
+PARAGRAPH_SEPARATOR = "\n\n"
+
+HEADER_PATTERN = re.compile(r'^(#{1,6}) (.*)$', re.MULTILINE)
+TOKEN_PATTERN = re.compile(r'\w+|[^\w\s]')
+
+
+class Chunk(NamedTuple):
+    text: str
+    page: int
+    header_path: Tuple[str, ...]  # 청크가 속한 헤더 계층 (예: ('MAINTENANCE', 'ENGINE OIL'))
+
+
+def approximate_token_count(text: str) -> int:
+    """단어와 기호 단위로 토큰 수를 근사합니다. (정확한 토크나이저가 필요하면 count_tokens로 교체)"""
+    return sum(1 for _ in TOKEN_PATTERN.finditer(text))
+
+
+def _header_title(header_text: str) -> str:
+    return header_text.replace('*', '').strip()
+
+
+class _Packer:
+    """
+    단락들을 최대 크기까지 채워 청크로 묶습니다. 문자열을 반복해서 이어 붙이지 않고
+    단락 목록과 누적 크기만 유지하다가, 청크를 내보낼 때 한 번만 join합니다.
+    """
+
+    def __init__(self, max_size: int, overlap: int, measure: Callable[[str], int], separator_size: int):
+        self.max_size = max_size
+        self.overlap = overlap
+        self.measure = measure
+        self.separator_size = separator_size
+
+    def pack(self, paragraphs: Iterable[str]) -> Iterator[str]:
+        parts: List[str] = []
+        sizes: List[int] = []
+        total = 0  # parts를 구분자로 이었을 때의 크기
+        for raw in paragraphs:
+            paragraph = raw.strip()
+            if not paragraph:
+                continue
+            # 기존 동작과 같게, 크기 판단에는 strip 전 단락 크기를 사용
+            raw_size = self.measure(raw)
+            if parts and total + raw_size + self.separator_size > self.max_size:
+                yield PARAGRAPH_SEPARATOR.join(parts)
+                parts, sizes, total = self._overlap_tail(parts, sizes, raw_size)
+            # 토큰 수는 앞뒤 공백과 무관하므로 문자 단위일 때만 다시 측정
+            size = len(paragraph) if self.measure is len else raw_size
+            total += size + (self.separator_size if parts else 0)
+            parts.append(paragraph)
+            sizes.append(size)
+        if parts:
+            yield PARAGRAPH_SEPARATOR.join(parts)
+
+    def _overlap_tail(self, parts: List[str], sizes: List[int], next_size: int):
+        """직전 청크의 마지막 단락들을 overlap 크기 이내에서 다음 청크 앞에 다시 포함합니다."""
+        if not self.overlap:
+            return [], [], 0
+        tail_parts, tail_sizes, tail_total = [], [], 0
+        for part, size in zip(reversed(parts), reversed(sizes)):
+            extra = size + (self.separator_size if tail_parts else 0)
+            # overlap 한도와, 다음 단락이 들어갈 공간을 모두 지켜야 진행이 보장됨
+            if tail_total + extra > self.overlap or \
+                    tail_total + extra + next_size + self.separator_size > self.max_size:
+                break
+            tail_parts.insert(0, part)
+            tail_sizes.insert(0, size)
+            tail_total += extra
+        return tail_parts, tail_sizes, tail_total
+
+
+def chunk_pages(page_chunks: Iterable[dict], max_size: int = MAX_CHUNK_SIZE, unit: str = "chars",
+                overlap: int = 0, count_tokens: Optional[Callable[[str], int]] = None) -> Iterator[Chunk]:
+    """
+    페이지 청크(pymupdf4llm의 page_chunks 형식) 스트림을 받아 Chunk를 지연 생성합니다.
+    헤더(h1~h6) 기준으로 1차 분할하고, 섹션이 max_size를 초과하면 단락(이중 개행) 기준으로 2차 분할합니다.
+    unit='tokens'이면 크기를 토큰 수로 계산하며, overlap만큼 직전 청크의 마지막 단락을 다음 청크에 겹쳐 넣습니다.
+    헤더 계층은 페이지를 넘어 이어지므로, 페이지 첫머리의 본문도 직전 헤더 경로를 갖습니다.
+    """
+    if unit == "chars":
+        measure, separator_size = len, len(PARAGRAPH_SEPARATOR)
+    elif unit == "tokens":
+        measure, separator_size = (count_tokens or approximate_token_count), 0
+    else:
+        raise ValueError(f"Unknown chunk size unit: {unit}")
+    packer = _Packer(max_size, overlap, measure, separator_size)
+    header_stack: List[Tuple[int, str]] = []  # (헤더 레벨, 제목)
+
+    def emit(section: str, page_num: int) -> Iterator[Chunk]:
+        if not section:
+            return
+        header_path = tuple(title for _, title in header_stack)
+        if measure(section) > max_size:
+            for text in packer.pack(section.split(PARAGRAPH_SEPARATOR)):
+                yield Chunk(text, page_num, header_path)
+        else:
+            yield Chunk(section, page_num, header_path)
+
+    for page_chunk in page_chunks:
+        page_num = page_chunk.get("metadata", {}).get("page_number", 0)
+        text = page_chunk.get("text", "")
+        if not text.strip():
+            continue
+
+        section_start = 0
+        first_header = True
+        for match in HEADER_PATTERN.finditer(text):
+            if first_header:
+                # 첫 번째 헤더 이전의 텍스트
+                if match.start() > 0:
+                    yield from emit(text[:match.start()].strip(), page_num)
+                first_header = False
+            else:
+                yield from emit(text[section_start:match.start()].strip(), page_num)
+
+            level = len(match.group(1))
+            while header_stack and header_stack[-1][0] >= level:
+                header_stack.pop()
+            header_stack.append((level, _header_title(match.group(2))))
+            section_start = match.start()
+
+        if first_header:
+            # 헤더가 없으면 페이지 전체를 하나의 섹션으로 간주
+            yield from emit(text, page_num)
+        else:
+            yield from emit(text[section_start:].strip(), page_num)
+
+
+def chunk_text(text: str, **kwargs) -> Iterator[Chunk]:
+    """페이지 구분 없는 마크다운 문서 전체를 청킹합니다. (page는 0)"""
+    return chunk_pages([{"metadata": {"page_number": 0}, "text": text}], **kwargs)
@@ -0,0 +1,225 @@
+# lambda/clients.py
+#
+# 색인/검색 Lambda가 함께 쓰는 boto3, opensearch-py 클라이언트 생성 도구입니다.
+#   - ClientConfig / client_config_from_env: 연결 풀 크기, TCP keep-alive, 재시도 방식(기본값 adaptive), 제한 시간
+#   - boto3_client(service, config, **overrides): 공유 boto3 세션으로 클라이언트 생성 (자격 증명은 한 번만 조회)
+#   - opensearch_client(host, config, **kwargs): SigV4(aoss) 서명. 같은 세션의 자격 증명을 사용하며, 서명할 때마다
+#     만료가 가까우면 갱신된 값을 사용 (AWSV4Signer가 get_frozen_credentials 호출)
+#   - pool_stats(): 클라이언트별 연결 풀 통계 (연결 대여 횟수, 새 연결(TLS 핸드셰이크) 수와 재사용률,
+#     동시 사용 최대치, 풀이 가득 차서 닫은 연결 수). peak_in_use가 maxsize를 넘거나 discarded가 늘면 풀을 키웁니다.
+#     botocore와 requests는 urllib3 풀을 block=False로 만들므로, 풀이 비어 있으면 기다리지 않고 새 연결을 엽니다.
+#     그래서 대여 대기 시간은 항상 0에 가까워 기록하지 않고, 위 두 값을 포화 신호로 사용합니다.
+# 클라이언트는 모듈 전역 또는 지연 초기화로 한 번만 만들어, 웜 컨테이너의 호출 사이에도 연결을 재사용해야 합니다.
+
+import os
+import socket
+import threading
+from typing import Dict, List, NamedTuple, Optional
+
+import boto3
+from botocore.config import Config
+from opensearchpy import AWSV4SignerAuth, OpenSearch, RequestsHttpConnection
+from urllib3.connection import HTTPConnection
+
+# --- 상수 ---
+DEFAULT_MAX_POOL_CONNECTIONS = 10  # botocore 기본값과 같음
+RETRY_MODES = ("legacy", "standard", "adaptive")
+OPENSEARCH_PORT = 443
+KEEPALIVE_SOCKET_OPTIONS = HTTPConnection.default_socket_options + [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+
+
+class ClientConfig(NamedTuple):
+    """클라이언트 공통 설정입니다. 클라이언트별로 다른 값은 boto3_client의 overrides로 바꿉니다."""
+    region: Optional[str]
+    max_pool_connections: int = DEFAULT_MAX_POOL_CONNECTIONS  # 호스트별 최대 유지 연결 수 (동시 호출 수 이상으로)
+    tcp_keepalive: bool = True       # 유휴 연결이 NAT 등에서 끊기지 않도록 TCP keep-alive 사용
+    retry_mode: str = "adaptive"     # 'adaptive'는 스로틀링 응답을 받으면 클라이언트 측에서 요청 속도를 줄임
+    max_attempts: int = 3            # 첫 시도를 포함한 최대 시도 횟수
+    connect_timeout: float = 60.0
+    read_timeout: float = 60.0
+
+
+def client_config_from_env(region: Optional[str],
+                           default_pool_connections: int = DEFAULT_MAX_POOL_CONNECTIONS) -> ClientConfig:
+    """
+    환경 변수에서 ClientConfig를 만듭니다. default_pool_connections는 CLIENT_MAX_POOL_CONNECTIONS가 없을 때의 값으로,
+    각 Lambda의 최대 동시 호출 수에 맞춰 정합니다.
+    """
+    config = ClientConfig(
+        region=region,
+        max_pool_connections=int(os.environ.get('CLIENT_MAX_POOL_CONNECTIONS', str(default_pool_connections))),
+        tcp_keepalive=os.environ.get('CLIENT_TCP_KEEPALIVE', 'true').lower() == 'true',
+        retry_mode=os.environ.get('AWS_RETRY_MODE', 'adaptive'),
+        max_attempts=int(os.environ.get('AWS_MAX_ATTEMPTS', '3')),
+    )
+    validate(config)
+    return config
+
+
+def validate(config: ClientConfig) -> None:
+    if config.retry_mode not in RETRY_MODES:
+        raise ValueError(f"Unknown AWS_RETRY_MODE '{config.retry_mode}'. Use one of {RETRY_MODES}.")
+    if config.max_pool_connections < 1:
+        raise ValueError("CLIENT_MAX_POOL_CONNECTIONS must be at least 1.")
+
+
+# --- 연결 풀 통계 ---
+
+class PoolStats:
+    """클라이언트 하나의 연결 풀(호스트별 풀 전체) 사용 통계입니다."""
+
+    def __init__(self, name: str, maxsize: int):
+        self.name = name
+        self.maxsize = maxsize
+        self.checkouts = 0
+        self.created = 0
+        self.discarded = 0
+        self.in_use = 0
+        self.peak_in_use = 0
+        self._lock = threading.Lock()
+
+    def record_checkout(self) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+
+    def record_created(self) -> None:
+        with self._lock:
+            self.created += 1
+
+    def record_return(self, discarded: bool) -> None:
+        with self._lock:
+            self.in_use = max(0, self.in_use - 1)
+            if discarded:
+                self.discarded += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            reused = max(0, self.checkouts - self.created)
+            return {
+                "name": self.name,
+                "maxsize": self.maxsize,
+                "checkouts": self.checkouts,
+                "created": self.created,
+                "reused": reused,
+                "reuse_rate": round(reused / self.checkouts, 4) if self.checkouts else None,
+                "in_use": self.in_use,
+                "peak_in_use": self.peak_in_use,
+                "discarded": self.discarded,
+            }
+
+
+def _counting_pool_class(base, stats: PoolStats):
+    """urllib3 연결 풀 클래스를 감싸 연결 대여/반환과 새 연결 생성을 stats에 기록합니다."""
+    class CountingConnectionPool(base):
+        def _get_conn(self, timeout=None):
+            # block=False인 풀은 비어 있으면 기다리지 않고 새 연결을 만들므로 (_new_conn) 대여 횟수만 기록
+            conn = super()._get_conn(timeout)
+            stats.record_checkout()
+            return conn
+
+        def _new_conn(self):
+            stats.record_created()
+            return super()._new_conn()
+
+        def _put_conn(self, conn):
+            # 풀이 가득 차 있으면 urllib3가 연결을 닫음 (동시 사용 수가 maxsize보다 많았다는 뜻)
+            stats.record_return(discarded=self.pool is not None and self.pool.full())
+            super()._put_conn(conn)
+
+    CountingConnectionPool.__name__ = f"Counting{base.__name__}"
+    return CountingConnectionPool
+
+
+def _instrument(pool_manager, stats: PoolStats) -> None:
+    pool_manager.pool_classes_by_scheme = {
+        scheme: _counting_pool_class(pool_class, stats)
+        for scheme, pool_class in pool_manager.pool_classes_by_scheme.items()
+    }
+
+
+_pool_stats: Dict[str, PoolStats] = {}
+
+
+def _register_stats(name: str, maxsize: int) -> PoolStats:
+    # 같은 이름의 클라이언트를 여러 개 만들면 이름 뒤에 번호를 붙임
+    key, suffix = name, 2
+    while key in _pool_stats:
+        key, suffix = f"{name}#{suffix}", suffix + 1
+    stats = PoolStats(key, maxsize)
+    _pool_stats[key] = stats
+    return stats
+
+
+def pool_stats() -> List[dict]:
+    """지금까지 만든 클라이언트의 연결 풀 통계 목록입니다."""
+    return [stats.stats() for stats in list(_pool_stats.values())]
+
+
+# --- 클라이언트 생성 ---
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> boto3.session.Session:
+    """모든 클라이언트가 공유하는 boto3 세션입니다. (자격 증명 조회는 세션당 한 번)"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = boto3.session.Session()
+        return _session
+
+
+def botocore_config(config: ClientConfig) -> Config:
+    return Config(
+        region_name=config.region,
+        max_pool_connections=config.max_pool_connections,
+        tcp_keepalive=config.tcp_keepalive,
+        connect_timeout=config.connect_timeout,
+        read_timeout=config.read_timeout,
+        retries={'mode': config.retry_mode, 'total_max_attempts': config.max_attempts},
+    )
+
+
+def boto3_client(service: str, config: ClientConfig, **overrides):
+    """
+    공유 세션으로 boto3 클라이언트를 만듭니다. overrides로 이 클라이언트만의 값(예: read_timeout)을 바꿀 수 있습니다.
+    연결 풀 통계는 service 이름으로 기록됩니다.
+    """
+    config = config._replace(**overrides)
+    session = get_session()
+    with _session_lock:
+        # boto3 세션의 클라이언트 생성은 스레드 안전하지 않음
+        client = session.client(service, config=botocore_config(config))
+    http_session = getattr(client._endpoint, 'http_session', None)
+    manager = getattr(http_session, '_manager', None)
+    if manager is not None:
+        _instrument(manager, _register_stats(service, config.max_pool_connections))
+    return client
+
+
+def opensearch_client(host: str, config: ClientConfig, service: str = 'aoss', **kwargs) -> OpenSearch:
+    """
+    SigV4로 서명하는 OpenSearch(Serverless) 클라이언트를 만듭니다. kwargs(timeout, serializer 등)는 OpenSearch에 전달됩니다.
+    연결 풀 크기와 TCP keep-alive는 config를 따르며, 풀 통계는 'opensearch' 이름으로 기록됩니다.
+    """
+    credentials = get_session().get_credentials()
+    client = OpenSearch(
+        hosts=[{'host': host, 'port': OPENSEARCH_PORT}],
+        http_auth=AWSV4SignerAuth(credentials, config.region, service),
+        use_ssl=True,
+        verify_certs=True,
+        connection_class=RequestsHttpConnection,
+        pool_maxsize=config.max_pool_connections,
+        http_compress=True,
+        **kwargs
+    )
+    stats = _register_stats('opensearch', config.max_pool_connections)
+    for connection in client.transport.connection_pool.connections:
+        pool_manager = connection.session.get_adapter(f"https://{host}").poolmanager
+        if config.tcp_keepalive:
+            pool_manager.connection_pool_kw['socket_options'] = KEEPALIVE_SOCKET_OPTIONS
+        _instrument(pool_manager, stats)
+    return client
@@ -0,0 +1,199 @@
+# lambda/context_packer.py
+
+import re
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from chunker import PARAGRAPH_SEPARATOR, approximate_token_count
+
+# --- 상수 ---
+DEFAULT_TOKEN_BUDGET = 700       # 프롬프트에 넣을 컨텍스트의 최대 토큰 수 (approximate_token_count 기준, 기존 top-3 중앙값 이하)
+DEFAULT_MMR_LAMBDA = 0.7         # MMR에서 관련도의 비중 (1이면 검색 순위 그대로, 낮을수록 다양성 중시)
+DEFAULT_DUPLICATE_THRESHOLD = 0.85  # 단어 집합 Jaccard 유사도가 이 값 이상이면 거의 같은 청크로 보고 제외
+DOCUMENT_OVERHEAD_TOKENS = 20    # <document ...> 태그 등 문서 하나당 추가되는 토큰 수
+MIN_PARTIAL_TOKENS = 100         # 남은 예산이 이 이상이면 다 들어가지 않는 청크도 앞부분 단락만 잘라서 넣음
+MAX_OVERLAP_CHARS = 2000         # 인접 청크를 합칠 때 찾아볼 겹침(CHUNK_OVERLAP) 최대 길이
+WORD_PATTERN = re.compile(r'\w+')
+
+
+class PackedDocument(NamedTuple):
+    text: str
+    source: Optional[str]
+    pages: Tuple[int, ...]       # 합쳐진 청크들의 페이지 (중복 제거, 오름차순)
+    chunk_ids: Tuple[int, ...]
+    rank: int                    # 포함된 청크 중 가장 높은 검색 순위 (0부터)
+
+
+def _word_set(text: str) -> frozenset:
+    return frozenset(WORD_PATTERN.findall(text.lower()))
+
+
+def jaccard(a: frozenset, b: frozenset) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def _join_overlapping(first: str, second: str) -> str:
+    """
+    인접 청크를 이어 붙입니다. 청킹 시 겹치게 넣은 단락(CHUNK_OVERLAP; first의 끝 단락들 == second의 앞 단락들)은
+    한 번만 넣습니다.
+    """
+    paragraphs = second.split(PARAGRAPH_SEPARATOR)
+    for count in range(len(paragraphs) - 1, 0, -1):
+        overlap = PARAGRAPH_SEPARATOR.join(paragraphs[:count])
+        if len(overlap) <= MAX_OVERLAP_CHARS and overlap.strip() and first.endswith(overlap):
+            return first + second[len(overlap):]
+    return f"{first}{PARAGRAPH_SEPARATOR}{second}"
+
+
+class ContextPacker:
+    """
+    검색 결과(순위순 청크 목록)로 토큰 예산 안의 프롬프트 컨텍스트를 만듭니다.
+    1. 앞선 청크와 거의 같은 청크 제거 (단어 집합 Jaccard)
+    2. MMR: 검색 순위에 따른 관련도와, 이미 고른 청크와의 유사도를 함께 고려하여 예산 안에서 하나씩 선택
+    3. (neighbors가 주어지면) 남은 예산으로 선택된 청크의 앞뒤 인접 청크를 추가
+    4. 같은 매뉴얼에서 chunk_id가 연속인 청크를 하나의 문서로 합침 (겹치는 부분 제거, 페이지 목록 유지)
+    문서는 포함된 청크의 가장 높은 순위 순으로 반환합니다.
+    """
+
+    def __init__(self, token_budget: int = DEFAULT_TOKEN_BUDGET, mmr_lambda: float = DEFAULT_MMR_LAMBDA,
+                 duplicate_threshold: float = DEFAULT_DUPLICATE_THRESHOLD,
+                 count_tokens: Callable[[str], int] = approximate_token_count):
+        self.token_budget = token_budget
+        self.mmr_lambda = mmr_lambda
+        self.duplicate_threshold = duplicate_threshold
+        self.count_tokens = count_tokens
+
+    def _deduplicate(self, chunks: List[dict]) -> List[Tuple[int, dict, frozenset]]:
+        kept = []
+        for rank, chunk in enumerate(chunks):
+            words = _word_set(chunk['text'])
+            if any(jaccard(words, other) >= self.duplicate_threshold for _, _, other in kept):
+                continue
+            kept.append((rank, chunk, words))
+        return kept
+
+    def _select(self, candidates: List[Tuple[int, dict, frozenset]], total: int) -> Tuple[List[Tuple[int, dict]], int]:
+        costs = {rank: self.count_tokens(chunk['text']) + DOCUMENT_OVERHEAD_TOKENS for rank, chunk, _ in candidates}
+        remaining = self.token_budget
+        selected = []
+        pool = list(candidates)
+        while pool and remaining > DOCUMENT_OVERHEAD_TOKENS:
+            best, best_score = None, None
+            for candidate in pool:
+                rank, _, words = candidate
+                if costs[rank] > remaining and remaining < MIN_PARTIAL_TOKENS:
+                    continue
+                relevance = 1.0 - rank / total
+                redundancy = max((jaccard(words, other) for _, _, other in selected), default=0.0)
+                score = self.mmr_lambda * relevance - (1 - self.mmr_lambda) * redundancy
+                if best_score is None or score > best_score:
+                    best, best_score = candidate, score
+            if best is None:
+                break
+            pool.remove(best)
+            rank, chunk, words = best
+            if costs[rank] > remaining:
+                # 다 들어가지 않으면 남은 예산만큼 앞부분 단락만 사용
+                text = self._truncate(chunk['text'], remaining - DOCUMENT_OVERHEAD_TOKENS)
+                if not text.strip():
+                    # 잘라낸 결과가 비면 빈 문서를 넣지 않고 다음 후보를 봄
+                    continue
+                chunk = dict(chunk, text=text)
+                costs[rank] = self.count_tokens(text) + DOCUMENT_OVERHEAD_TOKENS
+            selected.append((rank, chunk, words))
+            remaining -= costs[rank]
+        return [(rank, chunk) for rank, chunk, _ in selected], remaining
+
+    def _expand(self, selected: List[Tuple[int, dict]], neighbors: List[dict], remaining: int) -> List[Tuple[int, dict]]:
+        """
+        남은 예산 안에서, 선택된 청크의 앞뒤 인접 청크(neighbors)를 선택 순서대로 추가합니다.
+        추가된 청크는 원래 청크와 같은 순위를 가지며, 이후 병합 단계에서 하나의 문서로 합쳐집니다.
+        """
+        by_position = {(chunk.get('source'), chunk.get('chunk_id')): chunk for chunk in neighbors}
+        present = {(chunk.get('source'), chunk.get('chunk_id')) for _, chunk in selected}
+        expanded = list(selected)
+        for rank, chunk in selected:
+            if chunk.get('chunk_id') is None:
+                continue
+            for offset in (-1, 1):
+                key = (chunk.get('source'), chunk['chunk_id'] + offset)
+                neighbor = by_position.get(key)
+                if neighbor is None or key in present:
+                    continue
+                cost = self.count_tokens(neighbor['text'])
+                if cost > remaining:
+                    continue
+                present.add(key)
+                expanded.append((rank, neighbor))
+                remaining -= cost
+        return expanded
+
+    def _truncate(self, text: str, budget: int) -> str:
+        paragraphs = []
+        for paragraph in text.split(PARAGRAPH_SEPARATOR):
+            if self.count_tokens(PARAGRAPH_SEPARATOR.join(paragraphs + [paragraph])) > budget:
+                break
+            paragraphs.append(paragraph)
+        if paragraphs:
+            return PARAGRAPH_SEPARATOR.join(paragraphs)
+        # 첫 단락부터 예산을 넘으면 단어 단위로 자름
+        words = text.split(" ")
+        while words and self.count_tokens(" ".join(words)) > budget:
+            words = words[:len(words) * 3 // 4]
+        return " ".join(words)
+
+    @staticmethod
+    def _merge_neighbors(selected: List[Tuple[int, dict]]) -> List[PackedDocument]:
+        def position(item):
+            _, chunk = item
+            return (str(chunk.get('source')), chunk.get('chunk_id') if chunk.get('chunk_id') is not None else -1)
+
+        runs: List[List[Tuple[int, dict]]] = []
+        for item in sorted(selected, key=position):
+            chunk = item[1]
+            if runs and chunk.get('chunk_id') is not None:
+                previous = runs[-1][-1][1]
+                if (previous.get('source') == chunk.get('source') and previous.get('chunk_id') is not None
+                        and chunk['chunk_id'] == previous['chunk_id'] + 1):
+                    runs[-1].append(item)
+                    continue
+            runs.append([item])
+
+        documents = []
+        for run in runs:
+            text = run[0][1]['text']
+            for _, chunk in run[1:]:
+                text = _join_overlapping(text, chunk['text'])
+            pages = sorted({chunk['page'] for _, chunk in run if chunk.get('page') is not None})
+            documents.append(PackedDocument(
+                text=text,
+                source=run[0][1].get('source'),
+                pages=tuple(pages),
+                chunk_ids=tuple(chunk['chunk_id'] for _, chunk in run if chunk.get('chunk_id') is not None),
+                rank=min(rank for rank, _ in run),
+            ))
+        return sorted(documents, key=lambda document: document.rank)
+
+    def pack(self, chunks: List[dict], neighbors: Optional[List[dict]] = None
+             ) -> Tuple[List[PackedDocument], Dict[str, int]]:
+        """
+        순위순 청크 목록을 예산 안의 문서 목록으로 만들고, (문서 목록, 통계)를 반환합니다.
+        neighbors는 검색 결과의 앞뒤 인접 청크 목록(컨텍스트 확장)입니다.
+        """
+        candidates = self._deduplicate(chunks)
+        selected, remaining = self._select(candidates, len(chunks))
+        selected_count = len(selected)
+        if neighbors:
+            selected = self._expand(selected, neighbors, remaining)
+        documents = self._merge_neighbors(selected)
+        stats = {
+            "candidates": len(chunks),
+            "duplicates": len(chunks) - len(candidates),
+            "selected_chunks": selected_count,
+            "neighbor_chunks": len(selected) - selected_count,
+            "documents": len(documents),
+            "context_tokens": sum(self.count_tokens(document.text) for document in documents),
+            "candidate_tokens": sum(self.count_tokens(chunk['text']) for chunk in chunks),
+        }
+        return documents, stats
@@ -0,0 +1,192 @@
+# lambda/embedding_cache.py
+
+import hashlib
+import sqlite3
+import threading
+import time
+from array import array
+from typing import List, Optional
+
+from botocore.exceptions import ClientError
+
+# --- 상수 ---
+DEFAULT_MAX_ENTRIES = 100_000  # 캐시에 보관할 최대 임베딩 수
+DEFAULT_TRIM_INTERVAL_SECONDS = 24 * 3600  # S3 캐시 정리(trim) 최소 간격
+TRIM_MARKER_NAME = ".trim-marker"  # 마지막 정리 시각을 기록하는 S3 객체 이름 (prefix 아래)
+
+
+def _pack(vector: List[float]) -> bytes:
+    """임베딩 벡터를 float32 바이트열로 직렬화합니다 (JSON 대비 약 1/4 크기)."""
+    return array('f', vector).tobytes()
+
+
+def _unpack(data: bytes) -> List[float]:
+    vector = array('f')
+    vector.frombytes(data)
+    return vector.tolist()
+
+
+class SQLiteCacheBackend:
+    """
+    로컬 SQLite 파일 기반 캐시 저장소입니다. (테스트 및 로컬 실행용)
+    Lambda에서는 /tmp에 두면 웜 컨테이너가 살아있는 동안 재사용됩니다.
+    항목 수가 max_entries를 넘으면 가장 오래 사용되지 않은 항목부터 제거합니다 (LRU).
+    """
+
+    def __init__(self, path: str, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY,"
+            " vector BLOB NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON embeddings (last_access)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            row = self._conn.execute("SELECT vector FROM embeddings WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE embeddings SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            return row[0]
+
+    def put(self, key: str, data: bytes) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_access) VALUES (?, ?, ?)",
+                (key, data, time.time())
+            )
+            count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            overflow = count - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE key IN"
+                    " (SELECT key FROM embeddings ORDER BY last_access ASC LIMIT ?)",
+                    (overflow,)
+                )
+                self.evictions += overflow
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class S3CacheBackend:
+    """
+    S3 기반 캐시 저장소입니다. (운영용)
+    임베딩 하나를 <prefix><key> 객체 하나로 저장하므로 여러 Lambda 컨테이너가 캐시를 공유합니다.
+    S3에는 접근 시각이 없으므로, trim()은 LastModified 기준으로 오래된 객체부터 제거합니다.
+    trim()은 prefix 전체를 나열(LIST)하므로 마커 객체의 LastModified로 trim_interval에 한 번만 실행합니다.
+    (버킷 수명 주기 규칙으로 prefix에 만료 기간을 설정하는 것을 권장하며, 그 경우 trim_interval을 늘려도 됩니다.)
+    """
+
+    def __init__(self, s3_client, bucket: str, prefix: str = "embedding-cache/",
+                 max_entries: int = DEFAULT_MAX_ENTRIES, trim_interval: float = DEFAULT_TRIM_INTERVAL_SECONDS):
+        self.s3 = s3_client
+        self.bucket = bucket
+        self.prefix = prefix
+        self.max_entries = max_entries
+        self.trim_interval = trim_interval
+        self.marker_key = prefix + TRIM_MARKER_NAME
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            response = self.s3.get_object(Bucket=self.bucket, Key=self.prefix + key)
+        except self.s3.exceptions.NoSuchKey:
+            return None
+        return response['Body'].read()
+
+    def put(self, key: str, data: bytes) -> None:
+        self.s3.put_object(Bucket=self.bucket, Key=self.prefix + key, Body=data)
+
+    def trim_due(self) -> bool:
+        """마지막 정리 후 trim_interval이 지났는지 마커 객체로 확인합니다. (HEAD 요청 한 번)"""
+        try:
+            marker = self.s3.head_object(Bucket=self.bucket, Key=self.marker_key)
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return True
+            raise
+        return time.time() - marker['LastModified'].timestamp() >= self.trim_interval
+
+    def trim(self, force: bool = False) -> int:
+        """
+        max_entries를 초과한 만큼 가장 오래된 객체를 삭제하고, 삭제한 수를 반환합니다.
+        force가 아니면 trim_interval에 한 번만 실제로 나열/삭제합니다.
+        """
+        if not force and not self.trim_due():
+            return 0
+        # 나열하기 전에 마커를 갱신하여, 동시에 실행된 다른 컨테이너가 같은 정리를 반복하지 않도록 함
+        self.s3.put_object(Bucket=self.bucket, Key=self.marker_key, Body=b"")
+
+        objects = []
+        paginator = self.s3.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix):
+            objects.extend(obj for obj in page.get('Contents', []) if obj['Key'] != self.marker_key)
+
+        overflow = len(objects) - self.max_entries
+        if overflow <= 0:
+            return 0
+
+        objects.sort(key=lambda obj: obj['LastModified'])
+        stale = [{'Key': obj['Key']} for obj in objects[:overflow]]
+        for i in range(0, len(stale), 1000):  # delete_objects는 한 번에 최대 1000개
+            self.s3.delete_objects(Bucket=self.bucket, Delete={'Objects': stale[i:i + 1000]})
+        self.evictions += overflow
+        return overflow
+
+
+class EmbeddingCache:
+    """
+    (모델 ID, 차원, 청크 텍스트의 sha256)을 키로 하는 내용 주소 기반 임베딩 캐시입니다.
+    같은 텍스트를 다시 임베딩할 때 Bedrock 호출을 건너뛰며, 저장소(backend)는 교체할 수 있습니다.
+    """
+
+    def __init__(self, backend, model_id: str, dimension: int):
+        self.backend = backend
+        self.model_id = model_id
+        self.dimension = dimension
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def key(self, text: str) -> str:
+        digest = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        return f"{self.model_id}/{self.dimension}/{digest}"
+
+    def get(self, text: str) -> Optional[List[float]]:
+        data = self.backend.get(self.key(text))
+        with self._lock:
+            if data is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return None if data is None else _unpack(data)
+
+    def put(self, text: str, vector: List[float]) -> None:
+        self.backend.put(self.key(text), _pack(vector))
+
+    def get_or_compute(self, text: str, compute_fn) -> List[float]:
+        """캐시에 있으면 바로 반환하고, 없으면 compute_fn(text)로 계산한 뒤 저장합니다."""
+        vector = self.get(text)
+        if vector is None:
+            vector = compute_fn(text)
+            self.put(text, vector)
+        return vector
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "evictions": getattr(self.backend, 'evictions', 0),
+        }
@@ -0,0 +1,98 @@
+# lambda/embedding_engine.py
+
+import random
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import tracing
+from resilience import remaining
+
+# --- 상수 ---
+DEFAULT_MAX_IN_FLIGHT = 8  # 동시에 진행할 최대 Bedrock 요청 수
+DEFAULT_MAX_RETRIES = 6    # 스로틀링 시 최대 재시도 횟수
+BASE_BACKOFF_SECONDS = 0.2
+MAX_BACKOFF_SECONDS = 10.0
+
+# Bedrock이 요청량 초과 시 반환하는 오류 코드
+THROTTLING_ERROR_CODES = {
+    "ThrottlingException",
+    "TooManyRequestsException",
+    "ServiceUnavailableException",
+    "ModelNotReadyException",
+}
+
+
+def is_throttling_error(error: Exception) -> bool:
+    """botocore ClientError 형태의 예외가 스로틀링 오류인지 확인합니다."""
+    response = getattr(error, 'response', None) or {}
+    code = response.get('Error', {}).get('Code')
+    return code in THROTTLING_ERROR_CODES
+
+
+def call_with_backoff(fn, *args, max_retries: int = DEFAULT_MAX_RETRIES,
+                      base_delay: float = BASE_BACKOFF_SECONDS,
+                      max_delay: float = MAX_BACKOFF_SECONDS, sleep=time.sleep):
+    """
+    fn(*args)를 호출하고, 스로틀링 오류가 발생하면 지터가 적용된 지수 백오프로 재시도합니다.
+    (Full Jitter: 0 ~ min(max_delay, base_delay * 2^attempt) 사이에서 무작위 대기)
+    스로틀링이 아닌 오류나, 기다리면 요청의 마감 시각(resilience.deadline)을 넘는 경우는 즉시 다시 발생시킵니다.
+    """
+    attempt = 0
+    while True:
+        try:
+            return fn(*args)
+        except Exception as e:
+            if not is_throttling_error(e) or attempt >= max_retries:
+                raise
+            delay = random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+            left = remaining()
+            if left is not None and delay >= left:
+                raise
+            attempt += 1
+            sleep(delay)
+
+
+class EmbeddingExecutor:
+    """
+    동시 요청 수가 제한된 임베딩 실행기입니다.
+    입력 스트림(예: chunk_markdown 제너레이터)을 받아 여러 청크를 동시에 임베딩하고,
+    결과는 입력과 동일한 순서로 반환합니다.
+    """
+
+    def __init__(self, embed_fn, max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+                 max_retries: int = DEFAULT_MAX_RETRIES):
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1.")
+        self.embed_fn = embed_fn
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+
+    def _embed(self, text):
+        return call_with_backoff(self.embed_fn, text, max_retries=self.max_retries)
+
+    def map(self, items, text_of=None):
+        """
+        items의 각 항목을 임베딩하여 (항목, 임베딩 벡터)를 입력 순서대로 yield합니다.
+        text_of가 주어지면 항목에서 임베딩할 텍스트를 꺼내는 데 사용합니다.
+        입력은 지연 소비되며, 메모리에는 최대 2 * max_in_flight개의 항목만 대기합니다.
+        """
+        text_of = text_of or (lambda item: item)
+        window = self.max_in_flight * 2  # 앞선 결과를 기다리는 동안에도 워커가 쉬지 않도록 여유를 둠
+
+        # 워커 스레드의 Bedrock 호출(bedrock.embed span)이 호출한 쪽의 trace에 기록되도록 컨텍스트를 넘김
+        embed = tracing.bind(self._embed)
+        pool = ThreadPoolExecutor(max_workers=self.max_in_flight)
+        pending = deque()
+        try:
+            for item in items:
+                pending.append((item, pool.submit(embed, text_of(item))))
+                if len(pending) >= window:
+                    head_item, future = pending.popleft()
+                    yield head_item, future.result()
+            while pending:
+                head_item, future = pending.popleft()
+                yield head_item, future.result()
+        finally:
+            # 오류 또는 소비 중단 시 아직 시작되지 않은 요청은 취소
+            pool.shutdown(wait=True, cancel_futures=True)
@@ -2,16 +2,24 @@
 
 import json
 import os
-import boto3
 import urllib.parse
 import re
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 
 # pymupdf4llm, opensearch-py는 Lambda Layer 또는 배포 패키지에 포함되어야 합니다.
-# pymupdf4llm is used for high-quality, structure-aware PDF to Markdown conversion.
-# opensearch-py is the official Python client for OpenSearch.
-import pymupdf4llm
-from opensearchpy import OpenSearch, RequestsHttpConnection, AWSV4SignerAuth
-from opensearchpy.helpers import bulk
+# pymupdf4llm is used for high-quality, structure-aware PDF to Markdown conversion (see pdf_converter.py).
+# opensearch-py is the official Python client for OpenSearch (clients.py에서 생성).
+import clients
+import tracing
+from chunker import chunk_pages
+from embedding_cache import EmbeddingCache, SQLiteCacheBackend, S3CacheBackend
+from embedding_service import EmbeddingService
+from indexing import (METADATA_FIELDS, BulkIndexer, ReindexPlanner, assign_document_ids, fetch_indexed_documents,
+                      link_neighbors)
+from manual_catalog import DEFAULT_CATALOG_KEY, content_version, register_manuals
+from pdf_converter import available_cpus, iter_page_chunks
+from vector_format import encode_vector, ensure_index, vector_config_from_env
 
 # --- 환경 변수 ---
 # 이 값들은 Lambda 함수 설정에서 환경 변수로 지정해야 합니다.
@@ -19,180 +27,223 @@ OPENSEARCH_HOST = os.environ['OPENSEARCH_HOST']         # OpenSearch Serverless
 OPENSEARCH_INDEX = os.environ['OPENSEARCH_INDEX']       # OpenSearch 인덱스 이름
 BEDROCK_MODEL_ID = os.environ.get('BEDROCK_MODEL_ID', 'amazon.titan-embed-text-v1') # Bedrock Embedding 모델 ID
 AWS_REGION = os.environ.get('AWS_REGION') # Lambda 실행 환경에서 자동으로 설정됨
+# EMBEDDING_DIMENSION, VECTOR_QUANTIZATION, KNN_SPACE_TYPE: 벡터 차원/양자화/거리 함수 (vector_format.py 참고)
+VECTOR_CONFIG = vector_config_from_env('BEDROCK_MODEL_ID')
+EMBEDDING_CACHE_BACKEND = os.environ.get('EMBEDDING_CACHE_BACKEND', 'none') # 'none', 'sqlite', 's3'
+EMBEDDING_CACHE_PATH = os.environ.get('EMBEDDING_CACHE_PATH', '/tmp/embedding_cache.sqlite3') # sqlite 캐시 파일 경로
+EMBEDDING_CACHE_BUCKET = os.environ.get('EMBEDDING_CACHE_BUCKET') # s3 캐시 버킷
+EMBEDDING_CACHE_PREFIX = os.environ.get('EMBEDDING_CACHE_PREFIX', 'embedding-cache/') # s3 캐시 키 접두사
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.environ.get('EMBEDDING_CACHE_MAX_ENTRIES', '100000')) # 캐시 최대 항목 수
+EMBEDDING_CACHE_TRIM_INTERVAL_SECONDS = float(os.environ.get('EMBEDDING_CACHE_TRIM_INTERVAL_SECONDS', '86400')) # s3 캐시 정리 최소 간격(초)
+MANUAL_CATALOG_BUCKET = os.environ.get('MANUAL_CATALOG_BUCKET') # 매뉴얼 카탈로그 버킷 (기본값: PDF가 업로드된 버킷)
+MANUAL_CATALOG_KEY = os.environ.get('MANUAL_CATALOG_KEY', DEFAULT_CATALOG_KEY) # 매뉴얼 카탈로그 객체 키
+TRACE_SINK = os.environ.get('TRACE_SINK', 'emf').lower() # 객체별 단계 지표 출력: 'emf', 'memory', 'none'
+METRICS_NAMESPACE = os.environ.get('METRICS_NAMESPACE', tracing.DEFAULT_NAMESPACE) # CloudWatch 지표 네임스페이스
 
 # --- 상수 ---
-MAX_CHUNK_SIZE = 1000 # 청크의 최대 문자 수
+CHUNK_MAX_SIZE = int(os.environ.get('CHUNK_MAX_SIZE', '1000')) # 청크의 최대 크기 (CHUNK_SIZE_UNIT 단위)
+CHUNK_SIZE_UNIT = os.environ.get('CHUNK_SIZE_UNIT', 'chars') # 'chars'(문자 수) 또는 'tokens'(토큰 수)
+CHUNK_OVERLAP = int(os.environ.get('CHUNK_OVERLAP', '0')) # 인접 청크 간 겹치는 크기 (단락 단위로 적용)
+EMBEDDING_MAX_IN_FLIGHT = int(os.environ.get('EMBEDDING_MAX_IN_FLIGHT', '8')) # 동시에 진행할 최대 임베딩 요청 수
+BULK_MAX_DOCS = int(os.environ.get('BULK_MAX_DOCS', '500')) # bulk 배치당 최대 문서 수
+BULK_MAX_BYTES = int(os.environ.get('BULK_MAX_BYTES', str(10 * 1024 * 1024))) # bulk 배치당 최대 바이트 수
+INGEST_MAX_WORKERS = int(os.environ.get('INGEST_MAX_WORKERS', '4')) # 한 이벤트에서 동시에 처리할 최대 S3 객체 수
+PDF_PAGES_PER_RANGE = int(os.environ.get('PDF_PAGES_PER_RANGE', '8')) # PDF 변환 워커 하나가 한 번에 변환할 페이지 수
+# OpenSearch 요청 하나의 제한 시간(초). 색인은 사용자가 기다리는 요청이 아니므로 검색 Lambda의 마감 시간
+# (REQUEST_DEADLINE_SECONDS) 정책을 따르지 않으며, 최대 BULK_MAX_BYTES 크기의 bulk 요청이 끝날 때까지 기다림
+OPENSEARCH_TIMEOUT = float(os.environ.get('OPENSEARCH_TIMEOUT', '300'))
+
+tracing.set_sink(tracing.create_sink(TRACE_SINK, METRICS_NAMESPACE))
+# 연결 풀/재시도 설정 (CLIENT_MAX_POOL_CONNECTIONS, CLIENT_TCP_KEEPALIVE, AWS_RETRY_MODE, AWS_MAX_ATTEMPTS)
+# 풀 크기 기본값은 동시에 처리하는 객체 수 x 객체당 동시 임베딩 요청 수 (S3 다운로드도 객체당 최대 10개 연결 사용)
+CLIENT_CONFIG = clients.client_config_from_env(
+    AWS_REGION, default_pool_connections=max(clients.DEFAULT_MAX_POOL_CONNECTIONS,
+                                             INGEST_MAX_WORKERS * EMBEDDING_MAX_IN_FLIGHT))
 
 # --- AWS 클라이언트 초기화 ---
-s3 = boto3.client('s3')
-bedrock = boto3.client('bedrock-runtime')
-
-# OpenSearch 클라이언트 설정 (IAM 인증 사용)
-credentials = boto3.Session().get_credentials()
-auth = AWSV4SignerAuth(credentials, AWS_REGION, 'aoss') # 'aoss'는 OpenSearch Serverless를 의미
-
-opensearch_client = OpenSearch(
-    hosts=[{'host': OPENSEARCH_HOST, 'port': 443}],
-    http_auth=auth, # IAM 인증을 위해 AWSV4SignerAuth 객체 사용
-    use_ssl=True,
-    verify_certs=True,
-    connection_class=RequestsHttpConnection,
-    http_compress=True,
-    timeout=300
-)
-
-def chunk_markdown(page_chunks):
+# 모듈 전역으로 한 번만 만들어 웜 컨테이너의 호출 사이에도 연결을 재사용
+s3 = clients.boto3_client('s3', CLIENT_CONFIG)
+bedrock = clients.boto3_client('bedrock-runtime', CLIENT_CONFIG)
+
+# OpenSearch 클라이언트 설정 (IAM(SigV4) 인증, 'aoss'는 OpenSearch Serverless를 의미)
+opensearch_client = clients.opensearch_client(OPENSEARCH_HOST, CLIENT_CONFIG, service='aoss',
+                                               timeout=OPENSEARCH_TIMEOUT)
+
+# 임베딩 캐시 설정 (재업로드 시 변경되지 않은 청크는 Bedrock 호출 생략)
+embedding_cache = None
+if EMBEDDING_CACHE_BACKEND == 'sqlite':
+    embedding_cache = EmbeddingCache(
+        SQLiteCacheBackend(EMBEDDING_CACHE_PATH, max_entries=EMBEDDING_CACHE_MAX_ENTRIES),
+        BEDROCK_MODEL_ID, VECTOR_CONFIG.dimension
+    )
+elif EMBEDDING_CACHE_BACKEND == 's3':
+    embedding_cache = EmbeddingCache(
+        S3CacheBackend(s3, EMBEDDING_CACHE_BUCKET, EMBEDDING_CACHE_PREFIX, max_entries=EMBEDDING_CACHE_MAX_ENTRIES,
+                       trim_interval=EMBEDDING_CACHE_TRIM_INTERVAL_SECONDS),
+        BEDROCK_MODEL_ID, VECTOR_CONFIG.dimension
+    )
+
+# 임베딩 서비스 (검색 Lambda와 같은 모듈 사용, 캐시에 있으면 Bedrock을 호출하지 않음)
+embedding_service = EmbeddingService(bedrock, VECTOR_CONFIG, cache=embedding_cache,
+                                     max_in_flight=EMBEDDING_MAX_IN_FLIGHT)
+
+def iter_chunk_records(page_chunks):
     """
-    페이지 청크 목록을 받아, 각 페이지의 텍스트를 더 작은 청크로 분할합니다.
-    헤더(h1~h6) 기준으로 1차 청킹하고, 각 청크가 MAX_CHUNK_SIZE를 초과하면
-    단락(이중 개행) 기준으로 2차 청킹합니다.
-    (청크, 페이지 번호)를 yield합니다.
+    페이지 청크 스트림을 청크 레코드({'text', 'page', 'chunk_id'})로 변환하여 yield합니다.
+    본문에 인쇄된 페이지 번호(**-N-**)가 있으면 PDF 페이지 번호보다 우선합니다.
     """
-    for page_chunk in page_chunks:
-        page_num = page_chunk.get("metadata", {}).get("page_number", 0)
-        text = page_chunk.get("text", "")
-        if not text.strip():
-            continue
-
-        split_pattern = r'(^(#){1,6} .*)'
-        headers = list(re.finditer(split_pattern, text, re.MULTILINE))
-        
-        initial_chunks = []
+    last_text_page_num = None # 마지막으로 텍스트에서 발견된 페이지 번호
+
+    chunks = chunk_pages(page_chunks, max_size=CHUNK_MAX_SIZE, unit=CHUNK_SIZE_UNIT, overlap=CHUNK_OVERLAP)
+    for chunk_id, (chunk, page_num_from_pdf, _header_path) in enumerate(chunks):
+        page_match = re.search(r'\*\*-(\d+)-\*\*', chunk)
+        effective_page_num = 0
 
-        if not headers:
-            initial_chunks.append(text)
+        if page_match:
+            # 텍스트에서 페이지 번호 패턴 발견
+            page_from_text = int(page_match.group(1))
+            last_text_page_num = page_from_text
+            effective_page_num = page_from_text
+        elif last_text_page_num is not None:
+            # 텍스트에서 패턴이 없으면 마지막으로 발견된 번호 사용
+            effective_page_num = last_text_page_num
         else:
-            first_header_start = headers[0].start()
-            if first_header_start > 0:
-                initial_chunks.append(text[:first_header_start].strip())
-
-            for i in range(len(headers)):
-                header_start = headers[i].start()
-                next_chunk_start = headers[i+1].start() if i + 1 < len(headers) else len(text)
-                chunk_content = text[header_start:next_chunk_start].strip()
-                initial_chunks.append(chunk_content)
-
-        for chunk in initial_chunks:
-            if not chunk:
-                continue
-
-            if len(chunk) > MAX_CHUNK_SIZE:
-                paragraph_splits = chunk.split("\n\n")
-                current_sub_chunk = ""
-                for paragraph in paragraph_splits:
-                    if not paragraph.strip():
-                        continue
-                    if len(current_sub_chunk) + len(paragraph) + 2 > MAX_CHUNK_SIZE and current_sub_chunk:
-                        yield (current_sub_chunk.strip(), page_num)
-                        current_sub_chunk = paragraph.strip()
-                    else:
-                        if current_sub_chunk:
-                            current_sub_chunk += "\n\n" + paragraph.strip()
-                        else:
-                            current_sub_chunk = paragraph.strip()
-                if current_sub_chunk:
-                    yield (current_sub_chunk.strip(), page_num)
-            else:
-                yield (chunk, page_num)
-
-def get_embedding(text):
-    """Bedrock을 호출하여 주어진 텍스트의 임베딩 벡터를 생성합니다."""
-    body = json.dumps({"inputText": text})
-    response = bedrock.invoke_model(
-        body=body,
-        modelId=BEDROCK_MODEL_ID,
-        accept='application/json',
-        contentType='application/json'
-    )
-    response_body = json.loads(response['body'].read())
-    return response_body['embedding']
+            # 텍스트에서 페이지 번호를 한 번도 찾지 못했다면 PDF에서 추출한 번호 사용
+            effective_page_num = page_num_from_pdf
 
-def lambda_handler(event, context):
+        yield {"text": chunk, "page": effective_page_num, "chunk_id": chunk_id}
+
+def iter_s3_objects(event):
     """
-    S3에 PDF 파일이 업로드되면 트리거되는 Lambda 핸들러입니다.
+    이벤트에 포함된 모든 S3 객체를 (항목 ID, 버킷, 키) 형태로 yield합니다.
+    S3 이벤트를 직접 받는 경우와, SQS 큐를 거쳐 받는 경우(레코드 body가 S3 이벤트 JSON)를 모두 지원합니다.
+    SQS 경우의 항목 ID는 메시지 ID이며, 부분 실패 보고(batchItemFailures)에 사용됩니다.
+    """
+    for record in event.get('Records', []):
+        if 'body' in record:
+            # SQS 메시지: body 안에 S3 이벤트가 들어 있음 (s3:TestEvent는 Records가 없으므로 건너뜀)
+            inner_records = json.loads(record['body']).get('Records', [])
+            item_id = record.get('messageId')
+        else:
+            inner_records = [record]
+            item_id = None
+        for inner in inner_records:
+            s3_event = inner['s3']
+            bucket_name = s3_event['bucket']['name']
+            object_key = urllib.parse.unquote_plus(s3_event['object']['key'], encoding='utf-8')
+            yield item_id, bucket_name, object_key
+
+def process_object(bucket_name, object_key, pdf_workers=None):
+    """S3 객체(PDF) 하나를 처리하고, 단계별 소요 시간과 처리 건수를 객체별 trace로 기록합니다."""
+    with tracing.trace("ingest", source=object_key) as trace:
+        response = _process_object(bucket_name, object_key, pdf_workers)
+        trace.attributes["status_code"] = response['statusCode']
+        return response
+
+def _process_object(bucket_name, object_key, pdf_workers=None):
+    """
+    S3 객체(PDF) 하나를 처리합니다.
     1. S3에서 PDF 파일 다운로드
-    2. PDF를 구조화된 마크다운으로 변환 (pymupdf4llm 사용)
-    3. 마크다운 텍스트를 청크로 분할
-    4. 각 청크를 임베딩하여 OpenSearch에 저장
+    2. PDF를 페이지 범위별로 병렬 변환하여 구조화된 마크다운으로 변환 (pymupdf4llm 사용)
+    3. 변환된 페이지부터 바로 청크로 분할하고 결정적인 문서 ID 부여
+    4. 이미 색인된 문서와 비교하여 새로 생기거나 바뀐 청크만 임베딩하여 저장하고,
+       사라진 청크는 삭제
     """
-    print("Lambda handler started.")
-    
-    # 1. S3 이벤트에서 버킷 이름과 파일 키 추출
-    s3_event = event['Records'][0]['s3']
-    bucket_name = s3_event['bucket']['name']
-    object_key = urllib.parse.unquote_plus(s3_event['object']['key'], encoding='utf-8')
-    
     print(f"Processing file: s3://{bucket_name}/{object_key}")
 
-    # Lambda의 임시 저장 공간에 파일을 저장할 경로
-    temp_pdf_path = f"/tmp/{os.path.basename(object_key)}"
+    # Lambda의 임시 저장 공간에 파일을 저장할 경로 (동시에 처리하는 객체끼리 이름이 겹치지 않도록 고유 파일 사용)
+    fd, temp_pdf_path = tempfile.mkstemp(suffix=".pdf", dir="/tmp")
+    os.close(fd)
 
     try:
         # 2. S3에서 PDF 파일을 다운로드하여 임시 파일로 저장
-        s3.download_file(bucket_name, object_key, temp_pdf_path)
+        with tracing.span("s3.download", kind="s3"):
+            s3.download_file(bucket_name, object_key, temp_pdf_path)
+            tracing.annotate(object_bytes=os.path.getsize(temp_pdf_path))
         
-        # 3. PDF를 페이지별 청크로 변환
-        page_chunks = pymupdf4llm.to_markdown(temp_pdf_path, page_chunks=True)
-        
-        if not page_chunks:
-            print("No text could be extracted from the PDF.")
-            return {'statusCode': 200, 'body': json.dumps('No text extracted.')}
-
-        # 4. 각 페이지 청크를 더 작은 단위로 분할하고 OpenSearch에 저장
-        actions = []
-        chunk_id_counter = 0
-        text_chunks_generator = chunk_markdown(page_chunks)
-        last_text_page_num = None # 마지막으로 텍스트에서 발견된 페이지 번호
-
-        for chunk, page_num_from_pdf in text_chunks_generator:
-            vector = get_embedding(chunk)
-            
-            page_match = re.search(r'\*\*-(\d+)-\*\*', chunk)
-            effective_page_num = 0
-
-            if page_match:
-                # 텍스트에서 페이지 번호 패턴 발견
-                page_from_text = int(page_match.group(1))
-                last_text_page_num = page_from_text
-                effective_page_num = page_from_text
-            elif last_text_page_num is not None:
-                # 텍스트에서 패턴이 없으면 마지막으로 발견된 번호 사용
-                effective_page_num = last_text_page_num
-            else:
-                # 텍스트에서 페이지 번호를 한 번도 찾지 못했다면 PDF에서 추출한 번호 사용
-                effective_page_num = page_num_from_pdf
-
-            action = {
-                "_index": OPENSEARCH_INDEX,
-                "_source": {
-                    "text": chunk,
-                    "source": object_key,
-                    "page": effective_page_num,
-                    "chunk_id": chunk_id_counter,
-                    "embedding": vector
-                }
-            }
-            actions.append(action)
-            chunk_id_counter += 1
+        # 3. 이미 색인된 해당 소스의 문서 조회 (변경분 계산 기준)
+        with tracing.span("opensearch.fetch_indexed", kind="opensearch"):
+            existing = fetch_indexed_documents(opensearch_client, OPENSEARCH_INDEX, object_key)
+            tracing.annotate(documents=len(existing))
+        planner = ReindexPlanner(existing)
 
-        print(f"Extracted and chunked into {len(actions)} markdown chunks.")
+        # 4. PDF를 페이지 범위 단위로 병렬 변환하고, 변환된 페이지부터 바로 청크로 분할하여 ID 부여
+        page_chunks = iter_page_chunks(temp_pdf_path, workers=pdf_workers, pages_per_range=PDF_PAGES_PER_RANGE)
+        records = link_neighbors(assign_document_ids(object_key, iter_chunk_records(page_chunks)))
 
-        if not actions:
-            print("No chunks were generated.")
-            return {'statusCode': 200, 'body': json.dumps('No chunks generated.')}
+        # 5. 임베딩이 도착하는 대로 배치 단위로 OpenSearch에 반영 (메모리에는 배치 하나 분량만 유지)
+        # 변환, 청킹, 임베딩, bulk 색인이 스트리밍으로 겹쳐 진행되므로 하나의 span(index)으로 기록
+        with tracing.span("index", kind="stage") as index_span, \
+                BulkIndexer(opensearch_client, max_docs=BULK_MAX_DOCS, max_bytes=BULK_MAX_BYTES) as indexer:
 
-        # 5. Bulk API를 사용하여 OpenSearch에 저장
-        success, failed = bulk(opensearch_client, actions)
-        
-        print(f"Successfully indexed {success} documents.")
-        if failed:
-            print(f"Failed to index {len(failed)} documents.")
-            for item in failed:
+            def records_to_embed():
+                """새로 생기거나 바뀐 청크만 임베딩 대상으로 넘기고, 위치만 바뀐 청크는 메타데이터만 갱신"""
+                for record in records:
+                    decision = planner.classify(record)
+                    if decision == ReindexPlanner.INDEX:
+                        yield record
+                    elif decision == ReindexPlanner.UPDATE:
+                        indexer.add({
+                            "_op_type": "update",
+                            "_index": OPENSEARCH_INDEX,
+                            "_id": record['_id'],
+                            "doc": {field: record[field] for field in METADATA_FIELDS}
+                        })
+
+            # 동시에 임베딩하되, 결과는 청크 순서대로 받음
+            for record, vector in embedding_service.embed_batch(records_to_embed(), text_of=lambda r: r['text']):
+                indexer.add({
+                    "_op_type": "index",
+                    "_index": OPENSEARCH_INDEX,
+                    "_id": record['_id'],
+                    "_source": {
+                        "text": record['text'],
+                        "source": object_key,
+                        "page": record['page'],
+                        "chunk_id": record['chunk_id'],
+                        "prev_id": record['prev_id'],
+                        "next_id": record['next_id'],
+                        "embedding": encode_vector(VECTOR_CONFIG, vector)
+                    }
+                })
+
+            print(f"Extracted and chunked into {planner.total} markdown chunks. Re-index plan: {planner.counts}")
+
+            # 더 이상 존재하지 않는 청크는 같은 bulk 흐름에서 삭제
+            # (청크가 하나도 생성되지 않았으면 이 소스로 색인된 문서 전체가 대상)
+            stale_ids = planner.stale_ids()
+            for doc_id in stale_ids:
+                indexer.add({"_op_type": "delete", "_index": OPENSEARCH_INDEX, "_id": doc_id})
+
+        print(f"Bulk indexing finished: {indexer.batches} batches, "
+              f"{indexer.succeeded} succeeded, {indexer.failed} failed.")
+        index_span.set(chunks=planner.total, indexed=planner.counts[ReindexPlanner.INDEX],
+                       updated=planner.counts[ReindexPlanner.UPDATE], deleted=len(stale_ids),
+                       bulk_batches=indexer.batches, failed=indexer.failed)
+        if indexer.failed:
+            for item in indexer.failed_items:
                 print(f"Failed item: {item}")
+            # 문서 ID가 결정적이므로 재시도 시 실패한 청크만 다시 처리됨
+            return {
+                'statusCode': 500,
+                'body': json.dumps(f'Partially indexed {object_key}: {indexer.succeeded} succeeded, '
+                                   f'{indexer.failed} failed.')
+            }
+
+        if not planner.total:
+            print("No chunks were generated.")
+            return {'statusCode': 200, 'body': json.dumps(f'No chunks generated. {len(stale_ids)} deleted.')}
 
         return {
             'statusCode': 200,
-            'body': json.dumps(f'Successfully processed and indexed {success} chunks from {object_key}.')
+            'body': json.dumps(f'Successfully processed {object_key}: {planner.counts[ReindexPlanner.INDEX]} indexed, '
+                               f'{planner.counts[ReindexPlanner.UPDATE]} updated, {len(stale_ids)} deleted.'),
+            # 색인이 끝난 매뉴얼을 카탈로그에 등록하기 위한 정보
+            'catalog_entry': {
+                'source': object_key,
+                'index_version': content_version(planner.seen_ids),
+                'chunks': planner.total
+            }
         }
 
     except Exception as e:
@@ -209,20 +260,113 @@ def lambda_handler(event, context):
             os.remove(temp_pdf_path)
             print(f"Removed temporary file: {temp_pdf_path}")
 
+def update_manual_catalog(objects, responses):
+    """
+    색인에 성공한 매뉴얼들을 버킷별로 모아 카탈로그 manifest에 한 번에 등록합니다.
+    검색 Lambda는 버킷 전체를 나열하는 대신 이 manifest를 읽어 매뉴얼 목록과 별칭을 얻습니다.
+    """
+    updates_by_bucket = {}
+    for (_item_id, bucket_name, _object_key), response in zip(objects, responses):
+        if 'catalog_entry' in response:
+            catalog_bucket = MANUAL_CATALOG_BUCKET or bucket_name
+            updates_by_bucket.setdefault(catalog_bucket, []).append(response['catalog_entry'])
+    for catalog_bucket, updates in updates_by_bucket.items():
+        try:
+            register_manuals(s3, catalog_bucket, updates, key=MANUAL_CATALOG_KEY)
+        except Exception as e:
+            # 카탈로그 갱신 실패가 색인 결과를 되돌리지는 않음 (다음 업로드 때 다시 등록됨)
+            print(f"Error updating manual catalog in {catalog_bucket}: {e}")
+
+_index_checked = False
+
+def _ensure_index_once():
+    """컨테이너당 한 번, 인덱스가 없으면 VECTOR_CONFIG에 맞는 매핑으로 생성합니다."""
+    global _index_checked
+    if not _index_checked:
+        ensure_index(opensearch_client, OPENSEARCH_INDEX, VECTOR_CONFIG)
+        _index_checked = True
+
+def lambda_handler(event, context):
+    """
+    S3에 PDF 파일이 업로드되면 트리거되는 Lambda 핸들러입니다.
+    이벤트에 포함된 모든 객체를 최대 INGEST_MAX_WORKERS개씩 동시에 처리하고,
+    객체별 성공/실패 요약을 반환합니다. SQS를 거쳐 호출된 경우 실패한 메시지만
+    batchItemFailures로 보고하여 해당 객체만 재시도되도록 합니다.
+    """
+    print("Lambda handler started.")
+    _ensure_index_once()
+
+    # 카탈로그 manifest 자체의 업로드 이벤트는 처리하지 않음
+    objects = [obj for obj in iter_s3_objects(event) if obj[2] != MANUAL_CATALOG_KEY]
+    if not objects:
+        print("No S3 objects in event.")
+        return {'statusCode': 200, 'body': json.dumps({'results': []}), 'batchItemFailures': []}
+
+    workers = max(1, min(INGEST_MAX_WORKERS, len(objects)))
+    # 동시에 처리하는 객체들이 vCPU를 나누어 PDF 변환에 사용
+    pdf_workers = max(1, available_cpus() // workers)
+    print(f"Processing {len(objects)} objects with {workers} workers ({pdf_workers} PDF workers each).")
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        responses = list(pool.map(
+            lambda obj: process_object(obj[1], obj[2], pdf_workers),
+            objects
+        ))
+
+    results = []
+    failed_item_ids = []
+    for (item_id, bucket_name, object_key), response in zip(objects, responses):
+        succeeded = response['statusCode'] == 200
+        results.append({
+            'bucket': bucket_name,
+            'key': object_key,
+            'status': 'succeeded' if succeeded else 'failed',
+            'message': json.loads(response['body'])
+        })
+        if not succeeded and item_id and item_id not in failed_item_ids:
+            failed_item_ids.append(item_id)
+
+    print(json.dumps({"embedding_service": embedding_service.stats()}))
+    print(json.dumps({"connection_pools": clients.pool_stats()}))
+    if embedding_cache is not None:
+        print(f"Embedding cache stats: {embedding_cache.stats()}")
+        if isinstance(embedding_cache.backend, S3CacheBackend):
+            embedding_cache.backend.trim()
+
+    update_manual_catalog(objects, responses)
+
+    failed_count = sum(1 for result in results if result['status'] == 'failed')
+    print(f"Processed {len(results)} objects: {len(results) - failed_count} succeeded, {failed_count} failed.")
+
+    return {
+        'statusCode': 200 if not failed_count else 500,
+        'body': json.dumps({'results': results}, ensure_ascii=False),
+        # SQS 이벤트 소스 매핑에서 ReportBatchItemFailures를 켜면 이 메시지들만 다시 전달됨
+        'batchItemFailures': [{'itemIdentifier': item_id} for item_id in failed_item_ids]
+    }
+
 # --- 필수 설정 및 권한 ---
 #
 # 1.  **Lambda 환경 변수**:
 #     - `OPENSEARCH_HOST`, `OPENSEARCH_INDEX`, `BEDROCK_MODEL_ID`
+#     - 여러 매뉴얼을 한 번에 업로드할 때 실패한 객체만 재시도하려면, S3 이벤트를 SQS 큐로 보내고
+#       SQS 이벤트 소스 매핑에서 `ReportBatchItemFailures`를 활성화합니다. (`INGEST_MAX_WORKERS`로 동시 처리 수 조절)
 #
 # 2.  **Lambda 실행 역할 (IAM Role) 권한**:
 #     - S3 읽기, Bedrock 호출, OpenSearch 쓰기, CloudWatch 쓰기 권한.
+#     - 매뉴얼 카탈로그(`MANUAL_CATALOG_KEY`, 기본값 `catalog/manuals.json`) 객체의 S3 쓰기(`s3:PutObject`) 권한.
+#       S3 이벤트 알림에는 접미사 `.pdf` 필터를 거는 것을 권장합니다.
 #
 # 3.  **Lambda 배포 패키지 / Layer (매우 중요)**:
 #     - 이 코드는 `pymupdf4llm`과 `opensearch-py` 라이브러리를 사용합니다.
 #     - `opensearch-py`는 순수 Python 라이브러리이지만, `pymupdf4llm`은 C 라이브러리(`MuPDF`)에 의존하는 `PyMuPDF`를 필요로 합니다.
 #     - 따라서, **Amazon Linux 2 환경에 맞춰 컴파일된 `PyMuPDF` 바이너리를 포함한 Layer를 생성해야 합니다.**
 #     - 일반적인 `pip install`로는 로컬 환경(macOS, Windows)에 맞는 바이너리가 설치되므로, Lambda에서 동작하지 않습니다. Docker 등을 사용하여 Lambda와 동일한 환경에서 빌드하는 과정이 필요할 수 있습니다.
+#     - 배포 패키지에는 `lambda/`의 파일만 넣습니다. 벤치마크와 가짜 Bedrock/OpenSearch(`bench/`), 테스트(`tests/`)는 저장소 최상위에 있어 포함되지 않습니다.
 #
 # 4.  **OpenSearch 인덱스 설정**:
-#     - 이전과 동일하게 k-NN 검색을 위한 인덱스를 미리 생성해야 합니다.
-#       (embedding 필드, dimension: 1536 등)
+#     - 인덱스가 없으면 첫 호출 시 `EMBEDDING_DIMENSION`, `VECTOR_QUANTIZATION`, `KNN_SPACE_TYPE`에 맞게 자동으로 생성합니다.
+#       (매핑은 vector_format.build_index_body 참고. 이미 있는 인덱스의 차원/양자화는 바뀌지 않으므로,
+#        설정을 바꿀 때는 새 인덱스 이름을 지정하고 매뉴얼을 다시 업로드합니다.)
+#     - 재색인 시 소스별 기존 문서를 `source` 필드의 term 쿼리로 조회하므로,
+#       `source`는 keyword 타입, `chunk_id`는 정렬 가능한 integer 타입이어야 합니다.
@@ -0,0 +1,157 @@
+# lambda/embedding_service.py
+
+import bisect
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, List, Optional
+
+import tracing
+from embedding_engine import DEFAULT_MAX_IN_FLIGHT, DEFAULT_MAX_RETRIES, EmbeddingExecutor, call_with_backoff
+from vector_format import VectorConfig, embedding_request_body
+
+# --- 상수 ---
+DEFAULT_QUERY_CACHE_SIZE = 1024  # 질문 임베딩 LRU의 최대 항목 수
+# 지연 시간 히스토그램 버킷 상한(ms). 마지막 버킷은 상한 없음
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+def normalize_query(text: str) -> str:
+    """질문 임베딩 LRU의 키로 사용할 수 있도록 공백 차이를 없앱니다. (정규화된 텍스트를 그대로 임베딩)"""
+    return " ".join(text.split())
+
+
+class LatencyHistogram:
+    """고정 버킷 지연 시간 히스토그램입니다. 백분위수는 해당 버킷의 상한으로 근사합니다."""
+
+    def __init__(self, buckets_ms=LATENCY_BUCKETS_MS):
+        self.buckets_ms = tuple(buckets_ms)
+        self.counts = [0] * (len(self.buckets_ms) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        ms = seconds * 1000
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets_ms, ms)] += 1
+            self.count += 1
+            self.total_ms += ms
+            self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.count:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for i, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                return float(self.buckets_ms[i]) if i < len(self.buckets_ms) else self.max_ms
+        return self.max_ms
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total_ms / self.count, 2) if self.count else None,
+            "p50_ms": self.percentile(0.50),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "max_ms": round(self.max_ms, 2),
+            "buckets": {f"le_{bound}": count for bound, count in zip(self.buckets_ms, self.counts)},
+            "buckets_overflow": self.counts[-1],
+        }
+
+
+class EmbeddingService:
+    """
+    색인/검색 Lambda가 함께 사용하는 임베딩 서비스입니다.
+    - embed(text): 질문 임베딩. (모델, 정규화된 텍스트) 키의 프로세스 내 LRU로 반복 질문의 Bedrock 호출을 생략
+    - embed_batch(items): 청크 임베딩. EmbeddingExecutor로 동시 요청 수를 제한하며 입력 순서대로 결과 반환
+    - 영구 임베딩 캐시(EmbeddingCache)가 주어지면 Bedrock 호출 전에 조회
+    - Bedrock 호출과 embed 호출의 지연 시간을 히스토그램으로 집계
+    반환하는 벡터는 모델 출력 그대로(float)이며, 저장/검색 형태로의 변환(encode_vector)은 호출하는 쪽에서 합니다.
+    """
+
+    def __init__(self, client, config: VectorConfig, cache=None,
+                 query_cache_size: int = DEFAULT_QUERY_CACHE_SIZE,
+                 max_in_flight: int = DEFAULT_MAX_IN_FLIGHT, max_retries: int = DEFAULT_MAX_RETRIES):
+        self.client = client
+        self.config = config
+        self.cache = cache
+        self.query_cache_size = query_cache_size
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self._query_cache: "OrderedDict[tuple, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.query_hits = 0
+        self.query_misses = 0
+        self.bedrock_latency = LatencyHistogram()
+        self.embed_latency = LatencyHistogram()
+
+    def _invoke(self, text: str) -> List[float]:
+        """Bedrock을 호출하여 주어진 텍스트의 임베딩 벡터를 생성합니다."""
+        with tracing.span("bedrock.embed", kind="bedrock"):
+            start = time.perf_counter()
+            response = self.client.invoke_model(
+                body=embedding_request_body(self.config, text),
+                modelId=self.config.model_id,
+                accept='application/json',
+                contentType='application/json'
+            )
+            response_body = json.loads(response['body'].read())
+            self.bedrock_latency.observe(time.perf_counter() - start)
+            tracing.annotate(input_tokens=response_body.get('inputTextTokenCount', 0))
+            return response_body['embedding']
+
+    def _compute(self, text: str) -> List[float]:
+        if self.cache is None:
+            return self._invoke(text)
+        return self.cache.get_or_compute(text, self._invoke)
+
+    def embed(self, text: str) -> List[float]:
+        """질문 하나를 임베딩합니다. 최근에 같은 질문을 임베딩했으면 저장된 벡터를 반환합니다."""
+        start = time.perf_counter()
+        text = normalize_query(text)
+        key = (self.config.model_id, self.config.dimension, text)
+        with self._lock:
+            vector = self._query_cache.get(key)
+            if vector is not None:
+                self._query_cache.move_to_end(key)
+                self.query_hits += 1
+        if vector is None:
+            vector = call_with_backoff(self._compute, text, max_retries=self.max_retries)
+            with self._lock:
+                self.query_misses += 1
+                self._query_cache[key] = vector
+                self._query_cache.move_to_end(key)
+                while len(self._query_cache) > self.query_cache_size:
+                    self._query_cache.popitem(last=False)
+        self.embed_latency.observe(time.perf_counter() - start)
+        return vector
+
+    def embed_batch(self, items: Iterable, text_of=None):
+        """
+        여러 텍스트(또는 text_of로 텍스트를 꺼낼 수 있는 항목)를 최대 max_in_flight개씩 동시에 임베딩하여
+        (항목, 벡터)를 입력 순서대로 yield합니다. 청크 본문은 정규화하지 않으며 질문 LRU도 사용하지 않습니다.
+        """
+        def timed_compute(text):
+            start = time.perf_counter()
+            vector = self._compute(text)
+            self.embed_latency.observe(time.perf_counter() - start)
+            return vector
+
+        executor = EmbeddingExecutor(timed_compute, max_in_flight=self.max_in_flight, max_retries=self.max_retries)
+        return executor.map(items, text_of=text_of)
+
+    def stats(self) -> dict:
+        lookups = self.query_hits + self.query_misses
+        return {
+            "query_cache_hits": self.query_hits,
+            "query_cache_misses": self.query_misses,
+            "query_cache_hit_rate": round(self.query_hits / lookups, 4) if lookups else 0.0,
+            "bedrock_latency": self.bedrock_latency.snapshot(),
+            "embed_latency": self.embed_latency.snapshot(),
+        }
@@ -0,0 +1,177 @@
+# lambda/fast_router.py
+
+import re
+import threading
+from collections import deque
+from typing import Dict, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from manual_catalog import CatalogSnapshot, ManualEntry, normalize_name, normalize_tokens
+
+# --- 상수 ---
+# 정규화(normalize_name)된 질문 전체가 아래 표현과 같을 때만 로컬에서 분류합니다.
+GREETINGS = frozenset(normalize_name(text) for text in (
+    "안녕", "안녕하세요", "안녕하십니까", "반가워", "반가워요", "반갑습니다", "하이", "헬로",
+    "좋은 아침", "좋은 아침입니다", "hi", "hello", "hey", "good morning",
+))
+SMALL_TALK = frozenset(normalize_name(text) for text in (
+    "고마워", "고마워요", "고맙습니다", "감사", "감사해요", "감사합니다", "수고하세요", "잘가", "안녕히 계세요",
+    "thanks", "thank you", "bye", "ok", "오케이", "알겠습니다", "네", "응",
+))
+LATENCY_EMA_ALPHA = 0.2  # LLM 라우터 지연 시간 이동 평균의 가중치
+MODEL_CHAR = re.compile(r'[0-9a-z]')  # 별칭 바로 앞뒤에 붙어 있으면 다른 모델명의 일부로 보는 문자
+
+
+class AhoCorasick:
+    """여러 패턴을 텍스트 한 번 훑기로 모두 찾는 Aho-Corasick 매처입니다."""
+
+    def __init__(self, patterns: Dict[str, object]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[Tuple[str, object]]] = [[]]
+        for pattern, value in patterns.items():
+            if pattern:
+                self._add(pattern, value)
+        self._build_failure_links()
+
+    def _add(self, pattern: str, value) -> None:
+        state = 0
+        for ch in pattern:
+            next_state = self._goto[state].get(ch)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][ch] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append((pattern, value))
+
+    def _build_failure_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def find_all(self, text: str) -> Iterator[Tuple[int, int, object]]:
+        """텍스트에서 찾은 모든 패턴을 (시작, 끝, 값) 형태로 yield합니다."""
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(ch, 0)
+            for pattern, value in self._output[state]:
+                yield i + 1 - len(pattern), i + 1, value
+
+
+class RouteDecision(NamedTuple):
+    scenario: str
+    manual: Optional[ManualEntry] = None
+    reason: str = ""
+
+
+def _longest_matches(matches: List[Tuple[int, int, ManualEntry]]) -> List[Tuple[int, int, ManualEntry]]:
+    """다른 일치 구간 안에 포함된 짧은 일치는 버립니다. (예: 'D20,25,30,33S'는 'D20,25,30,33SE-9'에 포함)"""
+    return [
+        match for match in matches
+        if not any(other is not match and other[0] <= match[0] and match[1] <= other[1]
+                   and other[1] - other[0] > match[1] - match[0] for other in matches)
+    ]
+
+
+def _token_boundaries(tokens: List[str]) -> Set[int]:
+    """정규화된 질문(토큰을 이어 붙인 문자열)에서 원래 공백/기호가 있던 위치(와 양 끝)를 반환합니다."""
+    boundaries, position = {0}, 0
+    for token in tokens:
+        position += len(token)
+        boundaries.add(position)
+    return boundaries
+
+
+def _is_whole_mention(normalized: str, start: int, end: int, boundaries: Set[int]) -> bool:
+    """
+    일치 구간의 앞뒤가 토큰 경계이거나 영문/숫자가 아닐 때만 매뉴얼 언급으로 봅니다.
+    'T5900', 'AT590X'처럼 별칭('T590')을 포함하는 다른 모델명은 제외하고, '엔진'/'의'처럼 붙여 쓴 한글은 허용합니다.
+    """
+    before = start in boundaries or not MODEL_CHAR.match(normalized[start - 1])
+    after = end in boundaries or not MODEL_CHAR.match(normalized[end])
+    return before and after
+
+
+class FastRouter:
+    """
+    LLM 라우터 앞에서 동작하는 결정적 라우터입니다.
+    - 질문 전체가 인사/잡담 표현이면 'greeting'/'general_chat'으로 분류
+    - 카탈로그의 매뉴얼 이름/별칭 중 정확히 한 매뉴얼만 언급되었으면 'manual_query'로 분류
+      (별칭이 다른 모델명의 일부로만 나오면 언급으로 보지 않음. 예: 'T590' 매뉴얼에 대한 'T5900', 'AT590X')
+    그 밖의 모호한 질문은 None을 반환하여 LLM 라우터가 판단하도록 합니다.
+    """
+
+    def __init__(self):
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._matcher: Optional[AhoCorasick] = None
+        self._lock = threading.Lock()
+        self.fast_hits = 0
+        self.llm_fallbacks = 0
+        self.llm_latency_ema: Optional[float] = None  # LLM 라우터 한 번의 평균 지연 시간(초)
+
+    def _matcher_for(self, snapshot: CatalogSnapshot) -> AhoCorasick:
+        # 카탈로그가 갱신되어 스냅샷이 바뀐 경우에만 매처를 다시 만듦
+        with self._lock:
+            if snapshot is not self._snapshot:
+                # 여러 매뉴얼이 공유하는 별칭은 어느 매뉴얼인지 확정할 수 없으므로 제외
+                self._matcher = AhoCorasick({
+                    alias: entry for alias, entry in snapshot.alias_index.items()
+                    if alias not in snapshot.ambiguous_aliases
+                })
+                self._snapshot = snapshot
+            return self._matcher
+
+    def route(self, query: str, snapshot: CatalogSnapshot) -> Optional[RouteDecision]:
+        tokens = normalize_tokens(query)
+        normalized = "".join(tokens)
+        if not normalized:
+            return None
+        if normalized in GREETINGS:
+            return RouteDecision("greeting", reason="greeting")
+        if normalized in SMALL_TALK:
+            return RouteDecision("general_chat", reason="small_talk")
+
+        boundaries = _token_boundaries(tokens)
+        matches = _longest_matches([
+            match for match in self._matcher_for(snapshot).find_all(normalized)
+            if _is_whole_mention(normalized, match[0], match[1], boundaries)
+        ])
+        manuals = {entry.name: entry for _, _, entry in matches}
+        if len(manuals) == 1:
+            return RouteDecision("manual_query", next(iter(manuals.values())), reason="alias_match")
+        return None  # 매뉴얼 언급이 없거나 여러 매뉴얼이 언급됨
+
+    def record(self, fast_path: bool, llm_latency: Optional[float] = None) -> None:
+        """라우팅 결과를 집계합니다. LLM 라우터를 호출한 경우 그 지연 시간을 함께 넘깁니다."""
+        with self._lock:
+            if fast_path:
+                self.fast_hits += 1
+            else:
+                self.llm_fallbacks += 1
+                if llm_latency is not None:
+                    self.llm_latency_ema = llm_latency if self.llm_latency_ema is None else \
+                        LATENCY_EMA_ALPHA * llm_latency + (1 - LATENCY_EMA_ALPHA) * self.llm_latency_ema
+
+    def stats(self) -> dict:
+        """fast path 적중률과, LLM 라우터 평균 지연 시간으로 추정한 절약 시간(초)을 반환합니다."""
+        total = self.fast_hits + self.llm_fallbacks
+        return {
+            "fast_hits": self.fast_hits,
+            "llm_fallbacks": self.llm_fallbacks,
+            "hit_rate": round(self.fast_hits / total, 4) if total else 0.0,
+            "avg_llm_router_seconds": round(self.llm_latency_ema, 4) if self.llm_latency_ema is not None else None,
+            "estimated_seconds_saved": round(self.fast_hits * self.llm_latency_ema, 3)
+            if self.llm_latency_ema is not None else None,
+        }
@@ -0,0 +1,200 @@
+# lambda/indexing.py
+
+import hashlib
+import json
+import time
+from typing import Dict, Iterable, Iterator, List, Set
+
+from opensearchpy.helpers import bulk
+
+# --- 상수 ---
+FETCH_PAGE_SIZE = 1000  # 기존 문서 조회 시 한 번에 가져올 문서 수
+DEFAULT_BULK_MAX_DOCS = 500                 # 배치당 최대 문서 수
+DEFAULT_BULK_MAX_BYTES = 10 * 1024 * 1024   # 배치당 최대 요청 크기 (바이트)
+BULK_MAX_RETRIES = 3                        # 429(요청 과다) 응답 시 문서 단위 재시도 횟수
+MAX_REPORTED_FAILURES = 20                  # 로그로 남길 실패 항목 최대 수
+# 텍스트가 같아도 바뀔 수 있는 메타데이터 필드 (prev_id/next_id: 앞뒤 청크의 문서 ID, 검색 시 인접 청크 조회용)
+METADATA_FIELDS = ("page", "chunk_id", "prev_id", "next_id")
+
+
+def make_document_id(source: str, text: str, occurrence: int = 0) -> str:
+    """
+    소스(S3 키)와 청크 내용으로 결정적인 문서 ID를 생성합니다.
+    같은 문서 안에 동일한 텍스트가 여러 번 나오면 occurrence(0, 1, 2, ...)로 구분합니다.
+    청크 위치가 아닌 내용에 기반하므로, 앞쪽에 페이지가 추가되어도 나머지 청크의 ID는 유지됩니다.
+    """
+    digest = hashlib.sha256(f"{source}\x00{occurrence}\x00{text}".encode('utf-8')).hexdigest()
+    return digest
+
+
+def assign_document_ids(source: str, records: Iterable[dict]) -> Iterator[dict]:
+    """각 청크 레코드({'text', 'page', 'chunk_id'})에 결정적인 '_id'를 부여하여 yield합니다."""
+    seen: Dict[str, int] = {}
+    for record in records:
+        occurrence = seen.get(record['text'], 0)
+        seen[record['text']] = occurrence + 1
+        record['_id'] = make_document_id(source, record['text'], occurrence)
+        yield record
+
+
+def link_neighbors(records: Iterable[dict]) -> Iterator[dict]:
+    """
+    ID가 부여된 청크 레코드에 앞뒤 청크의 문서 ID('prev_id', 'next_id', 없으면 None)를 채워 yield합니다.
+    다음 레코드의 ID가 필요하므로 한 레코드씩 늦게 내보냅니다.
+    """
+    previous = None
+    for record in records:
+        record['prev_id'] = previous['_id'] if previous else None
+        if previous is not None:
+            previous['next_id'] = record['_id']
+            yield previous
+        previous = record
+    if previous is not None:
+        previous['next_id'] = None
+        yield previous
+
+
+def fetch_indexed_documents(client, index: str, source: str) -> Dict[str, dict]:
+    """
+    인덱스에 이미 저장된 해당 소스의 문서를 {문서 ID: 메타데이터} 형태로 반환합니다.
+    임베딩은 가져오지 않고 비교에 필요한 메타데이터 필드만 조회합니다.
+
+    from/size는 from+size가 index.max_result_window(기본 10,000)를 넘으면 실패하므로 chunk_id 순서로 나누어 가져옵니다.
+    이전 버전은 재업로드할 때마다 청크를 중복 저장했고 삭제가 일부 실패해도 중복이 남으므로 chunk_id는 고유하지 않습니다.
+    그래서 마지막 chunk_id 다음부터가 아니라 그 값부터(gte) 다시 조회하고, 그 값으로 이미 가져온 문서만 제외합니다.
+    (search_after로 마지막 정렬 값 다음부터 가져오면 페이지 경계에 걸친 같은 chunk_id의 나머지 문서를 건너뜀)
+    """
+    if not client.indices.exists(index=index):
+        return {}
+
+    existing = {}
+    boundary_value, boundary_ids = None, []  # 마지막 페이지의 마지막 chunk_id와, 그 값으로 이미 가져온 문서 ID
+    while True:
+        query = {"bool": {"filter": [{"term": {"source": source}}]}}
+        if boundary_value is not None:
+            query["bool"]["filter"].append({"range": {"chunk_id": {"gte": boundary_value}}})
+            query["bool"]["must_not"] = [{"ids": {"values": boundary_ids}}]
+        body = {
+            "size": FETCH_PAGE_SIZE,
+            "_source": list(METADATA_FIELDS),
+            "sort": [{"chunk_id": "asc"}],
+            "query": query
+        }
+        response = client.search(index=index, body=body)
+        hits = response['hits']['hits']
+        for hit in hits:
+            existing[hit['_id']] = hit.get('_source', {})
+        if len(hits) < FETCH_PAGE_SIZE:
+            break
+        last_value = hits[-1]['sort'][0]
+        if last_value != boundary_value:
+            boundary_value, boundary_ids = last_value, []
+        boundary_ids.extend(hit['_id'] for hit in hits if hit['sort'][0] == last_value)
+    return existing
+
+
+class ReindexPlanner:
+    """
+    인덱스에 이미 있는 문서를 기준으로 새 청크를 하나씩 분류하여 변경분(delta)만 계산합니다.
+    청크 스트림을 한 번만 훑으면 되므로 전체 청크 목록을 메모리에 모아둘 필요가 없습니다.
+    """
+
+    INDEX = "index"          # 새로 생기거나 내용이 바뀐 청크 (임베딩 필요)
+    UPDATE = "update"        # 내용은 같고 메타데이터만 바뀐 청크 (임베딩 불필요)
+    UNCHANGED = "unchanged"
+
+    def __init__(self, existing: Dict[str, dict]):
+        self.existing = existing
+        self.counts = {self.INDEX: 0, self.UPDATE: 0, self.UNCHANGED: 0}
+        self._seen_ids = set()
+
+    def classify(self, record: dict) -> str:
+        self._seen_ids.add(record['_id'])
+        indexed = self.existing.get(record['_id'])
+        if indexed is None:
+            decision = self.INDEX
+        elif any(indexed.get(field) != record[field] for field in METADATA_FIELDS):
+            decision = self.UPDATE
+        else:
+            decision = self.UNCHANGED
+        self.counts[decision] += 1
+        return decision
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+    @property
+    def seen_ids(self) -> Set[str]:
+        """지금까지 분류한 (현재 매뉴얼을 구성하는) 청크의 문서 ID 집합입니다."""
+        return self._seen_ids
+
+    def stale_ids(self) -> List[str]:
+        """분류한 청크 중 어디에도 해당하지 않는, 더 이상 존재하지 않는 문서 ID 목록입니다."""
+        return [doc_id for doc_id in self.existing if doc_id not in self._seen_ids]
+
+
+class BulkIndexer:
+    """
+    bulk 액션을 스트리밍으로 받아 문서 수 또는 바이트 크기 기준으로 나누어 OpenSearch에 반영합니다.
+    임베딩이 도착하는 대로 배치를 보내므로 메모리에는 배치 하나 분량만 유지되며,
+    한 배치가 실패해도 이미 반영된 배치와 이후 배치에는 영향을 주지 않습니다.
+    """
+
+    def __init__(self, client, max_docs: int = DEFAULT_BULK_MAX_DOCS,
+                 max_bytes: int = DEFAULT_BULK_MAX_BYTES):
+        self.client = client
+        self.max_docs = max_docs
+        self.max_bytes = max_bytes
+        self.batches = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.failed_items = []
+        self._batch = []
+        self._batch_bytes = 0
+
+    def add(self, action: dict) -> None:
+        size = len(json.dumps(action))
+        if self._batch and (len(self._batch) >= self.max_docs or self._batch_bytes + size > self.max_bytes):
+            self.flush()
+        self._batch.append(action)
+        self._batch_bytes += size
+
+    def flush(self) -> None:
+        if not self._batch:
+            return
+        batch, batch_bytes = self._batch, self._batch_bytes
+        self._batch, self._batch_bytes = [], 0
+        self.batches += 1
+
+        start = time.perf_counter()
+        try:
+            success, errors = bulk(
+                self.client, batch,
+                chunk_size=len(batch),
+                max_chunk_bytes=batch_bytes * 2,  # 클라이언트가 배치를 다시 나누지 않도록 여유를 둠
+                max_retries=BULK_MAX_RETRIES,
+                raise_on_error=False,
+                raise_on_exception=False
+            )
+        except Exception as e:
+            # 재시도 후에도 요청 자체가 실패하면 배치 전체를 실패로 기록하고 다음 배치로 진행
+            success, errors = 0, [{"batch": self.batches, "error": str(e)}] * len(batch)
+        elapsed = time.perf_counter() - start
+
+        self.succeeded += success
+        self.failed += len(errors)
+        self.failed_items.extend(errors[:MAX_REPORTED_FAILURES - len(self.failed_items)])
+        print(f"Bulk batch {self.batches}: {len(batch)} docs, {batch_bytes / 1024:.0f} KiB, "
+              f"{elapsed:.2f}s ({len(batch) / elapsed if elapsed else 0:.1f} docs/s), "
+              f"{success} succeeded, {len(errors)} failed.")
+
+    def close(self) -> None:
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # 예외가 발생해도 이미 받은 액션은 반영
+        self.close()
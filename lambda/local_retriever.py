@@ -0,0 +1,251 @@
+# lambda/local_retriever.py
+#
+# OpenSearch 없이 프로세스 안에서 동작하는 검색 엔진입니다. (retrieval.OpenSearchRetriever와 같은 search 인터페이스)
+# 임베딩을 NumPy 행렬로 메모리에 올려 코사인 유사도로 검색하며, 노트북에서 파이프라인을 실행하거나
+# 검색 지연 시간/품질을 측정하는 데 사용합니다.
+#   - index='flat': 전수 탐색(정확한 top-k)
+#   - index='ivf': k-means로 나눈 클러스터 중 가까운 nprobe개만 탐색하는 근사 인덱스
+#   - source/page 메타데이터 필터, mode='hybrid'이면 BM25 + k-NN(RRF)
+
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+from typing import Callable, Iterable, List, Optional
+
+import numpy as np
+
+from retrieval import DEFAULT_HYBRID_CANDIDATES, DEFAULT_RRF_K, RETRIEVAL_MODES, reciprocal_rank_fusion
+
+# --- 상수 ---
+INDEX_TYPES = ("flat", "ivf")
+DEFAULT_NPROBE = 4         # ivf에서 탐색할 클러스터 수
+KMEANS_ITERATIONS = 10
+# 변환된 마크다운의 페이지 번호 표시 (예: **-12-**, 페이지 바닥글 '12 of 212')
+PAGE_MARKER_PATTERN = re.compile(r'\*\*-(\d+)-\*\*|^(\d+) of \d+\s*$', re.MULTILINE)
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    """OpenSearch standard 분석기와 비슷하게 소문자화 후 단어 단위로 나눕니다. ('E-05' -> 'e', '05')"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def load_documents(path: str, source: str) -> List[dict]:
+    """
+    코퍼스 JSON을 문서 청크 목록으로 읽습니다.
+    - 문자열 목록(chunks.json): 모두 source 매뉴얼의 청크로 보고, 페이지는 색인 Lambda처럼 본문의 페이지 표시로 정함
+    - 객체 목록: {'text', 'source', 'page', 'chunk_id'} 형식 그대로 사용 (없는 필드는 위와 같이 채움)
+    """
+    with open(path, encoding='utf-8') as f:
+        items = json.load(f)
+    documents = []
+    last_page = 0
+    for item in items:
+        document = {"text": item} if isinstance(item, str) else dict(item)
+        if not document.get("text", "").strip():
+            continue
+        page_match = PAGE_MARKER_PATTERN.search(document["text"])
+        if page_match:
+            last_page = int(page_match.group(1) or page_match.group(2))
+        document.setdefault("page", last_page)
+        document.setdefault("source", source)
+        document.setdefault("chunk_id", len(documents))
+        documents.append(document)
+    return documents
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.where(norms == 0, 1.0, norms)
+
+
+class BM25:
+    """OpenSearch 기본값(k1=1.2, b=0.75)과 같은 BM25 점수를 계산합니다."""
+
+    def __init__(self, documents: List[str], k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = {}
+        lengths = []
+        for i, doc in enumerate(documents):
+            term_freqs = Counter(tokenize(doc))
+            lengths.append(sum(term_freqs.values()))
+            for term, tf in term_freqs.items():
+                self.postings.setdefault(term, ([], []))
+                self.postings[term][0].append(i)
+                self.postings[term][1].append(tf)
+        self.postings = {term: (np.array(ids), np.array(tfs, dtype=np.float32))
+                         for term, (ids, tfs) in self.postings.items()}
+        self.lengths = np.array(lengths, dtype=np.float32)
+        avg_length = float(self.lengths.mean()) if lengths else 1.0
+        self.length_norm = k1 * (1 - b + b * self.lengths / (avg_length or 1.0))
+        n = len(documents)
+        self.idf = {term: math.log(1 + (n - len(ids) + 0.5) / (len(ids) + 0.5))
+                    for term, (ids, _) in self.postings.items()}
+
+    def scores(self, query: str) -> np.ndarray:
+        scores = np.zeros(len(self.lengths), dtype=np.float32)
+        for term in set(tokenize(query)):
+            if term not in self.postings:
+                continue
+            ids, tfs = self.postings[term]
+            scores[ids] += self.idf[term] * tfs * (self.k1 + 1) / (tfs + self.length_norm[ids])
+        return scores
+
+
+class IVFIndex:
+    """구면 k-means로 벡터를 nlist개 클러스터로 나누고, 질의와 가까운 nprobe개 클러스터의 벡터만 후보로 반환합니다."""
+
+    def __init__(self, vectors: np.ndarray, nlist: Optional[int] = None, nprobe: int = DEFAULT_NPROBE,
+                 iterations: int = KMEANS_ITERATIONS, seed: int = 0):
+        n = len(vectors)
+        self.nlist = max(1, min(nlist or int(math.sqrt(n)), n))
+        self.nprobe = min(nprobe, self.nlist)
+        rng = np.random.default_rng(seed)
+        centroids = vectors[rng.choice(n, self.nlist, replace=False)]
+        for _ in range(iterations):
+            assignment = np.argmax(vectors @ centroids.T, axis=1)
+            for c in range(self.nlist):
+                members = vectors[assignment == c]
+                if len(members):  # 빈 클러스터는 이전 중심을 유지
+                    centroids[c] = members.mean(axis=0)
+            centroids = _normalize_rows(centroids)
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        self.centroids = centroids
+        self.lists = [np.flatnonzero(assignment == c) for c in range(self.nlist)]
+
+    def candidates(self, query: np.ndarray) -> np.ndarray:
+        nearest = np.argsort(-(self.centroids @ query))[:self.nprobe]
+        return np.concatenate([self.lists[c] for c in nearest])
+
+
+class LocalVectorRetriever:
+    """
+    문서 청크와 임베딩 행렬을 메모리에 올려 검색하는 검색기입니다.
+    ivf 인덱스에서 필터를 적용한 후보가 k개보다 적으면 해당 필터 범위를 전수 탐색합니다. (ann_fallbacks로 집계)
+    """
+
+    def __init__(self, documents: List[dict], vectors, mode: str = "knn", index: str = "flat",
+                 nlist: Optional[int] = None, nprobe: int = DEFAULT_NPROBE, rrf_k: int = DEFAULT_RRF_K,
+                 candidates: int = DEFAULT_HYBRID_CANDIDATES):
+        if mode not in RETRIEVAL_MODES:
+            raise ValueError(f"Unsupported retrieval mode '{mode}'. Expected one of {RETRIEVAL_MODES}.")
+        if index not in INDEX_TYPES:
+            raise ValueError(f"Unsupported local index '{index}'. Expected one of {INDEX_TYPES}.")
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if len(vectors) != len(documents):
+            raise ValueError(f"Got {len(vectors)} vectors for {len(documents)} documents.")
+        self.documents = documents
+        self.vectors = _normalize_rows(vectors)
+        self.mode = mode
+        self.rrf_k = rrf_k
+        self.candidates = candidates
+        self.sources = np.array([doc.get("source") for doc in documents], dtype=object)
+        self.pages = np.array([doc.get("page") for doc in documents], dtype=object)
+        self.ann = IVFIndex(self.vectors, nlist, nprobe) if index == "ivf" and len(documents) else None
+        self.positions = {(doc.get("source"), doc.get("chunk_id")): doc for doc in documents}
+        self._bm25 = None
+        self._lock = threading.Lock()
+        self.searches = 0
+        self.ann_fallbacks = 0
+
+    @classmethod
+    def from_corpus(cls, path: str, embed_texts: Callable[[List[str]], Iterable[List[float]]], source: str,
+                    vectors_path: Optional[str] = None, **kwargs) -> "LocalVectorRetriever":
+        """
+        코퍼스 파일을 읽고 embed_texts로 임베딩하여 검색기를 만듭니다.
+        vectors_path가 주어지면 임베딩을 .npy로 저장해 두고, 문서 수와 행 수가 같으면 다음부터 그대로 읽습니다.
+        """
+        documents = load_documents(path, source)
+        vectors = None
+        if vectors_path and os.path.exists(vectors_path):
+            vectors = np.load(vectors_path)
+            if len(vectors) != len(documents):
+                print(f"Ignoring {vectors_path}: {len(vectors)} vectors for {len(documents)} documents.")
+                vectors = None
+        if vectors is None:
+            vectors = np.array(list(embed_texts([doc["text"] for doc in documents])), dtype=np.float32)
+            if vectors_path:
+                np.save(vectors_path, vectors)
+        print(f"Local retriever loaded {len(documents)} chunks from {path}.")
+        return cls(documents, vectors, **kwargs)
+
+    def _mask(self, source: Optional[str], page: Optional[int]) -> Optional[np.ndarray]:
+        if not source and page is None:
+            return None
+        mask = np.ones(len(self.documents), dtype=bool)
+        if source:
+            mask &= self.sources == source
+        if page is not None:
+            mask &= self.pages == page
+        return mask
+
+    def _hits(self, ids: np.ndarray, scores: np.ndarray, size: int) -> List[dict]:
+        """후보 ids와 그 점수에서 상위 size개를 OpenSearch hit 형태로 반환합니다."""
+        if len(ids) > size:
+            top = np.argpartition(-scores, size)[:size]
+            ids, scores = ids[top], scores[top]
+        order = np.argsort(-scores, kind="stable")
+        return [{"_id": str(ids[i]), "_score": float(scores[i]), "_source": self.documents[ids[i]]} for i in order]
+
+    def knn_hits(self, embedding, size: int, source: Optional[str] = None, page: Optional[int] = None) -> List[dict]:
+        query = _normalize_rows(np.asarray(embedding, dtype=np.float32))
+        mask = self._mask(source, page)
+        ids = None
+        if self.ann is not None:
+            ids = self.ann.candidates(query)
+            if mask is not None:
+                ids = ids[mask[ids]]
+            if len(ids) < size:
+                with self._lock:
+                    self.ann_fallbacks += 1
+                ids = None
+        if ids is None:
+            ids = np.arange(len(self.documents)) if mask is None else np.flatnonzero(mask)
+        return self._hits(ids, self.vectors[ids] @ query, size)
+
+    def bm25_hits(self, text: str, size: int, source: Optional[str] = None, page: Optional[int] = None) -> List[dict]:
+        if self._bm25 is None:
+            with self._lock:
+                if self._bm25 is None:
+                    self._bm25 = BM25([doc["text"] for doc in self.documents])
+        scores = self._bm25.scores(text)
+        mask = scores > 0  # match 쿼리처럼 질의 단어가 하나도 없는 문서는 제외
+        filter_mask = self._mask(source, page)
+        if filter_mask is not None:
+            mask &= filter_mask
+        ids = np.flatnonzero(mask)
+        return self._hits(ids, scores[ids], size)
+
+    def search(self, embedding: List[float], k: int, source: Optional[str] = None, page: Optional[int] = None,
+               text: Optional[str] = None) -> List[dict]:
+        with self._lock:
+            self.searches += 1
+        if self.mode == "hybrid" and text:
+            candidates = max(self.candidates, k)
+            hits = reciprocal_rank_fusion([self.bm25_hits(text, candidates, source, page),
+                                           self.knn_hits(embedding, candidates, source, page)],
+                                          k=self.rrf_k, limit=k)
+        else:
+            hits = self.knn_hits(embedding, k, source, page)
+        return [hit['_source'] for hit in hits]
+
+    def neighbors(self, chunks: List[dict]) -> List[dict]:
+        """같은 매뉴얼에서 chunk_id가 하나 앞뒤인 청크 중 chunks에 없는 것을 반환합니다."""
+        present = {(chunk.get("source"), chunk.get("chunk_id")) for chunk in chunks}
+        found = []
+        for chunk in chunks:
+            if chunk.get("chunk_id") is None:
+                continue
+            for offset in (-1, 1):
+                key = (chunk.get("source"), chunk["chunk_id"] + offset)
+                if key not in present and key in self.positions:
+                    present.add(key)
+                    found.append(self.positions[key])
+        return found
+
+    def stats(self) -> dict:
+        return {"documents": len(self.documents), "searches": self.searches, "ann_fallbacks": self.ann_fallbacks}
@@ -0,0 +1,223 @@
+# lambda/manual_catalog.py
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from typing import Dict, List, NamedTuple, Optional
+
+# --- 상수 ---
+DEFAULT_CATALOG_KEY = "catalog/manuals.json"  # 매뉴얼 카탈로그(manifest) 객체 키
+DEFAULT_TTL_SECONDS = 300                      # 카탈로그 캐시 유효 시간
+MAX_UPDATE_ATTEMPTS = 5                        # 동시 갱신 충돌 시 재시도 횟수
+MIN_ALIAS_LENGTH = 3                           # 너무 짧은 별칭은 오탐을 막기 위해 제외
+
+
+def normalize_tokens(text: str) -> List[str]:
+    """normalize_name과 같이 정규화하되, 공백/기호로 구분된 토큰을 나누어 반환합니다. (예: 'Bobcat T-590' -> ['bobcat', 't', '590'])"""
+    return [token for token in re.split(r'[\W_]+', unicodedata.normalize('NFKC', text).lower()) if token]
+
+
+def normalize_name(text: str) -> str:
+    """대소문자, 전각/반각, 공백과 기호 차이를 무시하도록 이름을 정규화합니다. (예: 'Bobcat T-590' -> 'bobcatt590')"""
+    return "".join(normalize_tokens(text))
+
+
+def manual_name_from_key(key: str) -> str:
+    return os.path.splitext(os.path.basename(key))[0]
+
+
+def generate_aliases(name: str) -> List[str]:
+    """
+    매뉴얼 파일 이름에서 사용자가 부를 법한 별칭을 만듭니다.
+    - '_'로 구분된 각 부분 (예: 'D20,25,30,33S-9_D20,25,30,33SE-9_SB2503C04' -> 'D20,25,30,33S-9', ...)
+    - '-'로 구분된 단어 중 숫자가 포함된 모델명과, 그 앞까지의 접두어 (예: 'Bobcat-T590-Operating-Manual' -> 'T590', 'Bobcat-T590')
+    """
+    aliases = [name]
+    for part in name.split('_'):
+        aliases.append(part)
+        words = [word for word in re.split(r'[-\s]+', part) if word]
+        for i, word in enumerate(words):
+            if any(ch.isdigit() for ch in word) and any(ch.isalpha() for ch in word):
+                aliases.append(word)
+                aliases.append("-".join(words[:i + 1]))
+    unique = []
+    for alias in aliases:
+        if len(normalize_name(alias)) >= MIN_ALIAS_LENGTH and alias not in unique:
+            unique.append(alias)
+    return unique
+
+
+class ManualEntry(NamedTuple):
+    name: str            # 매뉴얼 표시 이름 (파일 이름에서 확장자 제외)
+    source: str          # OpenSearch 문서의 source 필드 값 (S3 키)
+    aliases: List[str]
+    index_version: str   # 매뉴얼 내용이 바뀔 때마다 달라지는 색인 버전
+
+
+class CatalogSnapshot:
+    """특정 시점의 매뉴얼 카탈로그입니다. 정규화된 별칭으로 매뉴얼을 빠르게 찾을 수 있습니다."""
+
+    def __init__(self, entries: List[ManualEntry], etag: Optional[str] = None):
+        self.entries = entries
+        self.etag = etag
+        self.names = [entry.name for entry in entries]
+        self.by_name = {entry.name: entry for entry in entries}
+        self.alias_index: Dict[str, ManualEntry] = {}
+        self.ambiguous_aliases = set()  # 둘 이상의 매뉴얼이 공유하는 정규화된 별칭
+        for entry in entries:
+            for alias in entry.aliases:
+                # 여러 매뉴얼이 같은 별칭을 가지면 모호하므로 먼저 등록된 것을 유지
+                key = normalize_name(alias)
+                existing = self.alias_index.setdefault(key, entry)
+                if existing.name != entry.name:
+                    self.ambiguous_aliases.add(key)
+
+    def find(self, mention: str) -> Optional[ManualEntry]:
+        """사용자/LLM이 언급한 매뉴얼 이름에 해당하는 항목을 찾습니다. (별칭 완전 일치 우선, 다음은 부분 일치)"""
+        key = normalize_name(mention)
+        if not key:
+            return None
+        if key in self.alias_index:
+            return self.alias_index[key]
+        return next((entry for entry in self.entries if key in normalize_name(entry.name)), None)
+
+
+def _entries_from_manifest(manifest: dict) -> List[ManualEntry]:
+    return [
+        ManualEntry(name, item['source'], item.get('aliases') or generate_aliases(name), item.get('index_version', ''))
+        for name, item in sorted(manifest.get('manuals', {}).items())
+    ]
+
+
+# --- 색인 Lambda 측: manifest 갱신 ---
+
+def content_version(document_ids) -> str:
+    """매뉴얼을 구성하는 청크 문서 ID 집합으로 색인 버전을 만듭니다. 내용이 같으면 재업로드해도 버전이 유지됩니다."""
+    digest = hashlib.sha256("\n".join(sorted(document_ids)).encode('utf-8')).hexdigest()
+    return digest[:16]
+
+
+def register_manuals(s3_client, bucket: str, updates: List[dict], key: str = DEFAULT_CATALOG_KEY) -> None:
+    """
+    색인이 끝난 매뉴얼들을 카탈로그 manifest에 등록합니다. updates의 각 항목은 {'source', 'index_version', 'chunks'}입니다.
+    여러 Lambda가 동시에 갱신할 수 있으므로 ETag 조건부 쓰기(IfMatch/IfNoneMatch)로 충돌 시 다시 읽어 재시도합니다.
+    """
+    for _ in range(MAX_UPDATE_ATTEMPTS):
+        try:
+            response = s3_client.get_object(Bucket=bucket, Key=key)
+            manifest = json.loads(response['Body'].read())
+            condition = {'IfMatch': response['ETag']}
+        except s3_client.exceptions.NoSuchKey:
+            manifest = {'manuals': {}}
+            condition = {'IfNoneMatch': '*'}
+
+        for update in updates:
+            name = manual_name_from_key(update['source'])
+            manifest['manuals'][name] = {
+                'source': update['source'],
+                'aliases': generate_aliases(name),
+                'index_version': update['index_version'],
+                'chunks': update.get('chunks', 0),
+                'updated_at': int(time.time()),
+            }
+        manifest['updated_at'] = int(time.time())
+
+        try:
+            s3_client.put_object(
+                Bucket=bucket, Key=key,
+                Body=json.dumps(manifest, ensure_ascii=False).encode('utf-8'),
+                ContentType='application/json',
+                **condition
+            )
+            print(f"Registered {len(updates)} manuals in catalog s3://{bucket}/{key}.")
+            return
+        except Exception as e:
+            code = getattr(e, 'response', {}).get('Error', {}).get('Code')
+            if code not in ('PreconditionFailed', 'ConditionalRequestConflict'):
+                raise
+            print("Catalog was modified concurrently; retrying update.")
+    raise RuntimeError(f"Could not update manual catalog s3://{bucket}/{key} after {MAX_UPDATE_ATTEMPTS} attempts.")
+
+
+# --- 검색 Lambda 측: TTL 캐시와 조건부 갱신 ---
+
+class S3CatalogLoader:
+    """S3 manifest를 읽습니다. manifest가 없으면 (기존 방식대로) 버킷의 PDF 목록으로 카탈로그를 만듭니다."""
+
+    def __init__(self, s3_client, bucket: str, key: str = DEFAULT_CATALOG_KEY):
+        self.s3 = s3_client
+        self.bucket = bucket
+        self.key = key
+
+    def load(self, previous: Optional[CatalogSnapshot] = None) -> CatalogSnapshot:
+        kwargs = {}
+        if previous is not None and previous.etag:
+            kwargs['IfNoneMatch'] = previous.etag  # 바뀌지 않았으면 304로 본문 전송 생략
+        try:
+            response = self.s3.get_object(Bucket=self.bucket, Key=self.key, **kwargs)
+        except self.s3.exceptions.NoSuchKey:
+            print(f"Manual catalog s3://{self.bucket}/{self.key} not found; falling back to bucket listing.")
+            return self._from_listing()
+        except Exception as e:
+            if getattr(e, 'response', {}).get('Error', {}).get('Code') == '304':
+                return previous
+            raise
+        manifest = json.loads(response['Body'].read())
+        return CatalogSnapshot(_entries_from_manifest(manifest), etag=response.get('ETag'))
+
+    def _from_listing(self) -> CatalogSnapshot:
+        entries = []
+        paginator = self.s3.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket):
+            for obj in page.get('Contents', []):
+                key = obj.get('Key')
+                if key and key.lower().endswith('.pdf'):
+                    name = manual_name_from_key(key)
+                    entries.append(ManualEntry(name, key, generate_aliases(name), obj.get('ETag', '').strip('"')))
+        return CatalogSnapshot(entries)
+
+
+class ManualCatalog:
+    """
+    TTL 캐시를 갖는 매뉴얼 카탈로그입니다.
+    처음 호출과 TTL이 지난 뒤의 첫 호출은 요청 안에서 동기적으로 다시 읽습니다. (ETag 조건부 GET이라 바뀌지 않았으면 본문 없음)
+    Lambda는 호출 사이에 실행 환경을 멈추므로 백그라운드 스레드로 갱신하지 않습니다.
+    다른 요청이 이미 갱신 중이면 기다리지 않고 기존 스냅샷을 반환합니다.
+    """
+
+    def __init__(self, loader, ttl_seconds: float = DEFAULT_TTL_SECONDS):
+        self.loader = loader
+        self.ttl_seconds = ttl_seconds
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self) -> CatalogSnapshot:
+        if self._snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    self._refresh()
+        elif self._expired() and self._lock.acquire(blocking=False):
+            try:
+                if self._expired():
+                    self._refresh()
+                    print(f"Manual catalog refreshed: {len(self._snapshot.entries)} manuals.")
+            finally:
+                self._lock.release()
+        return self._snapshot
+
+    def _expired(self) -> bool:
+        return time.monotonic() - self._loaded_at > self.ttl_seconds
+
+    def _refresh(self) -> None:
+        try:
+            self._snapshot = self.loader.load(self._snapshot)
+        except Exception as e:
+            print(f"Error loading manual catalog: {e}")
+            if self._snapshot is None:
+                self._snapshot = CatalogSnapshot([])
+        self._loaded_at = time.monotonic()
@@ -0,0 +1,97 @@
+# lambda/pdf_converter.py
+
+import multiprocessing
+import os
+from typing import Iterator, List, Optional
+
+import pymupdf
+import pymupdf4llm
+
+# --- 상수 ---
+DEFAULT_PAGES_PER_RANGE = 8  # 워커 하나가 한 번에 변환할 페이지 수
+
+
+def available_cpus() -> int:
+    """현재 프로세스가 사용할 수 있는 vCPU 수를 반환합니다. (Lambda는 메모리 설정에 비례)"""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def _convert_pages(pdf_path: str, pages: List[int]) -> List[dict]:
+    """지정한 페이지들을 마크다운 페이지 청크로 변환합니다. 프로세스 간 전송량을 줄이기 위해 필요한 필드만 남깁니다."""
+    page_chunks = pymupdf4llm.to_markdown(pdf_path, pages=pages, page_chunks=True)
+    return [{"metadata": chunk.get("metadata", {}), "text": chunk.get("text", "")} for chunk in page_chunks]
+
+
+def _worker(pdf_path: str, page_ranges: List[List[int]], conn) -> None:
+    """할당된 페이지 범위를 순서대로 변환하여 하나씩 부모 프로세스로 전송합니다."""
+    try:
+        for pages in page_ranges:
+            conn.send(("ok", _convert_pages(pdf_path, pages)))
+    except Exception as e:
+        conn.send(("error", f"{type(e).__name__}: {e}"))
+    finally:
+        conn.close()
+
+
+def iter_page_chunks(pdf_path: str, workers: Optional[int] = None,
+                     pages_per_range: int = DEFAULT_PAGES_PER_RANGE) -> Iterator[dict]:
+    """
+    PDF를 페이지 범위로 나누어 여러 프로세스에서 동시에 변환하고, 페이지 청크를 페이지 순서대로 yield합니다.
+    앞쪽 범위의 변환이 끝나는 즉시 yield하므로 변환이 모두 끝나기 전에 청킹/임베딩을 시작할 수 있습니다.
+
+    Lambda에는 /dev/shm이 없어 multiprocessing.Pool이나 ProcessPoolExecutor를 사용할 수 없으므로,
+    워커마다 Process와 Pipe를 직접 사용합니다. 워커는 'spawn'으로 시작하므로 스레드에서 호출해도 안전하며,
+    스크립트에서 직접 호출할 때는 `if __name__ == "__main__":` 안에서 호출해야 합니다. 범위 r은 워커 r % workers가 담당하며,
+    각 워커는 자신의 범위를 순서대로 처리하므로 부모는 범위 순서대로 읽기만 하면 됩니다.
+    (Pipe가 가득 차면 워커가 대기하므로 변환 결과가 메모리에 무한정 쌓이지 않습니다.)
+    """
+    with pymupdf.open(pdf_path) as doc:
+        page_count = doc.page_count
+    if page_count == 0:
+        return
+
+    ranges = [list(range(start, min(start + pages_per_range, page_count)))
+              for start in range(0, page_count, pages_per_range)]
+    workers = min(workers or available_cpus(), len(ranges))
+
+    if workers <= 1:
+        # 단일 코어에서는 프로세스 생성 비용 없이 범위 단위로 바로 변환
+        for pages in ranges:
+            yield from _convert_pages(pdf_path, pages)
+        return
+
+    # 호출하는 쪽은 이미 여러 스레드(객체별 처리, 임베딩, boto3)를 실행 중이므로 fork하면 자식이 fork 시점에 잡혀 있던
+    # 잠금에서 멈출 수 있음. spawn은 새 인터프리터에서 이 모듈만 임포트하므로 부모의 스레드/잠금 상태를 물려받지 않음
+    ctx = multiprocessing.get_context('spawn')
+    processes, receivers = [], []
+    for worker_index in range(workers):
+        receiver, sender = ctx.Pipe(duplex=False)
+        process = ctx.Process(
+            target=_worker,
+            args=(pdf_path, ranges[worker_index::workers], sender),
+            daemon=True
+        )
+        process.start()
+        sender.close()  # 부모 쪽 송신단은 닫아야 워커 종료 시 EOF를 받을 수 있음
+        processes.append(process)
+        receivers.append(receiver)
+
+    try:
+        for range_index in range(len(ranges)):
+            try:
+                status, payload = receivers[range_index % workers].recv()
+            except EOFError:
+                raise RuntimeError(f"PDF conversion worker exited unexpectedly (pages {ranges[range_index][0]}+).")
+            if status == "error":
+                raise RuntimeError(f"PDF conversion failed for pages {ranges[range_index][0]}+: {payload}")
+            yield from payload
+    finally:
+        for receiver in receivers:
+            receiver.close()
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+            process.join()
+
@@ -1,98 +1,341 @@
 # lambda/query_pipeline.py
 
+import time
+_IMPORT_START = time.perf_counter() # 콜드 스타트 분석용: 모듈 임포트 시작 시각
+
 import json
 import os
-import boto3
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import TypedDict, List, Optional
 from string import Template
 
-from opensearchpy import OpenSearch, RequestsHttpConnection, AWSV4SignerAuth
 from langgraph.graph import StateGraph, END
+from langgraph.config import get_stream_writer
 from langchain_core.messages import SystemMessage, HumanMessage
 
+import clients
+import resilience
 import templates # templates 모듈 임포트
+import tracing
+from answer_cache import AnswerCache, DynamoDBAnswerBackend, InMemoryAnswerBackend
+from chunker import approximate_token_count
+from context_packer import DEFAULT_MMR_LAMBDA, DEFAULT_TOKEN_BUDGET, ContextPacker
+from fast_router import FastRouter
+from manual_catalog import DEFAULT_CATALOG_KEY, DEFAULT_TTL_SECONDS, CatalogSnapshot, ManualCatalog, S3CatalogLoader
+from embedding_engine import is_throttling_error
+from embedding_service import EmbeddingService
+from retrieval import (DEFAULT_HYBRID_CANDIDATES, DEFAULT_REQUEST_TIMEOUT, DEFAULT_RRF_K, RETRIEVAL_MODES,
+                       MeasuringJSONSerializer, OpenSearchRetriever)
+from vector_format import encode_vector, vector_config_from_env
 
 # --- 환경 변수 ---
-OPENSEARCH_HOST = os.environ['OPENSEARCH_HOST']
-OPENSEARCH_INDEX = os.environ['OPENSEARCH_INDEX']
+RETRIEVER = os.environ.get('RETRIEVER', 'opensearch').lower() # 'opensearch' 또는 'local'(프로세스 내 벡터 검색)
+# RETRIEVER=opensearch이면 필수
+OPENSEARCH_HOST = os.environ.get('OPENSEARCH_HOST')
+OPENSEARCH_INDEX = os.environ.get('OPENSEARCH_INDEX')
 BEDROCK_EMBED_MODEL_ID = os.environ.get('BEDROCK_EMBED_MODEL_ID', 'amazon.titan-embed-text-v1')
 BEDROCK_LLM_MODEL_ID = os.environ.get('BEDROCK_LLM_MODEL_ID', 'anthropic.claude-sonnet-4-5-20250929-v1:0')
 AWS_REGION = os.environ.get('AWS_REGION', 'us-east-1')
 S3_BUCKET_NAME = os.environ.get('S3_BUCKET_NAME')
+MANUAL_CATALOG_BUCKET = os.environ.get('MANUAL_CATALOG_BUCKET') or S3_BUCKET_NAME # 매뉴얼 카탈로그 버킷
+MANUAL_CATALOG_KEY = os.environ.get('MANUAL_CATALOG_KEY', DEFAULT_CATALOG_KEY) # 색인 Lambda가 관리하는 카탈로그 객체 키
+MANUAL_CATALOG_TTL_SECONDS = float(os.environ.get('MANUAL_CATALOG_TTL_SECONDS', str(DEFAULT_TTL_SECONDS))) # 카탈로그 갱신 주기
+FAST_ROUTER_ENABLED = os.environ.get('FAST_ROUTER_ENABLED', 'true').lower() == 'true' # 명확한 질문은 LLM 라우터 없이 분류
+ROUTER_MAX_TOKENS = 256 # 라우터 응답은 짧은 JSON이므로 출력 토큰 상한을 낮게 유지
+PROMPT_CACHING = os.environ.get('PROMPT_CACHING', 'false').lower() == 'true' # 프롬프트의 정적 접두사(시스템 프롬프트)를 Bedrock 프롬프트 캐시에 저장
+PROMPT_CACHE_MIN_TOKENS = int(os.environ.get('PROMPT_CACHE_MIN_TOKENS', '1024')) # 모델의 프롬프트 캐시 최소 접두사 길이 (Claude Sonnet 1024)
+SPECULATIVE_EMBEDDING = os.environ.get('SPECULATIVE_EMBEDDING', 'true').lower() == 'true' # LLM 라우터와 동시에 질문 임베딩
+SPECULATIVE_PREFETCH_K = int(os.environ.get('SPECULATIVE_PREFETCH_K', '0')) # 0보다 크면 라우터와 동시에 필터 없는 kNN으로 후보를 미리 조회
+SEARCH_TOP_K = 3 # 답변 생성에 사용할 검색 결과 수 (CONTEXT_PACKING=false인 경우)
+CONTEXT_PACKING = os.environ.get('CONTEXT_PACKING', 'true').lower() == 'true' # 검색 후보를 토큰 예산 안에서 골라 프롬프트 구성
+CONTEXT_CANDIDATES = int(os.environ.get('CONTEXT_CANDIDATES', '8')) # 컨텍스트 패킹에 사용할 검색 후보 수
+CONTEXT_TOKEN_BUDGET = int(os.environ.get('CONTEXT_TOKEN_BUDGET', str(DEFAULT_TOKEN_BUDGET))) # 컨텍스트 최대 토큰 수
+CONTEXT_MMR_LAMBDA = float(os.environ.get('CONTEXT_MMR_LAMBDA', str(DEFAULT_MMR_LAMBDA))) # 관련도 대 다양성 비중
+SEARCH_SIZE = CONTEXT_CANDIDATES if CONTEXT_PACKING else SEARCH_TOP_K # 한 번에 가져올 검색 결과 수
+# 검색 결과의 앞뒤 인접 청크를 한 번 더(mget) 가져와 남은 토큰 예산으로 컨텍스트를 넓힘 (CONTEXT_PACKING 필요)
+CONTEXT_EXPANSION = os.environ.get('CONTEXT_EXPANSION', 'false').lower() == 'true'
+RETRIEVAL_MODE = os.environ.get('RETRIEVAL_MODE', 'knn').lower() # 'knn' 또는 'hybrid'(BM25 + kNN을 RRF로 결합)
+RRF_K = int(os.environ.get('RRF_K', str(DEFAULT_RRF_K))) # RRF 점수 1 / (k + 순위)의 k
+HYBRID_CANDIDATES = int(os.environ.get('HYBRID_CANDIDATES', str(DEFAULT_HYBRID_CANDIDATES))) # 하이브리드 검색에서 방식별 후보 수
+LOCAL_CORPUS_PATH = os.environ.get('LOCAL_CORPUS_PATH') # RETRIEVER=local의 코퍼스 (chunks.json 형식)
+LOCAL_CORPUS_SOURCE = os.environ.get('LOCAL_CORPUS_SOURCE', 'local-corpus.pdf') # 문자열 코퍼스 청크에 붙일 source 값
+LOCAL_VECTORS_PATH = os.environ.get('LOCAL_VECTORS_PATH') # 코퍼스 임베딩을 저장/재사용할 .npy 경로
+LOCAL_INDEX = os.environ.get('LOCAL_INDEX', 'flat') # 'flat'(전수 탐색) 또는 'ivf'(근사 인덱스)
+QUERY_EMBEDDING_CACHE_SIZE = int(os.environ.get('QUERY_EMBEDDING_CACHE_SIZE', '1024')) # 질문 임베딩 LRU 크기 (0이면 사용 안 함)
+ANSWER_CACHE_BACKEND = os.environ.get('ANSWER_CACHE_BACKEND', 'none') # 'none', 'memory', 'dynamodb'
+ANSWER_CACHE_TABLE = os.environ.get('ANSWER_CACHE_TABLE') # dynamodb 백엔드 테이블 이름
+ANSWER_CACHE_MAX_ENTRIES = int(os.environ.get('ANSWER_CACHE_MAX_ENTRIES', '1000')) # memory 백엔드 최대 항목 수
+ANSWER_CACHE_SIMILARITY = float(os.environ.get('ANSWER_CACHE_SIMILARITY', '0.95')) # 의미 일치 최소 코사인 유사도
+ANSWER_CACHE_TTL_SECONDS = int(os.environ.get('ANSWER_CACHE_TTL_SECONDS', str(7 * 24 * 3600))) # dynamodb 항목 만료 시간
+REQUEST_DEADLINE_SECONDS = float(os.environ.get('REQUEST_DEADLINE_SECONDS', '25')) # 요청 하나의 최대 처리 시간 (0이면 제한 없음)
+OPENSEARCH_TIMEOUT = float(os.environ.get('OPENSEARCH_TIMEOUT', str(DEFAULT_REQUEST_TIMEOUT))) # 검색 요청 하나의 최대 대기 시간(초)
+BEDROCK_CONNECT_TIMEOUT = float(os.environ.get('BEDROCK_CONNECT_TIMEOUT', '2')) # Bedrock 연결 제한 시간(초)
+BEDROCK_READ_TIMEOUT = float(os.environ.get('BEDROCK_READ_TIMEOUT', '20')) # Bedrock 응답(스트리밍은 다음 조각) 대기 제한 시간(초)
+HEDGE_EMBEDDING_AFTER_MS = float(os.environ.get('HEDGE_EMBEDDING_AFTER_MS', '0')) # 이 시간 안에 임베딩 응답이 없으면 한 번 더 요청 (0이면 사용 안 함)
+HEDGE_SEARCH_AFTER_MS = float(os.environ.get('HEDGE_SEARCH_AFTER_MS', '0')) # 이 시간 안에 검색 응답이 없으면 한 번 더 요청 (0이면 사용 안 함)
+CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get('CIRCUIT_FAILURE_THRESHOLD', '5')) # 연속 스로틀링 횟수가 이 값이면 Bedrock 회로 열기
+CIRCUIT_RESET_SECONDS = float(os.environ.get('CIRCUIT_RESET_SECONDS', '30')) # 회로를 연 뒤 다시 시험 호출하기까지의 시간
+DEADLINE_MARGIN_SECONDS = 1.0 # Lambda 제한 시간보다 이만큼 먼저 마감하여 대체 답변을 반환할 시간을 남김
+WARMUP_ON_INIT = os.environ.get('WARMUP_ON_INIT', 'true').lower() == 'true' # 프로비저닝된 동시성 컨테이너는 초기화 단계에서 워밍업
+WARMUP_MAX_QUERIES = int(os.environ.get('WARMUP_MAX_QUERIES', '20')) # 워밍업 이벤트에서 미리 임베딩할 최대 질문 수
+TRACE_SINK = os.environ.get('TRACE_SINK', 'emf').lower() # 요청별 노드/외부 호출 지표 출력: 'emf', 'memory', 'none'
+METRICS_NAMESPACE = os.environ.get('METRICS_NAMESPACE', tracing.DEFAULT_NAMESPACE) # CloudWatch 지표 네임스페이스
+# 임베딩 차원/양자화는 색인 Lambda와 같은 값이어야 함 (EMBEDDING_DIMENSION, VECTOR_QUANTIZATION)
+VECTOR_CONFIG = vector_config_from_env('BEDROCK_EMBED_MODEL_ID')
+# 연결 풀/재시도 설정 (CLIENT_MAX_POOL_CONNECTIONS, CLIENT_TCP_KEEPALIVE, AWS_RETRY_MODE, AWS_MAX_ATTEMPTS)
+# 풀 크기 기본값은 한 프로세스의 최대 동시 외부 호출 수 (bounded/hedge 호출 16 + 투기적 실행 4)
+CLIENT_CONFIG = clients.client_config_from_env(AWS_REGION, default_pool_connections=20)
+if RETRIEVAL_MODE not in RETRIEVAL_MODES:
+    raise ValueError(f"Unsupported RETRIEVAL_MODE '{RETRIEVAL_MODE}'. Expected one of {RETRIEVAL_MODES}.")
+if RETRIEVER not in ('opensearch', 'local'):
+    raise ValueError(f"Unsupported RETRIEVER '{RETRIEVER}'. Expected 'opensearch' or 'local'.")
+if RETRIEVER == 'opensearch' and not (OPENSEARCH_HOST and OPENSEARCH_INDEX):
+    raise ValueError(f"OPENSEARCH_HOST and OPENSEARCH_INDEX are required when RETRIEVER=opensearch "
+                     f"(got OPENSEARCH_HOST={OPENSEARCH_HOST!r}, OPENSEARCH_INDEX={OPENSEARCH_INDEX!r}).")
+if RETRIEVER == 'local' and not LOCAL_CORPUS_PATH:
+    raise ValueError(f"LOCAL_CORPUS_PATH is required when RETRIEVER=local (got {LOCAL_CORPUS_PATH!r}).")
+tracing.set_sink(tracing.create_sink(TRACE_SINK, METRICS_NAMESPACE))
+
+# --- 지연 초기화 리소스 ---
+# 클라이언트, 매뉴얼 목록, 그래프는 처음 사용할 때 만들고 컨테이너가 살아있는 동안 재사용합니다.
+# 각 리소스를 만드는 데 걸린 시간은 COLD_START_TIMINGS에 기록되어 첫 호출 시 로그로 남깁니다.
+_resources = {}
+_resources_lock = threading.RLock()
+COLD_START_TIMINGS = {}
+
+def _lazy(name, factory):
+    """name에 해당하는 리소스를 한 번만 생성하여 반환합니다. (스레드 안전)"""
+    resource = _resources.get(name)
+    if resource is None:
+        with _resources_lock:
+            resource = _resources.get(name)
+            if resource is None:
+                start = time.perf_counter()
+                resource = factory()
+                COLD_START_TIMINGS[name] = round(time.perf_counter() - start, 4)
+                _resources[name] = resource
+    return resource
+
+def get_bedrock_runtime():
+    return _lazy('bedrock_runtime', lambda: clients.boto3_client(
+        'bedrock-runtime', CLIENT_CONFIG, connect_timeout=BEDROCK_CONNECT_TIMEOUT, read_timeout=BEDROCK_READ_TIMEOUT))
+
+def get_bedrock_breaker() -> resilience.CircuitBreaker:
+    # 스로틀링이 이어지면 Bedrock 호출 없이 바로 대체 답변을 반환
+    return _lazy('bedrock_breaker', lambda: resilience.CircuitBreaker(
+        'bedrock', CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_SECONDS, is_failure=is_throttling_error))
+
+def get_call_executor() -> ThreadPoolExecutor:
+    # 마감 시각까지만 기다리거나 hedge 요청을 보내는 외부 호출용
+    return _lazy('call_executor', lambda: ThreadPoolExecutor(max_workers=16, thread_name_prefix='bounded'))
+
+def get_s3_client():
+    return _lazy('s3_client', lambda: clients.boto3_client('s3', CLIENT_CONFIG))
+
+def _create_opensearch_client():
+    # OpenSearch 클라이언트 설정 (SigV4 서명, 연결 풀은 CLIENT_CONFIG)
+    return clients.opensearch_client(
+        OPENSEARCH_HOST, CLIENT_CONFIG,
+        serializer=get_payload_meter(), # 응답 크기와 디코딩 시간 기록
+        timeout=OPENSEARCH_TIMEOUT
+    )
 
-# --- AWS 클라이언트 초기화 ---
-bedrock_runtime = boto3.client('bedrock-runtime', region_name=AWS_REGION)
-s3_client = boto3.client('s3')
+def get_payload_meter() -> MeasuringJSONSerializer:
+    return _lazy('payload_meter', MeasuringJSONSerializer)
 
-# --- S3 매뉴얼 목록 ---
-AVAILABLE_MANUALS = []
-if S3_BUCKET_NAME:
-    try:
-        paginator = s3_client.get_paginator('list_objects_v2')
-        pages = paginator.paginate(Bucket=S3_BUCKET_NAME)
-        for page in pages:
-            for obj in page.get('Contents', []):
-                key = obj.get('Key')
-                if key and key.lower().endswith('.pdf'):
-                    manual_name = os.path.splitext(os.path.basename(key))[0]
-                    AVAILABLE_MANUALS.append(manual_name)
-        print(f"Available manuals from S3: {AVAILABLE_MANUALS}")
-    except Exception as e:
-        print(f"Error listing manuals from S3 bucket {S3_BUCKET_NAME}: {e}")
-
-# OpenSearch 클라이언트 설정
-credentials = boto3.Session().get_credentials()
-auth = AWSV4SignerAuth(credentials, AWS_REGION, 'aoss')
-
-opensearch_client = OpenSearch(
-    hosts=[{'host': OPENSEARCH_HOST, 'port': 443}],
-    http_auth=auth,
-    use_ssl=True,
-    verify_certs=True,
-    connection_class=RequestsHttpConnection,
-    http_compress=True,
-    timeout=300
-)
+def get_opensearch_client():
+    return _lazy('opensearch_client', _create_opensearch_client)
+
+class _EmptyCatalogLoader:
+    """카탈로그 버킷이 설정되지 않은 경우 빈 카탈로그를 반환합니다."""
+    def load(self, previous=None):
+        return CatalogSnapshot([])
+
+def _create_manual_catalog():
+    # --- 매뉴얼 카탈로그 ---
+    # 색인 Lambda가 관리하는 manifest를 TTL 캐시로 읽음 (새 매뉴얼은 콜드 스타트 없이 TTL 이내에 반영)
+    if MANUAL_CATALOG_BUCKET:
+        loader = S3CatalogLoader(get_s3_client(), MANUAL_CATALOG_BUCKET, MANUAL_CATALOG_KEY)
+    else:
+        loader = _EmptyCatalogLoader()
+    catalog = ManualCatalog(loader, ttl_seconds=MANUAL_CATALOG_TTL_SECONDS)
+    print(f"Available manuals from catalog: {catalog.get().names}")
+    return catalog
+
+def get_manual_catalog() -> ManualCatalog:
+    return _lazy('manual_discovery', _create_manual_catalog)
+
+def _create_answer_cache():
+    if ANSWER_CACHE_BACKEND == 'memory':
+        backend = InMemoryAnswerBackend(max_entries=ANSWER_CACHE_MAX_ENTRIES)
+    elif ANSWER_CACHE_BACKEND == 'dynamodb':
+        backend = DynamoDBAnswerBackend(clients.boto3_client('dynamodb', CLIENT_CONFIG), ANSWER_CACHE_TABLE,
+                                        ttl_seconds=ANSWER_CACHE_TTL_SECONDS)
+    else:
+        return False  # 캐시 사용 안 함 (None은 '아직 생성 전'을 뜻하므로 False로 기록)
+    return AnswerCache(backend, similarity_threshold=ANSWER_CACHE_SIMILARITY)
+
+def get_answer_cache() -> Optional[AnswerCache]:
+    return _lazy('answer_cache', _create_answer_cache) or None
+
+def get_embedding_service() -> EmbeddingService:
+    return _lazy('embedding_service', lambda: EmbeddingService(
+        get_bedrock_runtime(), VECTOR_CONFIG, query_cache_size=QUERY_EMBEDDING_CACHE_SIZE))
+
+def get_speculation_executor() -> ThreadPoolExecutor:
+    return _lazy('speculation_executor', lambda: ThreadPoolExecutor(max_workers=4, thread_name_prefix='speculative'))
+
+def _create_retriever():
+    if RETRIEVER == 'local':
+        from local_retriever import LocalVectorRetriever  # NumPy 엔진은 로컬 검색기를 쓸 때만 임포트
+        embed_texts = lambda texts: (vector for _, vector in get_embedding_service().embed_batch(texts))
+        return LocalVectorRetriever.from_corpus(
+            LOCAL_CORPUS_PATH, embed_texts, LOCAL_CORPUS_SOURCE, vectors_path=LOCAL_VECTORS_PATH,
+            mode=RETRIEVAL_MODE, index=LOCAL_INDEX, rrf_k=RRF_K, candidates=HYBRID_CANDIDATES)
+    return OpenSearchRetriever(get_opensearch_client(), OPENSEARCH_INDEX, mode=RETRIEVAL_MODE,
+                               request_timeout=OPENSEARCH_TIMEOUT,
+                               rrf_k=RRF_K, candidates=HYBRID_CANDIDATES)
+
+def get_retriever():
+    """검색기를 반환합니다. (OpenSearchRetriever 또는 LocalVectorRetriever, 같은 search 인터페이스)"""
+    return _lazy('retriever', _create_retriever)
+
+def get_context_packer() -> ContextPacker:
+    return _lazy('context_packer', lambda: ContextPacker(token_budget=CONTEXT_TOKEN_BUDGET,
+                                                         mmr_lambda=CONTEXT_MMR_LAMBDA))
+
+def get_fast_router() -> FastRouter:
+    return _lazy('fast_router', FastRouter)
+
+def get_available_manuals() -> List[str]:
+    return get_manual_catalog().get().names
+
+def get_app():
+    """컴파일된 LangGraph 앱을 반환합니다."""
+    return _lazy('graph_compile', _build_graph)
+
+def __getattr__(name):
+    """기존 모듈 속성(app, AVAILABLE_MANUALS, 클라이언트)으로 접근해도 지연 초기화되도록 합니다."""
+    lazy_attributes = {
+        'app': get_app,
+        'AVAILABLE_MANUALS': get_available_manuals,
+        'bedrock_runtime': get_bedrock_runtime,
+        's3_client': get_s3_client,
+        'opensearch_client': get_opensearch_client,
+    }
+    if name in lazy_attributes:
+        return lazy_attributes[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # --- Bedrock LLM 호출 헬퍼 ---
 
-def _invoke_llm(messages: List[dict], max_tokens: int = 2048, temperature: float = 0.1, top_p: float = 0.9) -> str:
-    """Bedrock LLM을 직접 호출하여 응답을 반환합니다 (non-streaming)."""
-    body = json.dumps({
-        "anthropic_version": "bedrock-2023-05-31",
-        "max_tokens": max_tokens,
-        "temperature": temperature,
-        "top_p": top_p,
-        "messages": messages
-    })
-    response = bedrock_runtime.invoke_model(
-        body=body,
-        modelId=BEDROCK_LLM_MODEL_ID,
-        accept='application/json',
-        contentType='application/json'
-    )
-    response_body = json.loads(response['body'].read())
-    return response_body['content'][0]['text']
+_short_cache_prefixes = set()  # 캐시 최소 길이보다 짧다고 이미 기록한 프롬프트 label
 
-def _stream_llm(messages: List[dict], max_tokens: int = 2048, temperature: float = 0.1, top_p: float = 0.9):
-    """Bedrock LLM을 직접 호출하여 응답을 스트리밍합니다."""
-    body = json.dumps({
+def _system_blocks(*texts: str, label: str = "llm") -> List[dict]:
+    """
+    시스템 프롬프트 블록 목록을 만듭니다. PROMPT_CACHING이면 마지막 블록에 cache_control을 붙여
+    그 블록까지의 접두사(요청마다 같은 부분)를 Bedrock 프롬프트 캐시에 저장/재사용하도록 합니다.
+    접두사가 PROMPT_CACHE_MIN_TOKENS보다 짧으면 Bedrock이 오류 없이 캐싱을 생략하므로, label별로 한 번 로그를 남깁니다.
+    """
+    blocks = [{"type": "text", "text": text} for text in texts if text]
+    if PROMPT_CACHING and blocks:
+        blocks[-1]["cache_control"] = {"type": "ephemeral"}
+        prefix_tokens = sum(approximate_token_count(block["text"]) for block in blocks)
+        if prefix_tokens < PROMPT_CACHE_MIN_TOKENS and label not in _short_cache_prefixes:
+            _short_cache_prefixes.add(label)
+            print(json.dumps({"prompt_cache": {"label": label, "approx_prefix_tokens": prefix_tokens,
+                                               "min_tokens": PROMPT_CACHE_MIN_TOKENS, "cached": False}}))
+    return blocks
+
+def _llm_request_body(messages: List[dict], system: Optional[List[dict]], max_tokens: int, temperature: float,
+                      top_p: float) -> str:
+    request = {
         "anthropic_version": "bedrock-2023-05-31",
         "max_tokens": max_tokens,
         "temperature": temperature,
         "top_p": top_p,
         "messages": messages
-    })
-    response_stream = bedrock_runtime.invoke_model_with_response_stream(
-        body=body,
-        modelId=BEDROCK_LLM_MODEL_ID,
-        accept='application/json',
-        contentType='application/json'
-    )
-    for event in response_stream['body']:
-        chunk = json.loads(event['chunk']['bytes'])
-        if chunk['type'] == 'content_block_delta':
-            yield chunk['delta']['text']
+    }
+    if system:
+        request["system"] = system
+    return json.dumps(request)
+
+def _log_llm_usage(label: str, usage: dict, first_token_seconds: Optional[float], total_seconds: float) -> None:
+    """토큰 사용량(프롬프트 캐시 적중/저장 토큰 포함)과 지연 시간을 JSON 한 줄로 기록하고 현재 span에도 남깁니다."""
+    metrics = {
+        "input_tokens": usage.get("input_tokens", 0),
+        "output_tokens": usage.get("output_tokens", 0),
+        "cache_read_input_tokens": usage.get("cache_read_input_tokens", 0),
+        "cache_creation_input_tokens": usage.get("cache_creation_input_tokens", 0),
+        "first_token_ms": round(first_token_seconds * 1000, 1) if first_token_seconds is not None else None,
+        "total_ms": round(total_seconds * 1000, 1),
+    }
+    tracing.annotate(**metrics)
+    print(json.dumps({"llm_usage": {"label": label, **metrics}}))
+
+def _invoke_llm(messages: List[dict], system: Optional[List[dict]] = None, max_tokens: int = 2048,
+                temperature: float = 0.1, top_p: float = 0.9, label: str = "llm") -> str:
+    """
+    Bedrock LLM을 직접 호출하여 응답을 반환합니다 (non-streaming). system은 _system_blocks로 만든 블록 목록입니다.
+    요청의 마감 시각까지만 기다리며, Bedrock 회로가 열려 있으면 호출하지 않고 CircuitOpenError를 발생시킵니다.
+    """
+    def call():
+        response = get_bedrock_runtime().invoke_model(
+            body=_llm_request_body(messages, system, max_tokens, temperature, top_p),
+            modelId=BEDROCK_LLM_MODEL_ID,
+            accept='application/json',
+            contentType='application/json'
+        )
+        return json.loads(response['body'].read())
+
+    with get_bedrock_breaker().guard(), tracing.span(f"bedrock.{label}", kind="bedrock"):
+        start = time.perf_counter()
+        response_body = resilience.bounded_call(call, executor=get_call_executor(), stage=f"bedrock.{label}")
+        elapsed = time.perf_counter() - start
+        _log_llm_usage(label, response_body.get('usage', {}), elapsed, elapsed)
+        return response_body['content'][0]['text']
+
+def _stream_llm(messages: List[dict], system: Optional[List[dict]] = None, max_tokens: int = 2048,
+                temperature: float = 0.1, top_p: float = 0.9, label: str = "llm"):
+    """
+    Bedrock LLM을 직접 호출하여 응답을 스트리밍합니다. system은 _system_blocks로 만든 블록 목록입니다.
+    호출과 첫 조각까지는 요청의 마감 시각까지만 기다리고, 이후에는 조각 사이마다 마감 시각을 확인합니다.
+    (조각 하나를 기다리는 시간은 BEDROCK_READ_TIMEOUT으로 제한됨)
+    """
+    stage = f"bedrock.{label}"
+    with get_bedrock_breaker().guard(), tracing.span(stage, kind="bedrock"):
+        start = time.perf_counter()
+
+        def open_stream():
+            response_stream = get_bedrock_runtime().invoke_model_with_response_stream(
+                body=_llm_request_body(messages, system, max_tokens, temperature, top_p),
+                modelId=BEDROCK_LLM_MODEL_ID,
+                accept='application/json',
+                contentType='application/json'
+            )
+            events = iter(response_stream['body'])
+            return next(events, None), events
+
+        # 첫 이벤트는 프롬프트 처리가 끝나야 오므로 가장 오래 걸림. 이 구간만 다른 스레드에서 마감 시각까지 기다림
+        # (조각마다 스레드를 오가지 않음)
+        event, events = resilience.bounded_call(open_stream, executor=get_call_executor(), stage=stage)
+        usage = {}
+        first_token = None
+        while event is not None:
+            chunk = json.loads(event['chunk']['bytes'])
+            if chunk['type'] == 'content_block_delta':
+                if first_token is None:
+                    first_token = time.perf_counter() - start
+                yield chunk['delta']['text']
+            elif chunk['type'] == 'message_start':
+                # 입력 토큰(캐시 적중/저장 포함)은 message_start, 출력 토큰은 message_delta에 담겨 옴
+                usage.update(chunk['message'].get('usage', {}))
+            elif chunk['type'] == 'message_delta':
+                usage.update(chunk.get('usage', {}))
+            resilience.check_deadline(stage)
+            event = next(events, None)
+        _log_llm_usage(label, usage, first_token, time.perf_counter() - start)
 
 # --- LangGraph 상태 정의 ---
 
@@ -103,27 +346,184 @@ class GraphState(TypedDict):
     query: str
     scenario: str # 추가: 쿼리 분석 결과 시나리오
     manual_name: Optional[str] # 추가: 추출된 매뉴얼 이름
+    manual_source: Optional[str] # 카탈로그에서 찾은 매뉴얼의 source 값 (검색 필터에 사용)
+    prefetched_chunks: Optional[List[dict]] # 라우터와 동시에 미리 조회한 검색 결과 (해당 매뉴얼 것만)
     embedding: List[float]
     context_chunks: List[dict]
+    neighbor_chunks: Optional[List[dict]] # 컨텍스트 확장용 인접 청크 (CONTEXT_EXPANSION)
     prompt: str
     generation: str
+    cache_hit: Optional[str] # 답변 캐시 적중 계층 ('exact' 또는 'semantic')
+
+# --- 검색 헬퍼 ---
+
+def _embed_query(query: str) -> List[float]:
+    """
+    질문의 임베딩 벡터를 색인과 같은 형태로 생성합니다. (최근에 같은 질문이 있었으면 Bedrock 호출 생략)
+    HEDGE_EMBEDDING_AFTER_MS 안에 응답이 없으면 같은 요청을 한 번 더 보냅니다.
+    """
+    with tracing.span("embed_query", kind="embedding"):
+        embedding = get_bedrock_breaker().call(
+            resilience.bounded_call, get_embedding_service().embed, query, executor=get_call_executor(),
+            hedge_after=HEDGE_EMBEDDING_AFTER_MS / 1000 or None, stage="embed_query")
+        return encode_vector(VECTOR_CONFIG, embedding)
+
+def _search(text: Optional[str], embedding: List[float], k: int, source: Optional[str] = None,
+            span_name: str = "search") -> List[dict]:
+    """
+    RETRIEVAL_MODE에 따라 k-NN 또는 하이브리드(BM25 + k-NN, RRF 결합) 검색으로 문서 청크 목록을 반환합니다.
+    source가 있으면 해당 매뉴얼로 한정하고, text가 None이면 모드와 관계없이 k-NN 검색만 수행합니다.
+    span 이름은 '<RETRIEVER>.<span_name>'이며, 투기적 사전 조회는 'search.prefetch'로 실제 검색과 구분합니다.
+    """
+    name = f"{RETRIEVER}.{span_name}"
+    with tracing.span(name, kind="retriever", mode=RETRIEVAL_MODE if text else "knn") as span:
+        chunks = resilience.bounded_call(
+            lambda: get_retriever().search(embedding, k, source, text=text), executor=get_call_executor(),
+            hedge_after=HEDGE_SEARCH_AFTER_MS / 1000 or None, stage=name)
+        span.set(hits=len(chunks))
+        return chunks
+
+# --- 투기적 실행 (라우터와 임베딩/검색 병렬화) ---
+# 질문 임베딩은 라우터 결과와 무관하므로 LLM 라우터 호출과 동시에 시작합니다.
+# 라우터가 'manual_query'로 판단하면 결과를 사용하고, 그 밖의 시나리오에서는 버립니다.
+
+def _speculate(query: str):
+    embedding = _embed_query(query)
+    # 미리 조회한 결과를 매뉴얼 내 상위 결과로 쓸 수 있는 것은 k-NN 순위뿐이므로, hybrid 모드에서는 임베딩만 미리 계산
+    prefetch = SPECULATIVE_PREFETCH_K > 0 and RETRIEVAL_MODE != "hybrid"
+    prefetched = _search(None, embedding, SPECULATIVE_PREFETCH_K, span_name="search.prefetch") if prefetch else None
+    return embedding, prefetched
+
+def _use_speculation(speculation, source: str) -> dict:
+    """투기적 실행 결과를 상태 갱신 값으로 변환합니다. 실패하면 빈 dict를 반환하여 일반 경로로 처리합니다."""
+    if speculation is None:
+        return {}
+    try:
+        embedding, prefetched = speculation.result(timeout=resilience.remaining())
+    except Exception as e:
+        print(f"Speculative embedding failed, falling back to the regular path: {e}")
+        return {}
+    update = {"embedding": embedding}
+    if prefetched is not None:
+        # 필터 없는 상위 K개 중 해당 매뉴얼 문서가 SEARCH_SIZE개 이상이면, 그것이 곧 매뉴얼 내 상위 결과임
+        # (매뉴얼 내에서 더 가까운 문서가 있었다면 전체 상위 K개에도 포함되었을 것이므로)
+        chunks = [chunk for chunk in prefetched if chunk.get('source') == source][:SEARCH_SIZE]
+        if len(chunks) == SEARCH_SIZE:
+            update["prefetched_chunks"] = chunks
+        print(f"Speculative prefetch: {len(chunks)} of {len(prefetched)} hits from '{source}'.")
+    print("Speculative embedding used.")
+    return update
+
+def _discard_speculation(speculation) -> None:
+    if speculation is not None and not speculation.cancel():
+        print("Speculative embedding discarded.")
 
 # --- LangGraph 노드 함수들 ---
 
+def check_answer_cache_node(state: GraphState) -> GraphState:
+    """정규화된 질문이 같은 답변이 캐시에 있고, 그 매뉴얼의 색인 버전이 그대로면 바로 반환합니다."""
+    print("Node: check_answer_cache_node")
+    answer_cache = get_answer_cache()
+    if answer_cache is None:
+        return {}
+    try:
+        current_versions = {entry.name: entry.index_version for entry in get_manual_catalog().get().entries}
+        cached = answer_cache.lookup_exact(state['query'], current_versions)
+    except Exception as e:
+        print(f"Answer cache lookup failed: {e}")
+        return {}
+    if cached is None:
+        return {}
+    print(json.dumps({"answer_cache": "exact_hit", "manual": cached.manual_name, "stats": answer_cache.stats()},
+                     ensure_ascii=False))
+    return {
+        "scenario": "manual_query",
+        "manual_name": cached.manual_name,
+        "generation": cached.answer,
+        "cache_hit": "exact"
+    }
+
+def check_semantic_cache_node(state: GraphState) -> GraphState:
+    """같은 매뉴얼(같은 색인 버전)에 의미가 거의 같은 질문의 답변이 있으면 검색과 생성을 생략합니다."""
+    print("Node: check_semantic_cache_node")
+    answer_cache = get_answer_cache()
+    manual = get_manual_catalog().get().by_name.get(state.get("manual_name") or "")
+    if answer_cache is None or manual is None:
+        return {}
+    try:
+        found = answer_cache.lookup_semantic(state['embedding'], manual.name, manual.index_version)
+    except Exception as e:
+        print(f"Answer cache lookup failed: {e}")
+        return {}
+    if found is None:
+        print(json.dumps({"answer_cache": "miss", "stats": answer_cache.stats()}))
+        return {}
+    cached, similarity = found
+    print(json.dumps({"answer_cache": "semantic_hit", "manual": manual.name, "similarity": round(similarity, 4),
+                      "stats": answer_cache.stats()}, ensure_ascii=False))
+    return {"generation": cached.answer, "cache_hit": "semantic"}
+
+def store_answer_node(state: GraphState) -> GraphState:
+    """생성한 답변을 답변 캐시에 저장합니다."""
+    print("Node: store_answer_node")
+    answer_cache = get_answer_cache()
+    manual = get_manual_catalog().get().by_name.get(state.get("manual_name") or "")
+    if answer_cache is not None and manual is not None and state.get("generation"):
+        try:
+            answer_cache.store(state['query'], state.get('embedding'), state['generation'],
+                               manual.name, manual.index_version)
+        except Exception as e:
+            print(f"Answer cache store failed: {e}")
+    return {}
+
 def analyze_query_node(state: GraphState) -> GraphState:
     """사용자 질문의 의도를 분석하고 매뉴얼 이름을 추출 및 검증하여 시나리오를 결정합니다."""
     print("Node: analyze_query_node")
     query = state['query']
     
-    manual_list_str = ", ".join(AVAILABLE_MANUALS) if AVAILABLE_MANUALS else "없음"
-    router_prompt_text = templates.ROUTER_PROMPT_TEMPLATE.substitute(
-        query=query,
-        available_manuals=manual_list_str
+    catalog = get_manual_catalog().get()
+
+    # --- 결정적 라우터 (fast path) ---
+    # 인사/잡담이나 한 매뉴얼이 명확히 언급된 질문은 LLM 호출 없이 분류
+    if FAST_ROUTER_ENABLED:
+        fast_router = get_fast_router()
+        decision = fast_router.route(query, catalog)
+        if decision is not None:
+            fast_router.record(fast_path=True)
+            print(json.dumps({"router": "fast", "reason": decision.reason, "scenario": decision.scenario,
+                              "manual": decision.manual.name if decision.manual else None,
+                              "stats": fast_router.stats()}, ensure_ascii=False))
+            if decision.manual is not None:
+                return {
+                    "scenario": decision.scenario,
+                    "manual_name": decision.manual.name,
+                    "manual_source": decision.manual.source
+                }
+            return {"scenario": decision.scenario, "manual_name": None}
+
+    # 역할/예시와 매뉴얼 목록은 요청마다 같으므로 시스템 프롬프트(캐시 접두사)에, 질문만 사용자 메시지에 넣음
+    manual_list_str = ", ".join(catalog.names) if catalog.names else "없음"
+    router_system = _system_blocks(
+        templates.ROUTER_SYSTEM_PROMPT,
+        templates.ROUTER_MANUALS_TEMPLATE.substitute(available_manuals=manual_list_str),
+        label="router"
     )
+    router_prompt_text = templates.ROUTER_QUERY_TEMPLATE.substitute(query=query)
     
+    # LLM 라우터를 기다리는 동안 질문 임베딩(과 선택적으로 필터 없는 검색)을 미리 수행
+    speculation = get_speculation_executor().submit(tracing.bind(_speculate), query) if SPECULATIVE_EMBEDDING else None
+
     # LLM을 사용하여 쿼리 분류
     messages = [{"role": "user", "content": router_prompt_text}]
-    response_text = _invoke_llm(messages)
+    router_start = time.perf_counter()
+    try:
+        response_text = _invoke_llm(messages, system=router_system, max_tokens=ROUTER_MAX_TOKENS, label="router")
+    except Exception:
+        _discard_speculation(speculation)
+        raise
+    if FAST_ROUTER_ENABLED:
+        fast_router.record(fast_path=False, llm_latency=time.perf_counter() - router_start)
+        print(json.dumps({"router": "llm", "stats": fast_router.stats()}))
     
     try:
         scenario_data = json.loads(response_text)
@@ -138,22 +538,26 @@ def analyze_query_node(state: GraphState) -> GraphState:
 
     # --- 매뉴얼 이름 검증 ---
     if scenario == 'manual_query' and manual_name:
-        # 대소문자 구분 없이, 추출된 이름이 포함된 첫 번째 매뉴얼을 찾음
-        matched_manual = next((m for m in AVAILABLE_MANUALS if manual_name.lower() in m.lower()), None)
+        # 정규화된 별칭 완전 일치를 우선하고, 없으면 이름에 포함된 첫 번째 매뉴얼을 찾음
+        matched_manual = catalog.find(manual_name)
         
         if matched_manual:
-            print(f"Extracted manual '{manual_name}' matched with '{matched_manual}' from S3.")
+            print(f"Extracted manual '{manual_name}' matched with '{matched_manual.name}' from catalog.")
             return {
                 "scenario": "manual_query",
-                "manual_name": matched_manual
+                "manual_name": matched_manual.name,
+                "manual_source": matched_manual.source,
+                **_use_speculation(speculation, matched_manual.source)
             }
         else:
             print(f"Extracted manual '{manual_name}' not found in available manuals.")
+            _discard_speculation(speculation)
             return {
                 "scenario": "invalid_manual", # 시나리오 변경
                 "manual_name": manual_name # 사용자가 입력한 이름 전달
             }
             
+    _discard_speculation(speculation)
     return {
         "scenario": scenario,
         "manual_name": manual_name
@@ -162,57 +566,45 @@ def analyze_query_node(state: GraphState) -> GraphState:
 def get_embedding_node(state: GraphState) -> GraphState:
     """Bedrock을 호출하여 주어진 텍스트의 임베딩 벡터를 생성합니다."""
     print("Node: get_embedding_node")
-    query = state['query']
-    body = json.dumps({"inputText": query})
-    response = bedrock_runtime.invoke_model(
-        body=body,
-        modelId=BEDROCK_EMBED_MODEL_ID,
-        accept='application/json',
-        contentType='application/json'
-    )
-    response_body = json.loads(response['body'].read())
-    return {"embedding": response_body['embedding']}
+    if state.get("embedding"):
+        # 라우터와 동시에 계산해 둔 임베딩이 있으면 그대로 사용
+        return {}
+    return {"embedding": _embed_query(state['query'])}
 
 def search_opensearch_node(state: GraphState) -> GraphState:
-    """OpenSearch에서 k-NN 검색을 수행하여 가장 유사한 문서 청크를 찾습니다."""
+    """검색기(OpenSearch 또는 로컬 엔진, RETRIEVER)에서 k-NN(또는 하이브리드) 검색으로 가장 관련 있는 문서 청크를 찾습니다."""
     print("Node: search_opensearch_node")
-    query_embedding = state['embedding']
-    manual_name = state.get("manual_name")
-
-    knn_query_part = {
-        "vector": query_embedding,
-        "k": 3
-    }
-
-    # manual_name이 있으면 필터 추가
-    if manual_name:
-        print(f"Applying filter for manual: {manual_name}")
-        # 'source' 필드가 'metadata' 객체 안에 있다고 가정
-        knn_query_part["filter"] = {
-            "term": {
-                "source": manual_name
-            }
-        }
+    meter = get_payload_meter()
+    meter.begin()
+    if state.get("prefetched_chunks"):
+        # 라우터와 동시에 미리 조회한 결과로 충분하면 다시 검색하지 않음
+        print("Using speculatively prefetched chunks.")
+        chunks = state["prefetched_chunks"]
     else:
-        # manual_name이 없는 경우 (예: fallback), 필터 없이 검색
-        # 현재 로직 상 manual_query 시나리오만 이 노드에 도달하므로 이 경우는 발생하지 않아야 함
-        print("Warning: manual_name not provided. Searching without a filter.")
-
-    query = {
-        "size": 3,
-        "query": {
-            "knn": {
-                "embedding": knn_query_part
-            }
-        }
-    }
-    response = opensearch_client.search(
-        body=query,
-        index=OPENSEARCH_INDEX
-    )
-    hits = response['hits']['hits']
-    return {"context_chunks": [hit['_source'] for hit in hits]}
-
+        query_embedding = state['embedding']
+        manual_name = state.get("manual_name")
+        # 문서의 source 필드에는 S3 키가 저장되므로, 카탈로그에서 찾은 source 값으로 필터링
+        manual_source = state.get("manual_source") or manual_name
+
+        # manual_name이 있으면 필터 추가
+        if manual_name:
+            print(f"Applying filter for manual: {manual_name} (source: {manual_source})")
+        else:
+            # manual_name이 없는 경우 (예: fallback), 필터 없이 검색
+            # 현재 로직 상 manual_query 시나리오만 이 노드에 도달하므로 이 경우는 발생하지 않아야 함
+            print("Warning: manual_name not provided. Searching without a filter.")
+        chunks = _search(state['query'], query_embedding, SEARCH_SIZE, manual_source if manual_name else None)
+
+    update = {"context_chunks": chunks}
+    if CONTEXT_EXPANSION and CONTEXT_PACKING and chunks:
+        with tracing.span(f"{RETRIEVER}.neighbors", kind="retriever") as span:
+            update["neighbor_chunks"] = get_retriever().neighbors(chunks)
+            span.set(hits=len(update["neighbor_chunks"]))
+    payload = meter.current()
+    if payload["responses"]:
+        print(json.dumps({"retrieval_payload": payload}))
+        tracing.annotate(**payload)
+    return update
 
 def construct_prompt_node(state: GraphState) -> GraphState:
     """검색된 컨텍스트를 기반으로 Bedrock LLM에 보낼 프롬프트를 구성합니다."""
@@ -221,12 +613,21 @@ def construct_prompt_node(state: GraphState) -> GraphState:
     context_chunks = state['context_chunks']
     manual_name = state.get("manual_name", "Unknown Manual") # Fallback for source_name
 
+    if CONTEXT_PACKING:
+        # 중복 제거, MMR 선택, 인접 청크 병합 후 토큰 예산 안의 문서만 사용
+        documents, stats = get_context_packer().pack(context_chunks, state.get("neighbor_chunks"))
+        print(json.dumps({"context_packer": stats}))
+        tracing.annotate(context_tokens=stats["context_tokens"], documents=stats["documents"])
+        documents = [(document.text, ", ".join(str(page) for page in document.pages) or 'N/A')
+                     for document in documents]
+    else:
+        documents = [(chunk['text'], chunk.get('page', 'N/A')) for chunk in context_chunks]
+
     context_parts = []
-    for i, chunk in enumerate(context_chunks):
-        page_number = chunk.get('page', 'N/A')
+    for i, (text, page_number) in enumerate(documents):
         # BUG FIX: Use manual_name from state as source_name was not defined
         context_parts.append(
-            f"<document index=\"{i+1}\" source_name=\"{manual_name}\" page_number=\"{page_number}\">\n{chunk['text']}\n</document>"
+            f"<document index=\"{i+1}\" source_name=\"{manual_name}\" page_number=\"{page_number}\">\n{text}\n</document>"
         )
     context = "\n\n".join(context_parts)
 
@@ -242,17 +643,22 @@ def generate_response_node(state: GraphState) -> GraphState:
     print("Node: generate_response_node")
     prompt = state['prompt']
     
-    # LLM을 직접 호출 (non-streaming)
+    # LLM 응답을 스트리밍으로 받아, 조각이 도착하는 대로 그래프의 custom 스트림으로 내보냄
     messages = [{"role": "user", "content": prompt}]
-    generated_text = _invoke_llm(messages)
+    writer = get_stream_writer()
+    parts = []
+    system = _system_blocks(templates.MANUAL_QUERY_SYSTEM_PROMPT, label="answer")
+    for delta in _stream_llm(messages, system=system, label="answer"):
+        parts.append(delta)
+        writer({"delta": delta})
     
-    return {"generation": generated_text}
+    return {"generation": "".join(parts)}
 
 def handle_invalid_manual_node(state: GraphState) -> GraphState:
     """유효하지 않은 매뉴얼 이름이 감지되었을 때 메시지를 생성합니다."""
     print("Node: handle_invalid_manual_node")
     invalid_name = state.get("manual_name", "알 수 없는")
-    manual_list_str = ", ".join(AVAILABLE_MANUALS)
+    manual_list_str = ", ".join(get_manual_catalog().get().names)
     
     if manual_list_str:
         available_manuals_message = f"현재 사용 가능한 매뉴얼 목록입니다: {manual_list_str}"
@@ -280,6 +686,13 @@ def handle_no_context_node(state: GraphState) -> GraphState:
 
 # --- LangGraph 조건부 엣지 ---
 
+def decide_after_cache_check(state: GraphState) -> str:
+    """답변 캐시 적중 여부에 따라 다음 노드를 결정합니다."""
+    if state.get("cache_hit"):
+        print(f"Decision: answer cache hit ({state['cache_hit']}), finishing")
+        return "end"
+    return "continue"
+
 def decide_next_step_after_analysis(state: GraphState) -> str:
     """쿼리 분석 결과에 따라 다음 노드를 결정합니다."""
     print("Conditional edge: decide_next_step_after_analysis")
@@ -306,52 +719,230 @@ def decide_context_path(state: GraphState) -> str:
 
 # --- 그래프 구성 및 컴파일 ---
 
-workflow = StateGraph(GraphState)
-
-# 노드 추가
-workflow.add_node("analyze_query", analyze_query_node)
-workflow.add_node("get_embedding", get_embedding_node)
-workflow.add_node("search_opensearch", search_opensearch_node)
-workflow.add_node("construct_prompt", construct_prompt_node)
-workflow.add_node("generate_response", generate_response_node)
-workflow.add_node("handle_no_context", handle_no_context_node)
-workflow.add_node("handle_invalid_manual", handle_invalid_manual_node)
-
-# 엣지 연결
-workflow.set_entry_point("analyze_query")
-workflow.add_conditional_edges(
-    "analyze_query",
-    decide_next_step_after_analysis,
-    {
-        "get_embedding": "get_embedding",
-        "handle_no_context": "handle_no_context",
-        "handle_invalid_manual": "handle_invalid_manual"
-    }
-)
-workflow.add_edge("get_embedding", "search_opensearch")
-workflow.add_conditional_edges(
-    "search_opensearch",
-    decide_context_path,
-    {
-        "construct_prompt": "construct_prompt",
-        "handle_no_context": "handle_no_context" # 컨텍스트 없음 처리
+def _build_graph():
+    """RAG 파이프라인 그래프를 구성하고 컴파일합니다."""
+    workflow = StateGraph(GraphState)
+
+    # 노드 추가 (각 노드의 소요 시간은 노드 이름의 span으로 기록, 실행 전 요청의 마감 시각 확인)
+    nodes = {
+        "check_answer_cache": check_answer_cache_node,
+        "analyze_query": analyze_query_node,
+        "get_embedding": get_embedding_node,
+        "check_semantic_cache": check_semantic_cache_node,
+        "search_opensearch": search_opensearch_node,
+        "construct_prompt": construct_prompt_node,
+        "generate_response": generate_response_node,
+        "handle_no_context": handle_no_context_node,
+        "handle_invalid_manual": handle_invalid_manual_node,
+        "store_answer": store_answer_node,
     }
-)
-workflow.add_edge("construct_prompt", "generate_response")
-workflow.add_edge("handle_no_context", END)
-workflow.add_edge("handle_invalid_manual", END)
-workflow.add_edge("generate_response", END)
+    for name, node in nodes.items():
+        workflow.add_node(name, tracing.traced_node(name, resilience.checked_node(name, node)))
+
+    # 엣지 연결
+    workflow.set_entry_point("check_answer_cache")
+    workflow.add_conditional_edges(
+        "check_answer_cache",
+        decide_after_cache_check,
+        {"end": END, "continue": "analyze_query"}
+    )
+    workflow.add_conditional_edges(
+        "analyze_query",
+        decide_next_step_after_analysis,
+        {
+            "get_embedding": "get_embedding",
+            "handle_no_context": "handle_no_context",
+            "handle_invalid_manual": "handle_invalid_manual"
+        }
+    )
+    workflow.add_edge("get_embedding", "check_semantic_cache")
+    workflow.add_conditional_edges(
+        "check_semantic_cache",
+        decide_after_cache_check,
+        {"end": END, "continue": "search_opensearch"}
+    )
+    workflow.add_conditional_edges(
+        "search_opensearch",
+        decide_context_path,
+        {
+            "construct_prompt": "construct_prompt",
+            "handle_no_context": "handle_no_context" # 컨텍스트 없음 처리
+        }
+    )
+    workflow.add_edge("construct_prompt", "generate_response")
+    workflow.add_edge("handle_no_context", END)
+    workflow.add_edge("handle_invalid_manual", END)
+    workflow.add_edge("generate_response", "store_answer")
+    workflow.add_edge("store_answer", END)
 
-# 그래프 컴파일
-app = workflow.compile()
+    # 그래프 컴파일
+    return workflow.compile()
 
 # --- Lambda 핸들러 ---
 
+_cold_start_logged = False
+
+def _log_cold_start_once():
+    """컨테이너의 첫 호출이 끝난 뒤, 임포트와 리소스 초기화에 걸린 시간(초)을 한 번만 로그로 남깁니다."""
+    global _cold_start_logged
+    if not _cold_start_logged:
+        _cold_start_logged = True
+        print(json.dumps({"cold_start": COLD_START_TIMINGS}))
+
+def _fallback_answer(error: Exception) -> Optional[str]:
+    """Bedrock 스로틀링(회로 열림 포함)이나 마감 초과로 끝난 요청에 반환할 고정 답변. 그 밖의 오류는 None."""
+    if isinstance(error, resilience.DeadlineExceeded):
+        return templates.TIMEOUT_ANSWER
+    if isinstance(error, resilience.CircuitOpenError) or is_throttling_error(error):
+        return templates.SERVICE_BUSY_ANSWER
+    return None
+
+def stream_answer(query: str, trace_id: Optional[str] = None,
+                  deadline_seconds: Optional[float] = REQUEST_DEADLINE_SECONDS):
+    """
+    RAG 파이프라인을 실행하면서 답변 조각을 생성되는 대로 yield합니다.
+    {"type": "delta", "text": ...} 이벤트들이 이어지고, 마지막에 전체 답변과 분석 결과를 담은
+    {"type": "done", "text", "scenario", "manual_name", "cache_hit", "trace_id"} 이벤트로 끝납니다.
+    LLM 생성을 거치지 않는 답변(인사, 캐시 적중, 잘못된 매뉴얼 등)은 delta 한 번으로 전달됩니다.
+    노드별 소요 시간과 외부 호출 지표는 trace_id(없으면 새로 생성) 아래에 기록되어 TRACE_SINK로 출력됩니다.
+    deadline_seconds(0이면 제한 없음) 안에 끝나지 않거나 Bedrock이 스로틀링 중이면 고정 답변으로 끝나며,
+    이때 done 이벤트의 scenario는 'degraded'입니다. (이미 보낸 답변 조각이 있으면 그 뒤에 이어 붙임)
+    """
+    with tracing.trace("query", trace_id) as trace, resilience.deadline(deadline_seconds):
+        streamed = []
+        final_state = {}
+        try:
+            for mode, chunk in get_app().stream({"query": query}, stream_mode=["custom", "values"]):
+                if mode == "custom" and chunk.get("delta"):
+                    streamed.append(chunk["delta"])
+                    yield {"type": "delta", "text": chunk["delta"]}
+                elif mode == "values":
+                    final_state = chunk
+        except Exception as e:
+            fallback = _fallback_answer(e)
+            if fallback is None:
+                raise
+            print(json.dumps({"degraded": {"reason": type(e).__name__, "error": str(e),
+                                           "streamed_chars": sum(map(len, streamed))}}, ensure_ascii=False))
+            trace.attributes["degraded"] = type(e).__name__
+            fallback = f"\n\n{fallback}" if streamed else fallback
+            streamed.append(fallback)
+            yield {"type": "delta", "text": fallback}
+            final_state = dict(final_state, scenario="degraded", generation="".join(streamed), cache_hit=None)
+        text = final_state.get("generation") or ""
+        trace.attributes.update(scenario=final_state.get("scenario"), cache_hit=final_state.get("cache_hit"))
+        if not streamed and text:
+            yield {"type": "delta", "text": text}
+        yield {
+            "type": "done",
+            "text": text,
+            "scenario": final_state.get("scenario"),
+            "manual_name": final_state.get("manual_name"),
+            "cache_hit": final_state.get("cache_hit"),
+            "trace_id": trace.trace_id,
+        }
+
+def log_invocation_end():
+    """호출이 끝날 때마다 남기는 로그입니다. (콜드 스타트 비용은 첫 호출에서만)"""
+    _log_cold_start_once()
+    if 'embedding_service' in _resources:
+        print(json.dumps({"embedding_service": get_embedding_service().stats()}))
+    if 'payload_meter' in _resources:
+        print(json.dumps({"retrieval_payload_total": get_payload_meter().stats()}))
+    if 'bedrock_breaker' in _resources:
+        print(json.dumps({"circuit_breaker": get_bedrock_breaker().stats()}))
+    pools = clients.pool_stats()
+    if pools:
+        print(json.dumps({"connection_pools": pools}))
+
+# --- 워밍업 ---
+
+WARMUP_TEXT = "warmup" # 워밍업 질문이 없을 때 Bedrock 연결을 열기 위해 임베딩할 텍스트
+
+def is_warmup_event(event) -> bool:
+    """{"warmup": true} 이벤트나 EventBridge 예약 이벤트(정기 ping)이면 True."""
+    return isinstance(event, dict) and (event.get('warmup') is True or event.get('source') == 'aws.events')
+
+def warm_up(queries: Optional[List[str]] = None) -> dict:
+    """
+    LLM을 호출하지 않고, 첫 사용자 요청이 치르던 초기화 비용을 미리 치릅니다.
+    자격 증명 조회, 매뉴얼 카탈로그, 그래프 컴파일, 지연 초기화 리소스, Bedrock 연결(자주 묻는 질문 queries를 임베딩하여
+    질문 임베딩 LRU도 채움), 검색기 연결(상위 1개 검색) 순서로 실행하며, 실패한 단계가 있어도 나머지는 계속합니다.
+    단계별 소요 시간(ms)과 실패한 단계의 오류를 반환하고, 각 단계는 'warmup' trace의 span으로도 기록됩니다.
+    """
+    if isinstance(queries, str):
+        queries = [queries]  # 문자열을 그대로 순회하면 글자마다 워밍업 질문이 됨
+    elif not isinstance(queries, (list, tuple)):
+        queries = []
+    queries = [query for query in queries if isinstance(query, str) and query.strip()][:WARMUP_MAX_QUERIES]
+    steps_ms, errors, state = {}, {}, {}
+
+    def load_credentials():
+        credentials = clients.get_session().get_credentials()
+        if credentials is not None:
+            credentials.get_frozen_credentials()
+
+    def create_resources():
+        get_answer_cache()
+        get_context_packer()
+        get_fast_router()
+        get_bedrock_breaker()
+        get_call_executor()
+        get_speculation_executor()
+
+    def embed_queries():
+        for text in queries or [WARMUP_TEXT]:
+            state['embedding'] = _embed_query(text)
+
+    def search():
+        retriever = get_retriever()
+        if 'embedding' in state:
+            retriever.search(state['embedding'], 1)
+
+    steps = [
+        ("credentials", load_credentials),
+        ("manual_catalog", lambda: get_manual_catalog().get()),
+        ("graph_compile", get_app),
+        ("resources", create_resources),
+        ("bedrock_embedding", embed_queries),
+        (f"{RETRIEVER}_search", search),
+    ]
+    with tracing.trace("warmup", queries=len(queries)) as trace:
+        for name, step in steps:
+            with tracing.span(name, kind="warmup") as step_span:
+                try:
+                    step()
+                except Exception as e:
+                    errors[name] = f"{type(e).__name__}: {e}"
+                    step_span.set(error=type(e).__name__)
+            steps_ms[name] = step_span.duration_ms
+    return {"trace_id": trace.trace_id, "queries": len(queries), "steps_ms": steps_ms,
+            "total_ms": round(sum(steps_ms.values()), 1), "errors": errors}
+
+def _request_deadline(context) -> float:
+    """REQUEST_DEADLINE_SECONDS와 Lambda의 남은 실행 시간(여유 DEADLINE_MARGIN_SECONDS) 중 짧은 쪽."""
+    get_remaining = getattr(context, 'get_remaining_time_in_millis', None)
+    if get_remaining is None:
+        return REQUEST_DEADLINE_SECONDS
+    lambda_left = max(resilience.MIN_CALL_TIMEOUT, get_remaining() / 1000 - DEADLINE_MARGIN_SECONDS)
+    return min(REQUEST_DEADLINE_SECONDS, lambda_left) if REQUEST_DEADLINE_SECONDS > 0 else lambda_left
+
 def lambda_handler(event, context):
     """
     Lambda 함수 URL을 통해 트리거되는 핸들러입니다. (비-스트리밍 방식)
     LangGraph로 구성된 RAG 파이프라인을 실행하고 결과를 단일 JSON으로 반환합니다.
     """
+    if is_warmup_event(event):
+        # 정기 ping 또는 배포 직후 호출: LLM 없이 연결/캐시만 준비
+        result = warm_up(event.get('queries'))
+        print(json.dumps({"warmup": result}, ensure_ascii=False))
+        log_invocation_end()
+        return {
+            "statusCode": 200,
+            "headers": {"Content-Type": "application/json"},
+            "body": json.dumps({"warmup": result}, ensure_ascii=False)
+        }
+
     print("Lambda handler started (non-streaming).")
     
     try:
@@ -367,25 +958,18 @@ def lambda_handler(event, context):
 
         print(f"User query: {query}")
         
-        inputs = {"query": query}
+        # 파이프라인을 끝까지 실행하고 전체 답변을 모음 (토큰 단위 전달은 stream_server.py 참고)
+        final_text = ""
+        trace_id = getattr(context, 'aws_request_id', None)
+        for answer_event in stream_answer(query, trace_id, _request_deadline(context)):
+            if answer_event["type"] == "done":
+                final_text = answer_event["text"]
+                trace_id = answer_event["trace_id"]
         
-        full_response = []
-        # LangGraph 스트림을 실행하고 모든 결과를 리스트에 수집
-        for output in app.stream(inputs, stream_mode="values"):
-            if "generation" in output:
-                chunk = output["generation"]
-                if isinstance(chunk, dict) and "text" in chunk:
-                    full_response.append(chunk['text'])
-                elif isinstance(chunk, str) and chunk: 
-                    full_response.append(chunk)
-        
-        # 모든 응답 조각을 하나의 문자열로 결합
-        final_text = "".join(full_response)
-        
-        # 최종 결과를 포함한 표준 JSON 응답 반환
+        # 최종 결과를 포함한 표준 JSON 응답 반환 (trace ID로 요청별 지표 로그를 찾을 수 있음)
         return {
             "statusCode": 200,
-            "headers": {"Content-Type": "application/json"},
+            "headers": {"Content-Type": "application/json", "X-Trace-Id": trace_id},
             "body": json.dumps({"text": final_text})
         }
 
@@ -399,9 +983,19 @@ def lambda_handler(event, context):
             "headers": {"Content-Type": "application/json"},
             "body": json.dumps({'error': error_message})
         }
+    finally:
+        log_invocation_end()
+
+COLD_START_TIMINGS['import'] = round(time.perf_counter() - _IMPORT_START, 4)
+
+# 프로비저닝된 동시성 컨테이너는 사용자 요청 전에 초기화되므로, 이때 워밍업까지 마쳐 둠
+if WARMUP_ON_INIT and os.environ.get('AWS_LAMBDA_INITIALIZATION_TYPE') == 'provisioned-concurrency':
+    print(json.dumps({"warmup": warm_up()}, ensure_ascii=False))
 
 # --- 필수 설정 참고 ---
-# 1. Lambda 호출 모드: RESPONSE_STREAM
+# 1. Lambda 호출 모드: lambda_handler는 BUFFERED(전체 답변을 한 번에 반환).
+#    토큰 단위 스트리밍은 stream_server.py를 Lambda Web Adapter와 함께 배포하고 함수 URL을 RESPONSE_STREAM으로 설정.
 # 2. Lambda Layer/Package: langchain, langgraph, langchain_aws, opensearch-py 필요.
+#    배포 패키지에는 lambda/의 파일만 넣습니다. (벤치마크와 가짜 Bedrock/OpenSearch는 bench/, 테스트는 tests/에 있음)
 # 3. IAM 권한: Bedrock 및 OpenSearch Serverless 접근 권한 필요.
-# 4. 환경 변수: S3_BUCKET_NAME 설정 필요.
+# 4. 환경 변수: S3_BUCKET_NAME 설정 필요. (매뉴얼 카탈로그 manifest를 읽을 버킷, s3:GetObject 권한 필요)
@@ -0,0 +1,212 @@
+# lambda/resilience.py
+#
+# 느리거나 장애가 난 의존성(Bedrock, OpenSearch)이 요청을 오래 붙잡지 않도록 하는 도구입니다.
+#   - deadline(seconds): 요청별 마감 시각. contextvars로 전달되며, 노드는 check_deadline으로 확인하고
+#     외부 호출은 call_timeout으로 남은 시간 이하의 제한 시간을 받음
+#   - bounded_call: 마감 시각까지만 결과를 기다림. hedge_after를 주면 그 시간 안에 응답이 없을 때
+#     같은 요청을 한 번 더 보내 먼저 도착한 결과를 사용 (임베딩, 검색처럼 멱등인 호출에만 사용)
+#   - CircuitBreaker: 실패(예: 스로틀링)가 연속으로 일어나면 일정 시간 호출하지 않고 바로 CircuitOpenError
+
+import contextvars
+import functools
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+import tracing
+
+# --- 상수 ---
+MIN_CALL_TIMEOUT = 0.05  # 남은 시간이 거의 없어도 외부 호출에 주는 최소 제한 시간(초)
+
+_deadline = contextvars.ContextVar("deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """요청의 마감 시각이 지났습니다. stage는 마감을 확인한 노드 또는 호출입니다."""
+
+    def __init__(self, stage: str):
+        super().__init__(f"Request deadline exceeded at {stage}.")
+        self.stage = stage
+
+
+class CircuitOpenError(RuntimeError):
+    """회로가 열려 있어 호출하지 않았습니다."""
+
+
+# --- 마감 시각 ---
+
+@contextmanager
+def deadline(seconds: Optional[float]):
+    """블록 안의 마감 시각을 지금부터 seconds초 뒤로 정합니다. 바깥에 더 이른 마감이 있으면 그것을 유지합니다."""
+    if not seconds or seconds <= 0:
+        yield
+        return
+    new_deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(new_deadline if current is None else min(current, new_deadline))
+    try:
+        yield
+    finally:
+        try:
+            _deadline.reset(token)
+        except ValueError:
+            # 스트리밍 응답 제너레이터가 다른 컨텍스트에서 닫힌 경우
+            pass
+
+
+def remaining() -> Optional[float]:
+    """마감까지 남은 시간(초). 마감이 없으면 None."""
+    current = _deadline.get()
+    return None if current is None else current - time.monotonic()
+
+
+def check_deadline(stage: str) -> None:
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded(stage)
+
+
+def call_timeout(default: float) -> float:
+    """외부 호출의 제한 시간: default와 남은 시간 중 작은 값 (최소 MIN_CALL_TIMEOUT)."""
+    left = remaining()
+    return default if left is None else max(MIN_CALL_TIMEOUT, min(default, left))
+
+
+def checked_node(name: str, fn: Callable) -> Callable:
+    """LangGraph 노드 함수를 실행하기 전에 마감 시각을 확인하도록 감쌉니다."""
+    @functools.wraps(fn)
+    def wrapper(state):
+        check_deadline(name)
+        return fn(state)
+    return wrapper
+
+
+def bounded_call(fn: Callable, *args, executor=None, hedge_after: Optional[float] = None, stage: str = "call"):
+    """
+    fn(*args)의 결과를 마감 시각까지만 기다립니다. (마감이 지나면 DeadlineExceeded, 호출 자체는 백그라운드에서 끝남)
+    hedge_after(초)가 주어지면 그 안에 응답이 없을 때 같은 호출을 한 번 더 보내 먼저 성공한 결과를 반환합니다.
+    마감도 hedge도 없거나 executor가 없으면 현재 스레드에서 그대로 호출합니다.
+    """
+    check_deadline(stage)
+    if executor is None or (remaining() is None and not hedge_after):
+        return fn(*args)
+
+    def submit():
+        # 각 시도를 현재 컨텍스트(trace, 마감 시각)의 복사본에서 실행
+        return executor.submit(contextvars.copy_context().run, fn, *args)
+
+    primary = submit()
+    pending = {primary}
+    if hedge_after:
+        left = remaining()
+        done, _ = wait(pending, timeout=hedge_after if left is None else min(hedge_after, max(0.0, left)))
+        if not done and (left is None or hedge_after < left):
+            pending.add(submit())
+            tracing.annotate(hedged=1)
+    errors = []
+    while pending:
+        left = remaining()
+        if left is not None and left <= 0:
+            raise DeadlineExceeded(stage)
+        done, pending = wait(pending, timeout=left, return_when=FIRST_COMPLETED)
+        if not done:
+            raise DeadlineExceeded(stage)
+        for future in done:
+            if future.exception() is None:
+                if future is not primary:
+                    tracing.annotate(hedge_won=1)
+                return future.result()
+            errors.append(future.exception())
+    raise errors[0]
+
+
+# --- 회로 차단기 ---
+
+class CircuitBreaker:
+    """
+    연속 실패가 failure_threshold번이면 회로를 열어 reset_timeout초 동안 호출을 바로 거절합니다(CircuitOpenError).
+    그 뒤 한 번의 시험 호출(half-open)이 성공하면 닫고, 실패하면 다시 엽니다.
+    is_failure(error)가 True인 오류만 실패로 셉니다. (그 밖의 오류는 회로 상태에 영향을 주지 않음)
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 is_failure: Callable[[Exception], bool] = lambda error: True, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.is_failure = is_failure
+        self.clock = clock
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.opened = 0
+        self.rejected = 0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.OPEN and self.clock() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.consecutive_failures += 1
+            self._trial_in_flight = False
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.opened += 1
+                    print(f"Circuit '{self.name}' opened after {self.consecutive_failures} consecutive failures.")
+                self.state = self.OPEN
+                self.opened_at = self.clock()
+
+    def _release(self) -> None:
+        with self._lock:
+            self._trial_in_flight = False
+
+    @contextmanager
+    def guard(self):
+        """블록을 회로 차단기로 보호합니다. 회로가 열려 있으면 블록을 실행하지 않고 CircuitOpenError를 발생시킵니다."""
+        if not self.allow():
+            raise CircuitOpenError(f"Circuit '{self.name}' is open.")
+        try:
+            yield
+        except Exception as e:
+            if self.is_failure(e):
+                self.record_failure()
+            else:
+                self._release()
+            raise
+        except BaseException:
+            # 스트리밍 중 클라이언트 연결 종료(GeneratorExit) 등은 결과를 알 수 없으므로 시험 호출만 해제
+            self._release()
+            raise
+        else:
+            self.record_success()
+
+    def call(self, fn: Callable, *args, **kwargs):
+        with self.guard():
+            return fn(*args, **kwargs)
+
+    def stats(self) -> dict:
+        return {"name": self.name, "state": self.state, "consecutive_failures": self.consecutive_failures,
+                "opened": self.opened, "rejected": self.rejected}
@@ -0,0 +1,236 @@
+# lambda/retrieval.py
+
+import contextvars
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+
+from opensearchpy import JSONSerializer
+
+import tracing
+from embedding_service import LatencyHistogram
+from resilience import call_timeout
+
+# --- 상수 ---
+RETRIEVAL_MODES = ("knn", "hybrid")
+# 검색 결과로 받을 필드. 임베딩 벡터(embedding)는 프롬프트에 필요 없으므로 받지 않음
+SOURCE_FIELDS = ("text", "page", "source", "chunk_id", "prev_id", "next_id")
+DEFAULT_RRF_K = 60             # RRF 점수 1 / (k + 순위)의 k. 클수록 하위 순위의 영향이 커짐
+DEFAULT_HYBRID_CANDIDATES = 20 # 하이브리드 검색에서 각 방식(BM25, kNN)으로 가져올 후보 수
+PHRASE_BOOST = 2.0             # 부품 번호/오류 코드처럼 붙어 있는 표현이 그대로 나오면 가산점
+DEFAULT_REQUEST_TIMEOUT = 5.0  # 검색 요청 하나의 최대 대기 시간(초)
+
+
+def metadata_filters(source: Optional[str] = None, page: Optional[int] = None) -> List[dict]:
+    """source(매뉴얼)와 page 메타데이터 필터를 term 쿼리 목록으로 만듭니다."""
+    filters = []
+    if source:
+        filters.append({"term": {"source": source}})
+    if page is not None:
+        filters.append({"term": {"page": page}})
+    return filters
+
+
+def build_knn_query(embedding: List[float], k: int, source: Optional[str] = None,
+                    page: Optional[int] = None) -> dict:
+    """k-NN 검색 요청 본문을 만듭니다. source/page가 있으면 해당 매뉴얼/페이지로 한정합니다."""
+    knn_query_part = {
+        "vector": embedding,
+        "k": k
+    }
+    filters = metadata_filters(source, page)
+    if len(filters) == 1:
+        knn_query_part["filter"] = filters[0]
+    elif filters:
+        knn_query_part["filter"] = {"bool": {"filter": filters}}
+    return {
+        "size": k,
+        "_source": list(SOURCE_FIELDS),
+        "query": {
+            "knn": {
+                "embedding": knn_query_part
+            }
+        }
+    }
+
+
+def build_bm25_query(text: str, size: int, source: Optional[str] = None, page: Optional[int] = None) -> dict:
+    """text 필드에 대한 BM25(match) 검색 요청 본문을 만듭니다. 구절이 그대로 일치하면 점수를 더합니다."""
+    return {
+        "size": size,
+        "_source": list(SOURCE_FIELDS),
+        "query": {
+            "bool": {
+                "must": [{"match": {"text": text}}],
+                "should": [{"match_phrase": {"text": {"query": text, "boost": PHRASE_BOOST}}}],
+                "filter": metadata_filters(source, page),
+            }
+        }
+    }
+
+
+def fetch_by_ids(client, index: str, doc_ids: List[str], **params) -> List[dict]:
+    """
+    문서 ID 목록을 mget 한 번으로 조회하여 찾은 문서의 _source(SOURCE_FIELDS만)를 ID 순서대로 반환합니다.
+    params는 클라이언트 호출에 그대로 전달합니다. (예: request_timeout)
+    """
+    if not doc_ids:
+        return []
+    response = client.mget(body={"docs": [{"_id": doc_id, "_source": list(SOURCE_FIELDS)} for doc_id in doc_ids]},
+                           index=index, **params)
+    return [doc['_source'] for doc in response['docs'] if doc.get('found')]
+
+
+def reciprocal_rank_fusion(result_lists: Sequence[List[dict]], k: int = DEFAULT_RRF_K,
+                           limit: Optional[int] = None) -> List[dict]:
+    """
+    여러 검색 결과(hit 목록)를 Reciprocal Rank Fusion으로 합칩니다.
+    문서 점수는 각 목록에서의 순위 r(1부터)에 대해 1 / (k + r)의 합이며, 점수가 높은 순으로 반환합니다.
+    점수 척도가 다른 BM25와 k-NN 결과를 정규화 없이 합칠 수 있습니다.
+    """
+    scores: Dict[str, float] = {}
+    hits_by_id: Dict[str, dict] = {}
+    for hits in result_lists:
+        for rank, hit in enumerate(hits, start=1):
+            doc_id = hit['_id']
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+            hits_by_id.setdefault(doc_id, hit)
+    ranked = sorted(scores, key=lambda doc_id: scores[doc_id], reverse=True)
+    fused = [dict(hits_by_id[doc_id], _score=scores[doc_id]) for doc_id in ranked]
+    return fused[:limit] if limit is not None else fused
+
+
+def knn_search(client, index: str, embedding: List[float], k: int, source: Optional[str] = None,
+               page: Optional[int] = None, **params) -> List[dict]:
+    """k-NN 검색을 수행하여 hit 목록을 반환합니다. params는 클라이언트 호출에 그대로 전달합니다."""
+    response = client.search(body=build_knn_query(embedding, k, source, page), index=index, **params)
+    tracing.annotate(took_ms=response.get('took'))
+    return response['hits']['hits']
+
+
+def hybrid_search(client, index: str, text: str, embedding: List[float], size: int,
+                  source: Optional[str] = None, candidates: int = DEFAULT_HYBRID_CANDIDATES,
+                  rrf_k: int = DEFAULT_RRF_K, page: Optional[int] = None, **params) -> List[dict]:
+    """
+    BM25와 k-NN 검색을 msearch 한 번의 왕복으로 함께 수행하고, RRF로 합친 상위 size개의 hit을 반환합니다.
+    한쪽 검색이 실패하면 나머지 결과만으로 순위를 매깁니다. params는 클라이언트 호출에 그대로 전달합니다.
+    """
+    candidates = max(candidates, size)
+    body = [
+        {"index": index}, build_bm25_query(text, candidates, source, page),
+        {"index": index}, build_knn_query(embedding, candidates, source, page),
+    ]
+    response = client.msearch(body=body, **params)
+    tracing.annotate(took_ms=response.get('took'))
+    result_lists = []
+    for name, item in zip(("bm25", "knn"), response.get('responses', [])):
+        if 'error' in item:
+            print(f"Hybrid search: {name} query failed: {item['error']}")
+            continue
+        result_lists.append(item['hits']['hits'])
+    if not result_lists:
+        raise RuntimeError("Both BM25 and k-NN queries failed in hybrid search.")
+    return reciprocal_rank_fusion(result_lists, k=rrf_k, limit=size)
+
+
+# --- 검색기(Retriever) ---
+# query_pipeline은 아래 인터페이스만 사용하므로 OpenSearch 없이도 로컬 검색 엔진(local_retriever.LocalVectorRetriever)으로
+# 파이프라인을 실행하거나 검색 성능을 측정할 수 있습니다.
+#   search(embedding, k, source=None, page=None, text=None) -> 문서 청크(_source) 목록
+#   text가 주어지고 mode가 'hybrid'이면 BM25 + k-NN(RRF), 그 밖에는 k-NN만 수행합니다.
+#   neighbors(chunks) -> chunks에 없는 앞뒤 인접 청크 목록 (컨텍스트 확장용)
+
+class OpenSearchRetriever:
+    """
+    OpenSearch(Serverless) 인덱스를 사용하는 검색기입니다.
+    각 요청의 제한 시간은 request_timeout(초)과 요청의 남은 마감 시간(resilience.deadline) 중 작은 값입니다.
+    """
+
+    def __init__(self, client, index: str, mode: str = "knn", rrf_k: int = DEFAULT_RRF_K,
+                 candidates: int = DEFAULT_HYBRID_CANDIDATES, request_timeout: float = DEFAULT_REQUEST_TIMEOUT):
+        if mode not in RETRIEVAL_MODES:
+            raise ValueError(f"Unsupported retrieval mode '{mode}'. Expected one of {RETRIEVAL_MODES}.")
+        self.client = client
+        self.index = index
+        self.mode = mode
+        self.rrf_k = rrf_k
+        self.candidates = candidates
+        self.request_timeout = request_timeout
+
+    def search(self, embedding: List[float], k: int, source: Optional[str] = None, page: Optional[int] = None,
+               text: Optional[str] = None) -> List[dict]:
+        if self.mode == "hybrid" and text:
+            hits = hybrid_search(self.client, self.index, text, embedding, k, source,
+                                 candidates=self.candidates, rrf_k=self.rrf_k, page=page,
+                                 request_timeout=call_timeout(self.request_timeout))
+        else:
+            hits = knn_search(self.client, self.index, embedding, k, source, page,
+                              request_timeout=call_timeout(self.request_timeout))
+        # 인접 청크 조회 시 이미 있는 청크를 제외할 수 있도록 문서 ID를 함께 반환
+        return [dict(hit['_source'], _id=hit['_id']) for hit in hits]
+
+    def neighbors(self, chunks: List[dict]) -> List[dict]:
+        """색인 시 기록한 앞뒤 청크 ID(prev_id, next_id)로 인접 청크를 mget 한 번에 가져옵니다."""
+        present = {chunk.get('_id') for chunk in chunks}
+        doc_ids = []
+        for chunk in chunks:
+            for doc_id in (chunk.get('prev_id'), chunk.get('next_id')):
+                if doc_id and doc_id not in present:
+                    present.add(doc_id)
+                    doc_ids.append(doc_id)
+        return fetch_by_ids(self.client, self.index, doc_ids, request_timeout=call_timeout(self.request_timeout))
+
+
+# --- 응답 크기 측정 ---
+
+class MeasuringJSONSerializer(JSONSerializer):
+    """
+    OpenSearch 클라이언트의 JSON serializer로 사용하여, 응답 본문 크기(압축 해제 후)와 JSON 디코딩 시간을 기록합니다.
+    begin()/current()는 질의 하나 단위 집계, stats()는 누적 집계입니다.
+    질의 단위 집계는 contextvar에 두므로, resilience.bounded_call처럼 컨텍스트를 복사해 다른 스레드에서
+    검색해도 begin()을 호출한 쪽의 집계에 더해집니다.
+    """
+
+    def __init__(self):
+        self._current: contextvars.ContextVar[Optional[dict]] = contextvars.ContextVar('payload_meter', default=None)
+        self._lock = threading.Lock()
+        self.responses = 0
+        self.response_bytes = 0
+        self.max_response_bytes = 0
+        self.decode_latency = LatencyHistogram()
+
+    def loads(self, s):
+        start = time.perf_counter()
+        data = super().loads(s)
+        elapsed = time.perf_counter() - start
+        size = len(s.encode('utf-8')) if isinstance(s, str) else len(s)
+        with self._lock:
+            self.responses += 1
+            self.response_bytes += size
+            self.max_response_bytes = max(self.max_response_bytes, size)
+        self.decode_latency.observe(elapsed)
+        current = self._current.get()
+        if current is not None:
+            with self._lock:
+                current["responses"] += 1
+                current["response_bytes"] += size
+                current["decode_ms"] += elapsed * 1000
+        return data
+
+    def begin(self) -> None:
+        """현재 컨텍스트의 질의 단위 집계를 시작합니다."""
+        self._current.set({"responses": 0, "response_bytes": 0, "decode_ms": 0.0})
+
+    def current(self) -> dict:
+        with self._lock:
+            current = dict(self._current.get() or {"responses": 0, "response_bytes": 0, "decode_ms": 0.0})
+        current["decode_ms"] = round(current["decode_ms"], 3)
+        return current
+
+    def stats(self) -> dict:
+        return {
+            "responses": self.responses,
+            "avg_response_bytes": round(self.response_bytes / self.responses) if self.responses else 0,
+            "max_response_bytes": self.max_response_bytes,
+            "decode_latency": self.decode_latency.snapshot(),
+        }
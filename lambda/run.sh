@@ -0,0 +1,3 @@
+#!/bin/sh
+# Lambda Web Adapter로 stream_server.py를 실행합니다. (stream_server.py 상단의 배포 설정 참고)
+exec python stream_server.py
@@ -0,0 +1,95 @@
+# lambda/stream_server.py
+#
+# 답변을 Server-Sent Events(SSE)로 토큰 단위 스트리밍하는 HTTP 서버입니다.
+# Python Lambda는 응답 스트리밍을 직접 지원하지 않으므로, AWS Lambda Web Adapter(LWA)와 함께 배포합니다.
+#   - LWA Layer 추가 (arn:aws:lambda:<region>:753240598075:layer:LambdaAdapterLayerX86:<version>)
+#   - 환경 변수: AWS_LAMBDA_EXEC_WRAPPER=/opt/bootstrap, AWS_LWA_INVOKE_MODE=response_stream, PORT=8080
+#   - 핸들러: run.sh (내용: exec python stream_server.py)
+#   - 함수 URL 호출 모드: RESPONSE_STREAM
+# 로컬 실행: PORT=8080 python stream_server.py 후
+#   curl -N -X POST localhost:8080/query -d '{"query": "Bobcat-T590 엔진 오일 점검 방법"}'
+#
+# 이벤트 형식:
+#   event: delta  data: {"text": "..."}                      (답변 조각, 도착하는 대로 전송)
+#   event: done   data: {"text", "scenario", "manual_name", "cache_hit"}
+#   event: error  data: {"error": "..."}
+
+import json
+import os
+import traceback
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import query_pipeline
+
+PORT = int(os.environ.get('PORT', '8080'))
+
+
+def format_sse(event: str, data: dict) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode('utf-8')
+
+
+class StreamingHandler(BaseHTTPRequestHandler):
+    # 응답 길이를 미리 알 수 없으므로 chunked 전송 인코딩을 사용 (클라이언트가 조각을 도착하는 대로 읽을 수 있음)
+    protocol_version = "HTTP/1.1"
+
+    def _send_simple(self, status: int, content_type: str, payload: bytes):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _write_chunk(self, payload: bytes):
+        self.wfile.write(f"{len(payload):X}\r\n".encode('ascii') + payload + b"\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        # LWA의 준비 상태 확인(readiness check)용
+        self._send_simple(200, "text/plain", b"ok")
+
+    def do_POST(self):
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}")
+            query = body.get("query")
+        except (ValueError, json.JSONDecodeError):
+            query = None
+        if not query:
+            self._send_simple(400, "application/json",
+                              json.dumps({'error': 'Query not found in the request body.'}).encode('utf-8'))
+            return
+
+        print(f"User query (streaming): {query}")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        try:
+            try:
+                for answer_event in query_pipeline.stream_answer(query):
+                    event_type = answer_event.pop("type")
+                    self._write_chunk(format_sse(event_type, answer_event))
+            except (BrokenPipeError, ConnectionResetError):
+                raise
+            except Exception as e:
+                print(f"Error during processing: {e}")
+                traceback.print_exc()
+                self._write_chunk(format_sse("error", {"error": f"Error: {str(e)}"}))
+            self.wfile.write(b"0\r\n\r\n")  # chunked 스트림의 끝
+        except (BrokenPipeError, ConnectionResetError):
+            print("Client disconnected during streaming.")
+        finally:
+            self.close_connection = True
+            query_pipeline.log_invocation_end()
+
+
+def main():
+    server = ThreadingHTTPServer(("0.0.0.0", PORT), StreamingHandler)
+    print(f"Streaming server listening on port {PORT}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+# lambda/tracing.py
+#
+# 요청 단위 추적과 구조화된 지표입니다.
+#   - trace(pipeline): 요청 하나의 trace ID 아래에 span들을 모음. 끝나면 설정된 sink로 내보냄
+#   - span(name, kind): 그래프 노드나 외부 호출(Bedrock, OpenSearch 등)의 소요 시간과 속성(토큰 수, took_ms, 응답 바이트 등)
+#   - annotate(**attributes): 현재 span에 속성 추가 (trace 밖에서는 아무것도 하지 않음)
+# 현재 trace/span은 contextvars로 전달되므로, 스레드 풀에 작업을 넘길 때는 bind(fn)으로 감싸야 같은 trace에 기록됩니다.
+# sink:
+#   - EMFSink: trace 하나를 CloudWatch embedded metric format(EMF) JSON 한 줄로 출력. CloudWatch Logs가 지표로 추출
+#   - InMemorySink: trace 기록을 메모리에 보관 (테스트/벤치마크용)
+
+import contextvars
+import functools
+import json
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+# --- 상수 ---
+SINK_TYPES = ("emf", "memory", "none")
+DEFAULT_NAMESPACE = "RagManuals"
+MAX_EMF_METRICS = 100  # EMF 문서 하나에 넣을 수 있는 최대 지표 수
+MAX_SPANS_PER_NAME = 100  # trace 하나에 보관할 같은 이름 span의 최대 수 (EMF 지표 하나의 최대 값 수와 같음)
+
+_current_trace = contextvars.ContextVar("trace", default=None)
+_current_span = contextvars.ContextVar("span", default=None)
+
+
+class Span:
+    def __init__(self, name: str, kind: str, parent: Optional[str], attributes: dict):
+        self.name = name
+        self.kind = kind
+        self.parent = parent
+        self.attributes = dict(attributes)
+        self.start = time.perf_counter()
+        self.duration_ms = None
+
+    def set(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+    def finish(self) -> None:
+        self.duration_ms = round((time.perf_counter() - self.start) * 1000, 3)
+
+    def to_dict(self) -> dict:
+        record = {"name": self.name, "kind": self.kind, "duration_ms": self.duration_ms}
+        if self.parent:
+            record["parent"] = self.parent
+        record.update(self.attributes)
+        return record
+
+
+class Trace:
+    def __init__(self, pipeline: str, trace_id: Optional[str] = None, attributes: Optional[dict] = None):
+        self.pipeline = pipeline
+        self.trace_id = trace_id or uuid.uuid4().hex
+        self.attributes = dict(attributes or {})
+        self.spans: List[Span] = []
+        self.start = time.perf_counter()
+        self.timestamp = time.time()
+        self.duration_ms = None
+        self.dropped_spans = 0
+        self._span_counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def add(self, span: Span) -> None:
+        # 추측 실행처럼 다른 스레드에서 끝나는 span도 있으므로 잠금
+        with self._lock:
+            count = self._span_counts.get(span.name, 0) + 1
+            self._span_counts[span.name] = count
+            # 청크마다 호출하는 bedrock.embed처럼 반복되는 span은 앞의 MAX_SPANS_PER_NAME개만 보관하고 수만 셈
+            if count <= MAX_SPANS_PER_NAME:
+                self.spans.append(span)
+            else:
+                self.dropped_spans += 1
+
+    def finish(self) -> None:
+        self.duration_ms = round((time.perf_counter() - self.start) * 1000, 3)
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            spans = [span.to_dict() for span in self.spans]
+        record = {"trace_id": self.trace_id, "pipeline": self.pipeline, "timestamp": self.timestamp,
+                  "duration_ms": self.duration_ms, **self.attributes, "spans": spans}
+        if self.dropped_spans:
+            record["dropped_spans"] = self.dropped_spans
+        return record
+
+
+# --- Sink ---
+
+def _unit(metric: str) -> str:
+    if metric.endswith("_ms"):
+        return "Milliseconds"
+    if metric.endswith("_bytes"):
+        return "Bytes"
+    return "Count"
+
+
+class EMFSink:
+    """
+    trace 하나를 CloudWatch EMF JSON 한 줄로 출력합니다.
+    차원은 Pipeline 하나이며, span의 숫자 속성을 '<span 이름>.<속성>' 지표로 기록합니다. (같은 span이 여러 번이면 값 배열)
+    trace_id와 span 상세는 지표가 아닌 속성으로 남으므로 CloudWatch Logs Insights에서 요청별로 조회할 수 있습니다.
+    """
+
+    def __init__(self, namespace: str = DEFAULT_NAMESPACE, print_fn: Callable[[str], None] = print):
+        self.namespace = namespace
+        self.print_fn = print_fn
+
+    @staticmethod
+    def metrics(record: dict) -> Dict[str, list]:
+        values = {"request.duration_ms": [record["duration_ms"]]}
+        for span in record["spans"]:
+            for key, value in span.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    values.setdefault(f"{span['name']}.{key}", []).append(value)
+        return values
+
+    def emit(self, record: dict) -> None:
+        metrics = list(self.metrics(record).items())[:MAX_EMF_METRICS]
+        document = {
+            "_aws": {
+                "Timestamp": int(record["timestamp"] * 1000),
+                "CloudWatchMetrics": [{
+                    "Namespace": self.namespace,
+                    "Dimensions": [["Pipeline"]],
+                    "Metrics": [{"Name": name, "Unit": _unit(name)} for name, _ in metrics],
+                }],
+            },
+            "Pipeline": record["pipeline"],
+            **{name: values[0] if len(values) == 1 else values for name, values in metrics},
+            **{key: value for key, value in record.items() if key not in ("pipeline", "timestamp")},
+        }
+        self.print_fn(json.dumps(document, ensure_ascii=False, default=str))
+
+
+class InMemorySink:
+    """trace 기록(dict)을 메모리에 보관합니다."""
+
+    def __init__(self):
+        self.records: List[dict] = []
+        self._lock = threading.Lock()
+
+    def emit(self, record: dict) -> None:
+        with self._lock:
+            self.records.append(record)
+
+    def spans(self, name: Optional[str] = None) -> List[dict]:
+        with self._lock:
+            return [span for record in self.records for span in record["spans"] if name is None or span["name"] == name]
+
+    def clear(self) -> None:
+        with self._lock:
+            self.records.clear()
+
+
+_sink = None
+
+
+def create_sink(sink_type: str, namespace: str = DEFAULT_NAMESPACE):
+    """환경 변수 값('emf', 'memory', 'none')으로 sink를 만듭니다."""
+    if sink_type == "emf":
+        return EMFSink(namespace)
+    if sink_type == "memory":
+        return InMemorySink()
+    if sink_type == "none":
+        return None
+    raise ValueError(f"Unsupported trace sink '{sink_type}'. Expected one of {SINK_TYPES}.")
+
+
+def set_sink(sink) -> None:
+    global _sink
+    _sink = sink
+
+
+def get_sink():
+    return _sink
+
+
+# --- 추적 ---
+
+@contextmanager
+def trace(pipeline: str, trace_id: Optional[str] = None, sink=None, **attributes):
+    """요청 하나를 추적합니다. 블록이 끝나면(예외 포함) 기록을 sink(기본값: set_sink로 설정한 것)로 내보냅니다."""
+    current = Trace(pipeline, trace_id, attributes)
+    token = _current_trace.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.attributes["error"] = type(e).__name__
+        raise
+    finally:
+        try:
+            _current_trace.reset(token)
+        except ValueError:
+            # 스트리밍 응답 제너레이터가 다른 컨텍스트에서 닫힌 경우
+            pass
+        current.finish()
+        target = sink if sink is not None else _sink
+        if target is not None:
+            try:
+                target.emit(current.to_dict())
+            except Exception as e:
+                print(f"Trace emit failed: {e}")
+
+
+@contextmanager
+def span(name: str, kind: str = "node", **attributes):
+    """현재 trace 아래에 span을 기록합니다. trace 밖에서도 호출할 수 있으며, 이때는 기록하지 않습니다."""
+    current = _current_trace.get()
+    parent = _current_span.get()
+    current_span = Span(name, kind, parent.name if parent is not None else None, attributes)
+    token = _current_span.set(current_span)
+    try:
+        yield current_span
+    except BaseException as e:
+        current_span.set(error=type(e).__name__)
+        raise
+    finally:
+        try:
+            _current_span.reset(token)
+        except ValueError:
+            pass
+        current_span.finish()
+        if current is not None:
+            current.add(current_span)
+
+
+def annotate(**attributes) -> None:
+    """현재 span에 속성을 추가합니다."""
+    current_span = _current_span.get()
+    if current_span is not None:
+        current_span.set(**attributes)
+
+
+def current_trace_id() -> Optional[str]:
+    current = _current_trace.get()
+    return current.trace_id if current is not None else None
+
+
+def traced_node(name: str, fn: Callable) -> Callable:
+    """LangGraph 노드 함수를 span(name, kind='node')으로 감쌉니다."""
+    @functools.wraps(fn)
+    def wrapper(state):
+        with span(name, kind="node"):
+            return fn(state)
+    return wrapper
+
+
+def bind(fn: Callable) -> Callable:
+    """현재 컨텍스트(trace/span)를 캡처하여, 다른 스레드에서 호출되어도 같은 trace에 기록되도록 합니다."""
+    context = contextvars.copy_context()
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        return context.copy().run(fn, *args, **kwargs)
+    return wrapper
@@ -0,0 +1,115 @@
+# lambda/vector_format.py
+
+import json
+import os
+from typing import List, NamedTuple
+
+# --- 상수 ---
+QUANTIZATIONS = ("none", "fp16", "int8")
+INT8_SCALE = 127.0  # 정규화된 벡터의 각 성분([-1, 1])을 [-127, 127] 정수로 변환
+
+# Titan Text Embeddings V2만 출력 차원 선택(256/512/1024)과 정규화를 지원
+TITAN_V2_DIMENSIONS = (256, 512, 1024)
+TITAN_V1_DIMENSION = 1536  # 그 외 모델(Titan v1)은 항상 1536차원 벡터를 반환
+
+
+class VectorConfig(NamedTuple):
+    """임베딩을 어떤 형태로 저장/검색할지 정의합니다. 색인과 검색 Lambda가 같은 값을 사용해야 합니다."""
+    model_id: str
+    dimension: int
+    quantization: str = "none"   # 'none'(float32), 'fp16'(서버 측 스칼라 양자화), 'int8'(byte 벡터)
+    space_type: str = "l2"       # OpenSearch k-NN 거리 함수 ('l2', 'cosinesimil', 'innerproduct')
+
+
+def vector_config_from_env(model_id_env: str) -> VectorConfig:
+    """환경 변수에서 VectorConfig를 만듭니다. model_id_env는 모델 ID가 담긴 환경 변수 이름입니다."""
+    config = VectorConfig(
+        model_id=os.environ.get(model_id_env, 'amazon.titan-embed-text-v1'),
+        dimension=int(os.environ.get('EMBEDDING_DIMENSION', '1536')),
+        quantization=os.environ.get('VECTOR_QUANTIZATION', 'none'),
+        space_type=os.environ.get('KNN_SPACE_TYPE', 'l2'),
+    )
+    validate(config)
+    return config
+
+
+def is_titan_v2(model_id: str) -> bool:
+    return model_id.startswith('amazon.titan-embed-text-v2')
+
+
+def validate(config: VectorConfig) -> None:
+    if config.quantization not in QUANTIZATIONS:
+        raise ValueError(f"Unknown VECTOR_QUANTIZATION '{config.quantization}'. Use one of {QUANTIZATIONS}.")
+    if is_titan_v2(config.model_id) and config.dimension not in TITAN_V2_DIMENSIONS:
+        raise ValueError(f"{config.model_id} supports dimensions {TITAN_V2_DIMENSIONS}, got {config.dimension}.")
+    if not is_titan_v2(config.model_id) and config.dimension != TITAN_V1_DIMENSION:
+        # 차원을 줄일 수 없는 모델에 다른 차원을 지정하면 매핑은 그 차원으로 만들어지고 모든 문서의 색인이 실패함
+        raise ValueError(f"{config.model_id} only returns {TITAN_V1_DIMENSION}-dimensional embeddings, "
+                         f"got EMBEDDING_DIMENSION={config.dimension}. Use a Titan v2 model to reduce the dimension.")
+    if config.quantization == "int8" and not is_titan_v2(config.model_id):
+        # int8 변환은 성분이 [-1, 1]인 정규화된 벡터를 전제로 함
+        raise ValueError("int8 quantization requires a normalized Titan v2 embedding model.")
+
+
+def embedding_request_body(config: VectorConfig, text: str) -> str:
+    """Bedrock invoke_model에 보낼 요청 본문을 만듭니다."""
+    request = {"inputText": text}
+    if is_titan_v2(config.model_id):
+        request["dimensions"] = config.dimension
+        request["normalize"] = True
+    return json.dumps(request)
+
+
+def encode_vector(config: VectorConfig, vector: List[float]) -> List[float]:
+    """
+    색인/검색에 사용할 형태로 벡터를 변환합니다.
+    int8은 클라이언트에서 정수로 변환해야 하고, fp16은 OpenSearch(faiss SQ 인코더)가 저장 시 변환합니다.
+    """
+    if config.quantization == "int8":
+        return [max(-128, min(127, round(value * INT8_SCALE))) for value in vector]
+    return vector
+
+
+def build_index_body(config: VectorConfig) -> dict:
+    """VectorConfig에 맞는 k-NN 인덱스 설정과 매핑을 만듭니다."""
+    embedding_field = {
+        "type": "knn_vector",
+        "dimension": config.dimension,
+    }
+    if config.quantization == "int8":
+        embedding_field["data_type"] = "byte"
+        embedding_field["method"] = {"name": "hnsw", "engine": "lucene", "space_type": config.space_type}
+    elif config.quantization == "fp16":
+        embedding_field["method"] = {
+            "name": "hnsw",
+            "engine": "faiss",
+            "space_type": config.space_type,
+            "parameters": {"encoder": {"name": "sq", "parameters": {"type": "fp16"}}},
+        }
+    else:
+        embedding_field["method"] = {"name": "hnsw", "engine": "faiss", "space_type": config.space_type}
+
+    return {
+        "settings": {"index": {"knn": True}},
+        "mappings": {
+            "properties": {
+                "embedding": embedding_field,
+                "text": {"type": "text"},
+                "source": {"type": "keyword"},
+                "page": {"type": "integer"},
+                "chunk_id": {"type": "integer"},
+                # 앞뒤 청크의 문서 ID. 검색 조건으로는 쓰지 않고 mget으로 인접 청크를 가져올 때만 사용
+                "prev_id": {"type": "keyword", "index": False},
+                "next_id": {"type": "keyword", "index": False},
+            }
+        },
+    }
+
+
+def ensure_index(client, index: str, config: VectorConfig) -> bool:
+    """인덱스가 없으면 VectorConfig에 맞게 생성합니다. 새로 만들었으면 True를 반환합니다."""
+    if client.indices.exists(index=index):
+        return False
+    client.indices.create(index=index, body=build_index_body(config))
+    print(f"Created index '{index}' (dimension={config.dimension}, quantization={config.quantization}).")
+    return True
@@ -2,11 +2,10 @@
 import streamlit as st
 import requests
 import json
-import time
 import boto3
 import os
 
-# from sseclient import SSEClient # SSEClient는 더 이상 사용하지 않으므로 주석 처리 또는 제거
+from sseclient import SSEClient
 
 st.set_page_config(
     page_title="Doosan AI Chat",
@@ -67,10 +66,48 @@ with st.sidebar:
         else:
             st.sidebar.warning("업로드할 파일을 먼저 선택해주세요.")
 
-# RAG 백엔드 API 호출 및 타이핑 효과 표시 함수
+# RAG 백엔드 API 호출 및 스트리밍 표시 함수
+def render_sse(response, placeholder):
+    """
+    SSE 응답(lambda/stream_server.py)의 답변 조각을 도착하는 대로 placeholder에 표시합니다.
+    성공 시 전체 응답 문자열을, 실패 시 None을 반환합니다.
+    """
+    current_response_text = ""
+    # chunk_size=None: 서버가 보낸 조각(chunk)을 도착하는 즉시 전달받음
+    for event in SSEClient(response.iter_content(chunk_size=None)).events():
+        data = json.loads(event.data) if event.data else {}
+        if event.event == "delta":
+            current_response_text += data.get("text", "")
+            placeholder.markdown(current_response_text + "▌")
+        elif event.event == "done":
+            current_response_text = data.get("text") or current_response_text
+        elif event.event == "error":
+            placeholder.error(f"백엔드 오류: {data.get('error')}")
+            return None
+
+    placeholder.markdown(current_response_text)
+    return current_response_text
+
+
+def render_json(response_data, placeholder):
+    """스트리밍을 지원하지 않는(BUFFERED) 백엔드의 단일 JSON 응답을 표시합니다."""
+    if "body" in response_data:
+        body_data = json.loads(response_data["body"])
+    else:
+        body_data = response_data
+    if "text" in body_data:
+        placeholder.markdown(body_data["text"])
+        return body_data["text"]
+    if "error" in body_data:
+        placeholder.error(f"백엔드 오류: {body_data['error']}")
+    else:
+        placeholder.error(f"알 수 없는 응답 형식: {response_data}")
+    return None
+
+
 def stream_response(user_query: str, placeholder):
     """
-    RAG 백엔드를 호출하고 응답을 받아 placeholder에 타이핑 효과와 함께 표시합니다.
+    RAG 백엔드를 호출하고, 답변이 생성되는 대로 placeholder에 표시합니다.
     성공 시 전체 응답 문자열을, 실패 시 None을 반환합니다.
     """
     if not user_query.strip():
@@ -80,31 +117,12 @@ def stream_response(user_query: str, placeholder):
     try:
         api_url = ""
         payload = {"query": user_query}
-        response = requests.post(api_url, json=payload)
-        response.raise_for_status()
-
-        response_data = response.json()
-
-        full_response = ""
-        if "body" in response_data:
-            body_data = json.loads(response_data["body"])
-            if "text" in body_data:
-                full_response = body_data["text"]
-            elif "error" in body_data:
-                placeholder.error(f"백엔드 오류: {body_data['error']}")
-                return None
-        else:
-            placeholder.error(f"알 수 없는 응답 형식: {response_data}")
-            return None
-
-        current_response_text = ""
-        for char in full_response:
-            current_response_text += char
-            placeholder.markdown(current_response_text + "▌")
-            time.sleep(0.02)
-
-        placeholder.markdown(full_response)
-        return full_response
+        with requests.post(api_url, json=payload, stream=True,
+                           headers={"Accept": "text/event-stream"}) as response:
+            response.raise_for_status()
+            if response.headers.get("Content-Type", "").startswith("text/event-stream"):
+                return render_sse(response, placeholder)
+            return render_json(response.json(), placeholder)
 
     except requests.exceptions.RequestException as e:
         placeholder.error(f"API 호출 중 오류 발생: {e}")
@@ -0,0 +1,67 @@
+# tests/conftest.py
+#
+# lambda/의 모듈은 Lambda 배포 패키지처럼 평면 구조로 서로 임포트하므로 경로에 추가합니다.
+# query_pipeline은 임포트할 때 환경 변수를 읽으므로, 로컬 테스트용 기본값을 먼저 설정합니다.
+# 외부 서비스는 호출하지 않습니다. (Bedrock/OpenSearch는 bench/의 fake_bedrock, fake_opensearch로 대체)
+
+import os
+import sys
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAMBDA_DIR = os.path.join(ROOT_DIR, "lambda")
+BENCH_DIR = os.path.join(ROOT_DIR, "bench")
+sys.path.insert(0, LAMBDA_DIR)
+sys.path.insert(1, BENCH_DIR)
+
+os.environ.setdefault('OPENSEARCH_HOST', 'localhost')
+os.environ.setdefault('OPENSEARCH_INDEX', 'test')
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ.setdefault('AWS_REGION', 'us-east-1')
+os.environ['ANSWER_CACHE_BACKEND'] = 'none'  # 매 실행이 실제로 답변을 생성하도록 캐시 사용 안 함
+os.environ['TRACE_SINK'] = 'memory'         # trace 기록을 InMemorySink로 받아 검사
+os.environ['WARMUP_ON_INIT'] = 'false'
+
+MANUAL_NAME = "Bobcat-T590-Operating-Manual"
+MANUAL_SOURCE = f"{MANUAL_NAME}.pdf"
+
+
+class _StaticCatalogLoader:
+    def load(self, previous=None):
+        from manual_catalog import CatalogSnapshot, ManualEntry, generate_aliases
+        return CatalogSnapshot([ManualEntry(MANUAL_NAME, MANUAL_SOURCE, generate_aliases(MANUAL_NAME), "test")])
+
+
+class FakePipeline:
+    """가짜 Bedrock/OpenSearch와 고정 카탈로그를 query_pipeline의 지연 초기화 리소스로 넣습니다."""
+
+    def __init__(self, monkeypatch):
+        import query_pipeline
+        import tracing
+        self.module = query_pipeline
+        self.sink = tracing.InMemorySink()
+        self._monkeypatch = monkeypatch
+        monkeypatch.setattr(tracing, '_sink', self.sink)
+        self.install()
+
+    def install(self, **bedrock_kwargs):
+        """테스트마다 리소스를 새로 만듭니다. bedrock_kwargs는 FakeBedrockRuntime 설정(첫 토큰 지연 등)입니다."""
+        from fake_bedrock import FakeBedrockRuntime
+        from fake_opensearch import FakeOpenSearch, load_sample_documents
+        from manual_catalog import ManualCatalog
+
+        for key in ('latency', 'llm_first_token_latency', 'llm_token_latency'):
+            bedrock_kwargs.setdefault(key, 0)
+        self.bedrock = FakeBedrockRuntime(**bedrock_kwargs)
+        self.opensearch = FakeOpenSearch(load_sample_documents(MANUAL_SOURCE), latency=0)
+        self._monkeypatch.setattr(self.module, '_resources', {
+            'bedrock_runtime': self.bedrock,
+            'opensearch_client': self.opensearch,
+            'manual_discovery': ManualCatalog(_StaticCatalogLoader()),
+        })
+
+
+@pytest.fixture
+def fake_pipeline(monkeypatch):
+    return FakePipeline(monkeypatch)
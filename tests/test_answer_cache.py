@@ -0,0 +1,174 @@
+# tests/test_answer_cache.py
+
+from array import array
+
+import pytest
+
+from answer_cache import (AnswerCache, CachedAnswer, DynamoDBAnswerBackend, InMemoryAnswerBackend, query_key,
+                          scope_key)
+
+MANUAL = "Bobcat-T590-Operating-Manual"
+
+
+class FakeClock:
+    def __init__(self, now=1_700_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class FakeDynamoDB:
+    """DynamoDBAnswerBackend가 사용하는 get_item/put_item/query(pk 일치, sk 접두어, 정렬 방향, Limit)만 흉내 냅니다."""
+
+    def __init__(self):
+        self.items = {}
+
+    def put_item(self, TableName, Item):
+        self.items[(Item['pk']['S'], Item['sk']['S'])] = Item
+
+    def get_item(self, TableName, Key):
+        item = self.items.get((Key['pk']['S'], Key['sk']['S']))
+        return {'Item': item} if item is not None else {}
+
+    def query(self, TableName, KeyConditionExpression, ExpressionAttributeValues, Limit, ScanIndexForward=True):
+        pk = ExpressionAttributeValues[':pk']['S']
+        prefix = ExpressionAttributeValues[':prefix']['S'] if 'begins_with' in KeyConditionExpression else ''
+        keys = sorted(key for key in self.items if key[0] == pk and key[1].startswith(prefix))
+        if not ScanIndexForward:
+            keys.reverse()
+        return {'Items': [self.items[key] for key in keys[:Limit]]}
+
+
+def _entry(answer, version="v1"):
+    return CachedAnswer(answer, MANUAL, version)
+
+
+def _vector(*values):
+    return array('f', values)
+
+
+def _dynamodb(**kwargs):
+    clock = FakeClock()
+    return DynamoDBAnswerBackend(FakeDynamoDB(), "answers", clock=clock, **kwargs), clock
+
+
+# --- 메모리 백엔드 ---
+
+def test_memory_exact_tier_evicts_least_recently_used():
+    backend = InMemoryAnswerBackend(max_entries=2)
+    backend.put_exact("a", _entry("A"))
+    backend.put_exact("b", _entry("B"))
+    backend.get_exact("a")
+    backend.put_exact("c", _entry("C"))
+
+    assert backend.get_exact("b") is None
+    assert backend.get_exact("a").answer == "A"
+    assert backend.evictions == 1
+
+
+def test_memory_semantic_tier_keeps_most_recent_candidates_per_scope():
+    backend = InMemoryAnswerBackend(max_candidates_per_scope=2)
+    for i in range(3):
+        backend.put_semantic("scope", f"q{i}", _vector(i, 1), _entry(f"A{i}"))
+
+    answers = [entry.answer for _, entry in backend.semantic_candidates("scope")]
+    assert answers == ["A1", "A2"]
+    assert backend.semantic_candidates("other") == []
+
+
+def test_memory_semantic_tier_drops_least_recent_scope_over_total_limit():
+    backend = InMemoryAnswerBackend(max_entries=2)
+    backend.put_semantic("old", "q0", _vector(1, 0), _entry("A0"))
+    backend.put_semantic("new", "q1", _vector(1, 0), _entry("A1"))
+    backend.put_semantic("new", "q2", _vector(0, 1), _entry("A2"))
+
+    assert backend.semantic_candidates("old") == []
+    assert len(backend.semantic_candidates("new")) == 2
+
+
+# --- DynamoDB 백엔드 ---
+
+def test_dynamodb_exact_round_trip_and_expiry():
+    backend, clock = _dynamodb(ttl_seconds=60)
+    backend.put_exact("key", _entry("A"))
+
+    assert backend.get_exact("key") == _entry("A")
+    assert backend.get_exact("missing") is None
+    clock.now += 61
+    assert backend.get_exact("key") is None
+
+
+def test_dynamodb_semantic_round_trip_keeps_vector():
+    backend, _ = _dynamodb()
+    backend.put_semantic("scope", "q", _vector(0.6, 0.8), _entry("A"))
+
+    (vector, entry), = backend.semantic_candidates("scope")
+    assert list(vector) == pytest.approx([0.6, 0.8])
+    assert entry == _entry("A")
+
+
+def test_dynamodb_semantic_candidates_are_the_most_recent_ones():
+    backend, clock = _dynamodb(max_candidates_per_scope=3)
+    # 질문 해시 순서와 저장 순서가 반대여도 최근 항목을 비교해야 함
+    for i, key in enumerate(["f" * 64, "c" * 64, "a" * 64, "0" * 64, "1" * 64]):
+        clock.now += 1
+        backend.put_semantic("scope", key, _vector(1, 0), _entry(f"A{i}"))
+
+    answers = [entry.answer for _, entry in backend.semantic_candidates("scope")]
+    assert answers == ["A4", "A3", "A2"]
+
+
+def test_dynamodb_semantic_candidates_skip_expired_and_legacy_items():
+    backend, clock = _dynamodb(ttl_seconds=60)
+    backend.put_semantic("scope", "old", _vector(1, 0), _entry("old"))
+    clock.now += 30
+    backend.put_semantic("scope", "new", _vector(1, 0), _entry("new"))
+    # 정렬 키가 질문 해시뿐이던 이전 형식의 항목
+    legacy = backend._item("semantic#scope", "f" * 64, _entry("legacy"))
+    legacy['embedding'] = {'B': _vector(1, 0).tobytes()}
+    backend.client.put_item(TableName="answers", Item=legacy)
+    clock.now += 31
+
+    assert [entry.answer for _, entry in backend.semantic_candidates("scope")] == ["new"]
+
+
+# --- 답변 캐시 ---
+
+@pytest.fixture(params=["memory", "dynamodb"])
+def cache(request):
+    backend = InMemoryAnswerBackend() if request.param == "memory" else _dynamodb()[0]
+    return AnswerCache(backend, similarity_threshold=0.95)
+
+
+def test_exact_hit_ignores_case_spacing_and_symbols(cache):
+    cache.store("T590 엔진 오일?", [1.0, 0.0], "답변", MANUAL, "v1")
+
+    assert cache.lookup_exact("t590  엔진오일", {MANUAL: "v1"}).answer == "답변"
+    assert cache.stats()["exact_hits"] == 1
+
+
+def test_exact_hit_is_ignored_after_reindex(cache):
+    cache.store("T590 엔진 오일", [1.0, 0.0], "답변", MANUAL, "v1")
+
+    assert cache.lookup_exact("T590 엔진 오일", {MANUAL: "v2"}) is None
+    assert cache.lookup_exact("T590 엔진 오일", {}) is None
+
+
+def test_semantic_hit_requires_threshold_and_same_version(cache):
+    cache.store("T590 엔진 오일 교체 주기", [1.0, 0.0], "답변", MANUAL, "v1")
+
+    entry, score = cache.lookup_semantic([0.99, 0.05], MANUAL, "v1")
+    assert entry.answer == "답변" and score >= 0.95
+    assert cache.lookup_semantic([0.7, 0.7], MANUAL, "v1") is None
+    assert cache.lookup_semantic([1.0, 0.0], MANUAL, "v2") is None
+    stats = cache.stats()
+    assert stats["semantic_hits"] == 1 and stats["misses"] == 2
+    assert stats["hit_rate"] == pytest.approx(1 / 3, abs=1e-4)
+
+
+def test_store_without_embedding_skips_semantic_tier(cache):
+    cache.store("인사", None, "안녕하세요", MANUAL, "v1")
+
+    assert cache.backend.semantic_candidates(scope_key(MANUAL, "v1")) == []
+    assert cache.backend.get_exact(query_key("인사")).answer == "안녕하세요"
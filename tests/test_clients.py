@@ -0,0 +1,77 @@
+# tests/test_clients.py
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from urllib3 import HTTPConnectionPool
+
+import clients
+from clients import ClientConfig, PoolStats
+
+
+class _OkHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _OkHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd.server_address
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _pool(address, stats, maxsize):
+    pool_class = clients._counting_pool_class(HTTPConnectionPool, stats)
+    return pool_class(*address, maxsize=maxsize, block=False)
+
+
+def test_sequential_requests_reuse_one_connection(server):
+    stats = PoolStats("test", maxsize=2)
+    pool = _pool(server, stats, maxsize=2)
+
+    for _ in range(3):
+        assert pool.request("GET", "/").status == 200
+
+    result = stats.stats()
+    assert result["checkouts"] == 3 and result["created"] == 1
+    assert result["reuse_rate"] == pytest.approx(2 / 3, abs=1e-4)
+    assert result["peak_in_use"] == 1 and result["discarded"] == 0
+    assert "avg_wait_ms" not in result
+
+
+def test_saturated_pool_opens_extra_connections_and_discards_them(server):
+    stats = PoolStats("test", maxsize=1)
+    pool = _pool(server, stats, maxsize=1)
+
+    # 응답 본문을 읽기 전까지 연결을 붙잡아 두어 동시 사용 수가 maxsize를 넘게 함 (block=False라 기다리지 않음)
+    responses = [pool.urlopen("GET", "/", preload_content=False) for _ in range(2)]
+    for response in responses:
+        response.read()
+        response.release_conn()
+
+    result = stats.stats()
+    assert result["peak_in_use"] == 2 > result["maxsize"]
+    assert result["created"] == 2
+    assert result["discarded"] == 1
+    assert result["in_use"] == 0
+
+
+def test_client_config_validation():
+    clients.validate(ClientConfig(region="us-east-1"))
+    with pytest.raises(ValueError):
+        clients.validate(ClientConfig(region="us-east-1", retry_mode="fast"))
+    with pytest.raises(ValueError):
+        clients.validate(ClientConfig(region="us-east-1", max_pool_connections=0))
@@ -0,0 +1,30 @@
+# tests/test_config.py
+#
+# query_pipeline은 임포트할 때 설정을 검사하므로, 테스트 프로세스에 이미 로드된 모듈과 섞이지 않도록 별도 프로세스에서 임포트합니다.
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import LAMBDA_DIR
+
+
+def _import_pipeline(**env):
+    environ = {**os.environ, **env}
+    return subprocess.run([sys.executable, "-c", "import query_pipeline"], cwd=LAMBDA_DIR, env=environ,
+                          capture_output=True, text=True)
+
+
+@pytest.mark.parametrize("env, expected", [
+    ({"RETRIEVER": "elastic"}, "'elastic'"),
+    ({"RETRIEVER": "opensearch", "OPENSEARCH_HOST": ""}, "OPENSEARCH_HOST=''"),
+    ({"RETRIEVER": "local", "LOCAL_CORPUS_PATH": ""}, "LOCAL_CORPUS_PATH is required"),
+])
+def test_invalid_retriever_config_raises_value_error(env, expected):
+    result = _import_pipeline(**env)
+
+    assert result.returncode != 0
+    assert "ValueError" in result.stderr
+    assert expected in result.stderr
@@ -0,0 +1,115 @@
+# tests/test_context_packer.py
+
+from chunker import PARAGRAPH_SEPARATOR
+from context_packer import DOCUMENT_OVERHEAD_TOKENS, ContextPacker
+
+
+def _chunk(chunk_id, text, page=1, source="manual.pdf"):
+    return {"text": text, "chunk_id": chunk_id, "page": page, "source": source}
+
+
+def _words(prefix, count):
+    return " ".join(f"{prefix}{i}" for i in range(count))
+
+
+def test_empty_candidates():
+    documents, stats = ContextPacker().pack([])
+
+    assert documents == []
+    assert stats["candidates"] == 0 and stats["documents"] == 0 and stats["context_tokens"] == 0
+
+
+def test_near_duplicates_are_dropped():
+    text = _words("oil", 30)
+    chunks = [_chunk(0, text), _chunk(5, text + " extra"), _chunk(9, _words("tire", 30))]
+
+    documents, stats = ContextPacker(token_budget=1000).pack(chunks)
+
+    assert stats["duplicates"] == 1
+    assert [document.chunk_ids for document in documents] == [(0,), (9,)]
+
+
+def test_context_stays_within_budget():
+    chunks = [_chunk(i * 10, _words(f"w{i}_", 80), page=i) for i in range(6)]
+    packer = ContextPacker(token_budget=300)
+
+    documents, stats = packer.pack(chunks)
+
+    assert stats["context_tokens"] + DOCUMENT_OVERHEAD_TOKENS * len(documents) <= 300
+    assert stats["selected_chunks"] < len(chunks)
+    assert documents[0].chunk_ids == (0,)
+
+
+def test_adjacent_chunks_are_merged_without_repeating_overlap():
+    overlap = "shared paragraph"
+    first = _chunk(3, f"first paragraph{PARAGRAPH_SEPARATOR}{overlap}", page=2)
+    second = _chunk(4, f"{overlap}{PARAGRAPH_SEPARATOR}second paragraph", page=3)
+
+    documents, stats = ContextPacker(token_budget=1000, duplicate_threshold=1.1).pack([second, first])
+
+    document, = documents
+    assert document.chunk_ids == (3, 4)
+    assert document.pages == (2, 3)
+    assert document.text.count(overlap) == 1
+    assert document.rank == 0
+    assert stats["documents"] == 1
+
+
+def test_chunks_from_other_manuals_or_without_id_are_not_merged():
+    chunks = [
+        _chunk(1, _words("a", 5), source="a.pdf"),
+        _chunk(2, _words("b", 5), source="b.pdf"),
+        {"text": _words("c", 5), "page": 1, "source": "a.pdf"},
+        {"text": _words("d", 5), "page": 1, "source": "a.pdf"},
+    ]
+
+    documents, _ = ContextPacker(token_budget=1000).pack(chunks)
+
+    assert len(documents) == 4
+    assert [document.rank for document in documents] == [0, 1, 2, 3]
+
+
+def test_chunk_that_truncates_to_nothing_is_skipped():
+    # 문자 수를 토큰 수로 쓰면 공백 없는 긴 청크는 단어 단위로도 자를 수 없어 빈 문자열이 됨
+    chunks = [_chunk(0, "a" * 90), _chunk(5, "y" * 3000), _chunk(9, "tail")]
+
+    documents, stats = ContextPacker(token_budget=250, count_tokens=len).pack(chunks)
+
+    assert [document.chunk_ids for document in documents] == [(0,), (9,)]
+    assert all(document.text.strip() for document in documents)
+    assert stats["selected_chunks"] == 2
+
+
+def test_oversized_chunk_is_truncated_to_leading_paragraphs():
+    paragraphs = [_words(f"p{i}_", 40) for i in range(5)]
+    chunks = [_chunk(0, PARAGRAPH_SEPARATOR.join(paragraphs))]
+
+    documents, stats = ContextPacker(token_budget=150).pack(chunks)
+
+    document, = documents
+    assert document.text.startswith(paragraphs[0])
+    assert paragraphs[-1] not in document.text
+    assert stats["context_tokens"] <= 150 - DOCUMENT_OVERHEAD_TOKENS
+
+
+def test_neighbors_are_added_within_remaining_budget():
+    chunks = [_chunk(10, _words("hit", 20), page=4)]
+    neighbors = [_chunk(9, _words("before", 20), page=4), _chunk(11, _words("after", 20), page=5),
+                 _chunk(30, _words("far", 20), page=9)]
+
+    documents, stats = ContextPacker(token_budget=1000).pack(chunks, neighbors=neighbors)
+
+    document, = documents
+    assert document.chunk_ids == (9, 10, 11)
+    assert document.pages == (4, 5)
+    assert stats["neighbor_chunks"] == 2
+
+
+def test_neighbors_do_not_exceed_budget():
+    chunks = [_chunk(10, _words("hit", 20))]
+    neighbors = [_chunk(9, _words("before", 500)), _chunk(11, _words("after", 500))]
+
+    documents, stats = ContextPacker(token_budget=100).pack(chunks, neighbors=neighbors)
+
+    assert [document.chunk_ids for document in documents] == [(10,)]
+    assert stats["neighbor_chunks"] == 0
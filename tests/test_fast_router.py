@@ -0,0 +1,96 @@
+# tests/test_fast_router.py
+
+import pytest
+
+from fast_router import FastRouter
+from manual_catalog import CatalogSnapshot, ManualEntry, generate_aliases
+
+BOBCAT = "Bobcat-T590-Operating-Manual"
+DOOSAN = "D20,25,30,33S-9_D20,25,30,33SE-9_SB2503C04"
+
+
+def _snapshot(*names):
+    return CatalogSnapshot([ManualEntry(name, f"{name}.pdf", generate_aliases(name), "v1") for name in names])
+
+
+def _route(query, *names):
+    return FastRouter().route(query, _snapshot(*(names or (BOBCAT, DOOSAN))))
+
+
+@pytest.mark.parametrize("query", ["안녕하세요", "안녕하세요!", " Hello ", "좋은 아침"])
+def test_greetings(query):
+    decision = _route(query)
+
+    assert decision.scenario == "greeting"
+    assert decision.manual is None
+
+
+@pytest.mark.parametrize("query", ["감사합니다", "Thank you!", "네"])
+def test_small_talk(query):
+    assert _route(query).scenario == "general_chat"
+
+
+@pytest.mark.parametrize("query", ["안녕하세요 유압유는 뭘 써요?", "고마워요 그런데 유압유는?", "", "!!!"])
+def test_greeting_with_question_or_empty_query_is_left_to_llm(query):
+    assert _route(query) is None
+
+
+def test_greeting_with_manual_question_is_a_manual_query():
+    assert _route("안녕하세요 T590 엔진 오일은?").manual.name == BOBCAT
+
+
+@pytest.mark.parametrize("query", [
+    "Bobcat T590 엔진 오일 교체 주기",
+    "bobcat-t590 엔진 오일",
+    "T590의 엔진 오일 교체 주기",
+    "Ｔ５９０ 엔진 오일",  # 전각 문자
+])
+def test_single_manual_mention(query):
+    decision = _route(query)
+
+    assert decision.scenario == "manual_query"
+    assert decision.manual.name == BOBCAT
+    assert decision.reason == "alias_match"
+
+
+def test_longest_alias_wins_within_one_manual():
+    decision = _route("D20,25,30,33SE-9 배터리 점검")
+
+    assert decision.manual.name == DOOSAN
+
+
+@pytest.mark.parametrize("query", [
+    "T5900 엔진 오일 교체 주기",
+    "AT590X 부품 번호",
+    "T590X 유압유",
+    "ST590 매뉴얼",
+])
+def test_alias_inside_another_model_number_is_not_a_mention(query):
+    assert _route(query) is None
+
+
+def test_alias_next_to_another_token_still_matches():
+    assert _route("T590 T650 차이").manual.name == BOBCAT
+    assert _route("T590/엔진").manual.name == BOBCAT
+
+
+def test_aliases_shared_by_several_manuals_are_left_to_llm():
+    decision = _route("T590 엔진 오일", BOBCAT, "Bobcat-T590-Service-Manual")
+
+    assert decision is None
+
+
+def test_mentions_of_several_manuals_are_left_to_llm():
+    assert _route("T590과 D20,25,30,33S-9 비교") is None
+
+
+def test_stats_count_fast_hits_and_saved_time():
+    router = FastRouter()
+    router.record(False, llm_latency=1.0)
+    router.record(True)
+    router.record(True)
+
+    stats = router.stats()
+    assert stats["fast_hits"] == 2 and stats["llm_fallbacks"] == 1
+    assert stats["hit_rate"] == pytest.approx(2 / 3, abs=1e-4)
+    assert stats["estimated_seconds_saved"] == pytest.approx(2.0)
@@ -0,0 +1,177 @@
+# tests/test_indexing.py
+
+import pytest
+
+import indexing
+from indexing import ReindexPlanner, assign_document_ids, fetch_indexed_documents, link_neighbors, make_document_id
+
+SOURCE = "manual.pdf"
+
+
+def _records(*texts):
+    return [{"text": text, "page": 1, "chunk_id": i} for i, text in enumerate(texts)]
+
+
+def _indexed(records):
+    """assign_document_ids/link_neighbors를 거친 레코드를 fetch_indexed_documents의 반환 형태로 만듭니다."""
+    return {record["_id"]: {field: record[field] for field in indexing.METADATA_FIELDS} for record in records}
+
+
+def _linked(source, records):
+    return list(link_neighbors(assign_document_ids(source, records)))
+
+
+class _SearchClient:
+    """fetch_indexed_documents가 보내는 쿼리(source term, chunk_id range, ids 제외, chunk_id 정렬)만 해석하는 가짜 클라이언트입니다."""
+
+    class _Indices:
+        def exists(self, index):
+            return True
+
+    def __init__(self, documents):
+        self.indices = self._Indices()
+        self.documents = documents  # [(문서 ID, _source)]
+        self.bodies = []
+
+    def search(self, index, body):
+        self.bodies.append(body)
+        query = body["query"]["bool"]
+        hits = []
+        for doc_id, source in self.documents:
+            if not self._matches(query, doc_id, source):
+                continue
+            fields = {field: source[field] for field in body["_source"] if field in source}
+            hits.append({"_id": doc_id, "_source": fields, "sort": [source["chunk_id"]]})
+        # 정렬 값이 같은 문서의 순서는 보장되지 않으므로 문서 ID 역순으로 섞어서 반환
+        hits.sort(key=lambda hit: hit["_id"], reverse=True)
+        hits.sort(key=lambda hit: hit["sort"][0])
+        if "search_after" in body:
+            hits = [hit for hit in hits if hit["sort"] > body["search_after"]]
+        return {"hits": {"hits": hits[:body["size"]]}}
+
+    @staticmethod
+    def _matches(query, doc_id, source):
+        for condition in query["filter"]:
+            if "term" in condition and source["source"] != condition["term"]["source"]:
+                return False
+            if "range" in condition and source["chunk_id"] < condition["range"]["chunk_id"]["gte"]:
+                return False
+        excluded = [doc_id in condition["ids"]["values"] for condition in query.get("must_not", [])]
+        return not any(excluded)
+
+
+# --- 문서 ID / 인접 청크 ---
+
+def test_document_ids_are_deterministic_and_distinguish_repeated_text():
+    first = list(assign_document_ids(SOURCE, _records("a", "b", "a")))
+    second = list(assign_document_ids(SOURCE, _records("a", "b", "a")))
+
+    assert [record["_id"] for record in first] == [record["_id"] for record in second]
+    assert first[0]["_id"] == make_document_id(SOURCE, "a", 0)
+    assert first[2]["_id"] == make_document_id(SOURCE, "a", 1)
+    assert len({record["_id"] for record in first}) == 3
+
+
+def test_document_ids_depend_on_source_and_text_not_position():
+    before = list(assign_document_ids(SOURCE, _records("a", "b")))
+    after = list(assign_document_ids(SOURCE, _records("new page", "a", "b")))
+
+    assert [record["_id"] for record in after[1:]] == [record["_id"] for record in before]
+    assert make_document_id("other.pdf", "a") != before[0]["_id"]
+
+
+def test_link_neighbors_fills_prev_and_next_ids():
+    records = _linked(SOURCE, _records("a", "b", "c"))
+    ids = [record["_id"] for record in records]
+
+    assert [record["prev_id"] for record in records] == [None, ids[0], ids[1]]
+    assert [record["next_id"] for record in records] == [ids[1], ids[2], None]
+    assert list(link_neighbors([])) == []
+
+
+# --- 변경분 계산 ---
+
+def test_planner_classifies_new_moved_and_unchanged_chunks():
+    planner = ReindexPlanner(_indexed(_linked(SOURCE, _records("a", "b", "c"))))
+
+    # 앞에 청크가 추가되면 a의 위치/이웃 정보만 바뀌고, b는 이웃이 바뀌며, c는 위치만 바뀜
+    decisions = [planner.classify(record) for record in _linked(SOURCE, _records("new", "a", "b", "c"))]
+
+    assert decisions == [ReindexPlanner.INDEX, ReindexPlanner.UPDATE, ReindexPlanner.UPDATE, ReindexPlanner.UPDATE]
+    assert planner.counts == {ReindexPlanner.INDEX: 1, ReindexPlanner.UPDATE: 3, ReindexPlanner.UNCHANGED: 0}
+    assert planner.total == 4
+    assert planner.stale_ids() == []
+
+
+def test_planner_leaves_identical_upload_unchanged_and_reports_removed_chunks():
+    old = _linked(SOURCE, _records("a", "b", "c"))
+    planner = ReindexPlanner(_indexed(old))
+
+    for record in _linked(SOURCE, _records("a", "b", "c")):
+        assert planner.classify(record) == ReindexPlanner.UNCHANGED
+    assert planner.stale_ids() == []
+
+    planner = ReindexPlanner(_indexed(old))
+    for record in _linked(SOURCE, _records("a", "b")):
+        planner.classify(record)
+    assert planner.stale_ids() == [old[2]["_id"]]
+    assert planner.seen_ids == {old[0]["_id"], old[1]["_id"]}
+
+
+def test_planner_marks_legacy_documents_stale():
+    legacy = {f"legacy{i}": {"page": 1, "chunk_id": i} for i in range(2)}
+    planner = ReindexPlanner(legacy)
+
+    for record in _linked(SOURCE, _records("a", "b")):
+        assert planner.classify(record) == ReindexPlanner.INDEX
+
+    assert sorted(planner.stale_ids()) == ["legacy0", "legacy1"]
+
+
+# --- 기존 문서 조회 ---
+
+def _legacy_documents(copies, chunks, source=SOURCE):
+    """이전 버전처럼 재업로드할 때마다 같은 chunk_id로 중복 저장된 문서입니다."""
+    return [(f"old{copy * chunks + chunk_id}", {"source": source, "page": 1, "chunk_id": chunk_id})
+            for copy in range(copies) for chunk_id in range(chunks)]
+
+
+@pytest.mark.parametrize("page_size", [1, 2, 3, 4, 7, 8, 1000])
+def test_fetch_returns_every_duplicate_across_page_boundaries(monkeypatch, page_size):
+    monkeypatch.setattr(indexing, "FETCH_PAGE_SIZE", page_size)
+    documents = _legacy_documents(copies=2, chunks=4) + _legacy_documents(1, 3, source="other.pdf")
+    client = _SearchClient(documents)
+
+    existing = fetch_indexed_documents(client, "idx", SOURCE)
+
+    assert sorted(existing) == sorted(f"old{i}" for i in range(8))
+    assert all("from" not in body for body in client.bodies)
+
+
+def test_fetch_pages_through_more_duplicates_than_a_page(monkeypatch):
+    monkeypatch.setattr(indexing, "FETCH_PAGE_SIZE", 2)
+    client = _SearchClient(_legacy_documents(copies=5, chunks=2))
+
+    existing = fetch_indexed_documents(client, "idx", SOURCE)
+
+    assert len(existing) == 10
+    # 한 페이지를 채우면 다음 페이지를 조회하고, 모자라면 멈춤
+    assert len(client.bodies) == 6
+
+
+def test_stale_duplicates_are_all_found():
+    documents = _legacy_documents(copies=2, chunks=4)
+    planner = ReindexPlanner(fetch_indexed_documents(_SearchClient(documents), "idx", SOURCE))
+
+    for record in _linked(SOURCE, _records("a", "b", "c", "d")):
+        planner.classify(record)
+
+    assert sorted(planner.stale_ids()) == sorted(doc_id for doc_id, _ in documents)
+
+
+def test_fetch_missing_index_returns_empty():
+    client = _SearchClient([])
+    client.indices.exists = lambda index: False
+
+    assert fetch_indexed_documents(client, "idx", SOURCE) == {}
+    assert client.bodies == []
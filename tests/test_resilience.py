@@ -0,0 +1,226 @@
+# tests/test_resilience.py
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import resilience
+from resilience import CircuitBreaker, CircuitOpenError, DeadlineExceeded
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class Throttled(Exception):
+    pass
+
+
+def _breaker(**kwargs):
+    clock = FakeClock()
+    kwargs.setdefault("failure_threshold", 3)
+    kwargs.setdefault("reset_timeout", 10.0)
+    kwargs.setdefault("is_failure", lambda error: isinstance(error, Throttled))
+    return CircuitBreaker("bedrock", clock=clock, **kwargs), clock
+
+
+def _fail(breaker, error=Throttled):
+    with pytest.raises(error):
+        with breaker.guard():
+            raise error()
+
+
+# --- 회로 차단기 ---
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker, _ = _breaker()
+
+    for _ in range(2):
+        _fail(breaker)
+    assert breaker.state == CircuitBreaker.CLOSED
+    _fail(breaker)
+
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.stats()["opened"] == 1
+
+
+def test_open_breaker_rejects_without_calling():
+    breaker, _ = _breaker(failure_threshold=1)
+    _fail(breaker)
+    calls = []
+
+    with pytest.raises(CircuitOpenError):
+        breaker.call(calls.append, 1)
+
+    assert calls == []
+    assert breaker.stats()["rejected"] == 1
+
+
+def test_success_resets_failure_count():
+    breaker, _ = _breaker()
+    _fail(breaker)
+    _fail(breaker)
+
+    assert breaker.call(lambda: "ok") == "ok"
+    _fail(breaker)
+
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.consecutive_failures == 1
+
+
+def test_errors_that_are_not_failures_do_not_count():
+    breaker, _ = _breaker(failure_threshold=1)
+
+    _fail(breaker, error=KeyError)
+
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.consecutive_failures == 0
+
+
+def test_half_open_allows_a_single_trial_after_reset_timeout():
+    breaker, clock = _breaker(failure_threshold=1)
+    _fail(breaker)
+
+    clock.now = 9.9
+    assert not breaker.allow()
+    clock.now = 10.0
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # 시험 호출이 끝나기 전의 다른 호출은 거절
+    assert not breaker.allow()
+
+
+def test_successful_trial_closes_breaker():
+    breaker, clock = _breaker(failure_threshold=1)
+    _fail(breaker)
+    clock.now = 10.0
+
+    assert breaker.call(lambda: 42) == 42
+
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.call(lambda: 43) == 43
+
+
+def test_failed_trial_reopens_for_another_reset_timeout():
+    breaker, clock = _breaker(failure_threshold=3)
+    for _ in range(3):
+        _fail(breaker)
+    clock.now = 10.0
+
+    _fail(breaker)
+
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.opened_at == 10.0
+    assert breaker.stats()["opened"] == 2
+    clock.now = 19.0
+    assert not breaker.allow()
+    clock.now = 20.0
+    assert breaker.allow()
+
+
+def test_interrupted_trial_is_released_without_changing_state():
+    breaker, clock = _breaker(failure_threshold=1)
+    _fail(breaker)
+    clock.now = 10.0
+
+    # 스트리밍 중 클라이언트 연결이 끊긴 경우처럼 결과를 알 수 없는 종료
+    _fail(breaker, error=GeneratorExit)
+
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
+
+
+def test_non_failure_error_in_trial_releases_it():
+    breaker, clock = _breaker(failure_threshold=1)
+    _fail(breaker)
+    clock.now = 10.0
+
+    _fail(breaker, error=KeyError)
+
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
+
+
+# --- 마감 시각 ---
+
+def test_nested_deadline_keeps_the_earlier_one():
+    assert resilience.remaining() is None
+    with resilience.deadline(1.0):
+        with resilience.deadline(10.0):
+            assert resilience.remaining() <= 1.0
+        with resilience.deadline(0):
+            assert resilience.remaining() <= 1.0
+    assert resilience.remaining() is None
+
+
+def test_call_timeout_is_capped_by_remaining_time():
+    assert resilience.call_timeout(5.0) == 5.0
+    with resilience.deadline(0.5):
+        assert resilience.call_timeout(5.0) <= 0.5
+        assert resilience.call_timeout(0.1) == 0.1
+
+
+def test_checked_node_raises_after_deadline():
+    node = resilience.checked_node("search", lambda state: {"ok": True})
+    with resilience.deadline(0.01):
+        time.sleep(0.02)
+        with pytest.raises(DeadlineExceeded) as error:
+            node({})
+    assert error.value.stage == "search"
+
+
+def test_bounded_call_stops_waiting_at_deadline():
+    executor = ThreadPoolExecutor(max_workers=2)
+    release = threading.Event()
+    try:
+        start = time.perf_counter()
+        with resilience.deadline(0.1):
+            with pytest.raises(DeadlineExceeded):
+                resilience.bounded_call(release.wait, 5, executor=executor, stage="bedrock.answer")
+        assert time.perf_counter() - start < 1.0
+    finally:
+        release.set()
+        executor.shutdown()
+
+
+def test_bounded_call_without_deadline_runs_inline():
+    caller = threading.current_thread()
+    assert resilience.bounded_call(threading.current_thread, executor=ThreadPoolExecutor(1)) is caller
+
+
+def test_bounded_call_hedges_slow_first_attempt():
+    executor = ThreadPoolExecutor(max_workers=2)
+    attempts = []
+    lock = threading.Lock()
+
+    def slow_then_fast():
+        with lock:
+            attempts.append(len(attempts))
+            attempt = attempts[-1]
+        time.sleep(1.0 if attempt == 0 else 0.0)
+        return attempt
+
+    try:
+        with resilience.deadline(5.0):
+            result = resilience.bounded_call(slow_then_fast, executor=executor, hedge_after=0.05)
+    finally:
+        executor.shutdown()
+
+    assert result == 1
+    assert len(attempts) == 2
+
+
+def test_bounded_call_runs_in_callers_context():
+    executor = ThreadPoolExecutor(max_workers=1)
+    try:
+        with resilience.deadline(5.0):
+            inner = resilience.bounded_call(resilience.remaining, executor=executor)
+    finally:
+        executor.shutdown()
+    assert inner is not None and inner <= 5.0
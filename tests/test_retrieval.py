@@ -0,0 +1,105 @@
+# tests/test_retrieval.py
+
+import pytest
+
+from retrieval import DEFAULT_RRF_K, hybrid_search, reciprocal_rank_fusion
+
+
+def _hits(*ids):
+    return [{"_id": doc_id, "_score": 100.0 - i, "_source": {"text": doc_id}} for i, doc_id in enumerate(ids)]
+
+
+def test_rrf_single_list_keeps_order_and_scores_by_rank():
+    fused = reciprocal_rank_fusion([_hits("a", "b", "c")], k=60)
+
+    assert [hit["_id"] for hit in fused] == ["a", "b", "c"]
+    assert fused[0]["_score"] == pytest.approx(1 / 61)
+    assert fused[2]["_score"] == pytest.approx(1 / 63)
+
+
+def test_rrf_documents_found_by_both_lists_rank_first():
+    bm25 = _hits("part-no", "a", "b")
+    knn = _hits("c", "d", "part-no")
+
+    fused = reciprocal_rank_fusion([bm25, knn], k=DEFAULT_RRF_K)
+
+    assert fused[0]["_id"] == "part-no"
+    assert fused[0]["_score"] == pytest.approx(1 / (DEFAULT_RRF_K + 1) + 1 / (DEFAULT_RRF_K + 3))
+    assert len(fused) == 5
+
+
+def test_rrf_ignores_original_score_scale():
+    bm25 = [{"_id": "a", "_score": 35.0}, {"_id": "b", "_score": 2.0}]
+    knn = [{"_id": "b", "_score": 0.99}, {"_id": "a", "_score": 0.98}]
+
+    fused = reciprocal_rank_fusion([bm25, knn])
+
+    # 순위가 대칭이므로 점수가 같고, 먼저 나온 a가 앞에 옴 (정렬이 안정적)
+    assert fused[0]["_score"] == pytest.approx(fused[1]["_score"])
+    assert [hit["_id"] for hit in fused] == ["a", "b"]
+
+
+def test_rrf_limit_and_empty_inputs():
+    assert reciprocal_rank_fusion([]) == []
+    assert reciprocal_rank_fusion([[], []]) == []
+    assert [hit["_id"] for hit in reciprocal_rank_fusion([_hits("a", "b", "c")], limit=2)] == ["a", "b"]
+    assert reciprocal_rank_fusion([_hits("a")], limit=0) == []
+
+
+def test_rrf_keeps_first_hit_fields_and_does_not_mutate_input():
+    first = _hits("a")
+    second = [{"_id": "a", "_score": 0.5, "_source": {"text": "other"}}]
+
+    fused = reciprocal_rank_fusion([first, second])
+
+    assert fused[0]["_source"] == {"text": "a"}
+    assert first[0]["_score"] == 100.0
+
+
+def test_rrf_smaller_k_favors_top_ranks():
+    lists = [_hits("a", "b", "c", "d", "both"), _hits("x", "y", "z", "w", "both")]
+
+    small_k = [hit["_id"] for hit in reciprocal_rank_fusion(lists, k=1)]
+    large_k = [hit["_id"] for hit in reciprocal_rank_fusion(lists, k=1000)]
+
+    # k가 작으면 한쪽 목록의 1위가, k가 크면 양쪽 모두에 (낮은 순위로) 나온 문서가 앞섬
+    assert small_k[:2] == ["a", "x"]
+    assert large_k[0] == "both"
+
+
+class _MSearchClient:
+    def __init__(self, responses):
+        self.responses = responses
+        self.bodies = []
+
+    def msearch(self, body, **params):
+        self.bodies.append(body)
+        return {"took": 4, "responses": self.responses}
+
+
+def test_hybrid_search_uses_one_round_trip_and_fuses():
+    client = _MSearchClient([{"hits": {"hits": _hits("a", "b")}}, {"hits": {"hits": _hits("b", "c")}}])
+
+    hits = hybrid_search(client, "idx", "E-05", [0.1, 0.2], size=2, source="manual.pdf", candidates=5)
+
+    assert len(client.bodies) == 1
+    header, bm25, _, knn = client.bodies[0]
+    assert header == {"index": "idx"}
+    assert bm25["size"] == 5 and knn["size"] == 5
+    assert {"term": {"source": "manual.pdf"}} in bm25["query"]["bool"]["filter"]
+    assert [hit["_id"] for hit in hits] == ["b", "a"]
+
+
+def test_hybrid_search_falls_back_to_the_query_that_succeeded():
+    client = _MSearchClient([{"error": {"type": "query_shard_exception"}}, {"hits": {"hits": _hits("c", "d")}}])
+
+    hits = hybrid_search(client, "idx", "E-05", [0.1], size=3)
+
+    assert [hit["_id"] for hit in hits] == ["c", "d"]
+
+
+def test_hybrid_search_raises_when_both_queries_fail():
+    client = _MSearchClient([{"error": "bm25"}, {"error": "knn"}])
+
+    with pytest.raises(RuntimeError):
+        hybrid_search(client, "idx", "E-05", [0.1], size=3)
@@ -0,0 +1,41 @@
+# tests/test_search_spans.py
+
+import tracing
+
+from conftest import MANUAL_SOURCE
+
+
+def test_prefetch_and_search_are_recorded_as_separate_spans(fake_pipeline, monkeypatch):
+    pipeline = fake_pipeline.module
+    monkeypatch.setattr(pipeline, "SPECULATIVE_PREFETCH_K", 20)
+    monkeypatch.setattr(pipeline, "RETRIEVAL_MODE", "knn")
+
+    with tracing.trace("query", sink=fake_pipeline.sink):
+        embedding, prefetched = pipeline._speculate("엔진 오일 점검")
+        chunks = pipeline._search("엔진 오일 점검", embedding, 3, MANUAL_SOURCE)
+
+    prefetch, = fake_pipeline.sink.spans(f"{pipeline.RETRIEVER}.search.prefetch")
+    search, = fake_pipeline.sink.spans(f"{pipeline.RETRIEVER}.search")
+    assert prefetch["mode"] == "knn" and prefetch["hits"] == len(prefetched)
+    assert search["hits"] == len(chunks) == 3
+
+
+def test_search_without_text_is_knn_only(fake_pipeline, monkeypatch):
+    pipeline = fake_pipeline.module
+    monkeypatch.setattr(pipeline, "RETRIEVAL_MODE", "hybrid")
+    queries = []
+    original = fake_pipeline.opensearch.search
+
+    def search(*args, **kwargs):
+        queries.append(kwargs.get("body") or args[-1])
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(fake_pipeline.opensearch, "search", search)
+    embedding = pipeline._embed_query("엔진 오일 점검")
+
+    with tracing.trace("query", sink=fake_pipeline.sink):
+        pipeline._search(None, embedding, 3)
+
+    span, = fake_pipeline.sink.spans(f"{pipeline.RETRIEVER}.search")
+    assert span["mode"] == "knn"
+    assert queries and all("knn" in str(body) for body in queries)
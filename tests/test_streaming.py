@@ -0,0 +1,101 @@
+# tests/test_streaming.py
+#
+# 가짜 Bedrock을 대상으로 답변 스트리밍(stream_answer)의 이벤트 순서와 첫 토큰까지의 시간(TTFT)을 확인합니다.
+
+import json
+import time
+
+import templates
+from fake_bedrock import DEFAULT_LLM_ANSWER
+
+QUERY = "Bobcat-T590 엔진 오일 점검 방법"
+
+
+def _collect(pipeline, query=QUERY, **kwargs):
+    """stream_answer의 이벤트를 모두 받아 (이벤트 목록, 첫 delta까지의 시간, 전체 시간)을 반환합니다."""
+    start = time.perf_counter()
+    first_delta = None
+    events = []
+    for event in pipeline.stream_answer(query, **kwargs):
+        if event["type"] == "delta" and first_delta is None:
+            first_delta = time.perf_counter() - start
+        events.append(event)
+    return events, first_delta, time.perf_counter() - start
+
+
+def test_deltas_arrive_in_order_before_done(fake_pipeline):
+    events, _, _ = _collect(fake_pipeline.module)
+
+    assert [event["type"] for event in events[:-1]] == ["delta"] * (len(events) - 1)
+    assert events[-1]["type"] == "done"
+    deltas = [event["text"] for event in events[:-1]]
+    assert len(deltas) > 1
+    assert "".join(deltas) == events[-1]["text"] == DEFAULT_LLM_ANSWER
+    assert events[-1]["scenario"] == "manual_query"
+    assert events[-1]["manual_name"] == "Bobcat-T590-Operating-Manual"
+
+
+def test_first_token_arrives_before_generation_finishes(fake_pipeline):
+    answer = " ".join(f"단어{i}" for i in range(40))
+    fake_pipeline.install(llm_first_token_latency=0.05, llm_token_latency=0.02,
+                          llm_responder=lambda request: answer)
+
+    events, ttft, total = _collect(fake_pipeline.module)
+
+    assert events[-1]["text"] == answer
+    # 첫 조각은 첫 토큰 지연 뒤 바로 도착하고, 나머지 39개 토큰(각 0.02초)을 기다리지 않음
+    assert 0.05 <= ttft < total - 0.5
+    assert total >= 0.05 + 39 * 0.02
+
+
+def test_streaming_ttft_is_shorter_than_buffered_response(fake_pipeline):
+    fake_pipeline.install(llm_first_token_latency=0.05, llm_token_latency=0.01)
+    pipeline = fake_pipeline.module
+    _collect(pipeline)  # 그래프 컴파일 등 초기화 비용 제외
+
+    start = time.perf_counter()
+    response = pipeline.lambda_handler({"body": json.dumps({"query": QUERY})}, None)
+    buffered = time.perf_counter() - start
+    _, ttft, _ = _collect(pipeline)
+
+    assert response["statusCode"] == 200
+    assert ttft < buffered
+
+
+def test_stream_records_trace_with_first_token_metric(fake_pipeline):
+    fake_pipeline.install(llm_first_token_latency=0.02)
+
+    events, _, _ = _collect(fake_pipeline.module, trace_id="trace-1")
+
+    assert events[-1]["trace_id"] == "trace-1"
+    record, = fake_pipeline.sink.records
+    assert record["trace_id"] == "trace-1"
+    assert record["scenario"] == "manual_query"
+    answer_span, = fake_pipeline.sink.spans("bedrock.answer")
+    assert answer_span["parent"] == "generate_response"
+    assert answer_span["first_token_ms"] >= 20
+    assert answer_span["output_tokens"] > 0
+
+
+def test_stream_degrades_when_first_token_misses_deadline(fake_pipeline):
+    fake_pipeline.install(llm_first_token_latency=2.0)
+
+    events, _, total = _collect(fake_pipeline.module, deadline_seconds=0.5)
+
+    assert events[-1]["scenario"] == "degraded"
+    assert events[-1]["text"] == templates.TIMEOUT_ANSWER
+    assert [event["text"] for event in events if event["type"] == "delta"] == [templates.TIMEOUT_ANSWER]
+    assert total < 1.5
+
+
+def test_stream_is_cut_between_chunks_at_deadline(fake_pipeline):
+    fake_pipeline.install(llm_token_latency=0.02, llm_responder=lambda request: "단어 " * 200)
+
+    events, _, total = _collect(fake_pipeline.module, deadline_seconds=0.5)
+
+    done = events[-1]
+    assert done["scenario"] == "degraded"
+    # 이미 보낸 조각 뒤에 고정 답변을 이어 붙임
+    assert done["text"].endswith(templates.TIMEOUT_ANSWER)
+    assert done["text"].startswith("단어 ")
+    assert total < 1.5
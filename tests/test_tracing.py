@@ -0,0 +1,121 @@
+# tests/test_tracing.py
+
+import json
+import threading
+
+import pytest
+
+import tracing
+
+
+def test_spans_are_recorded_with_parent_and_attributes():
+    sink = tracing.InMemorySink()
+    with tracing.trace("query", trace_id="t1", sink=sink, scenario="manual_query"):
+        with tracing.span("generate_response"):
+            with tracing.span("bedrock.answer", kind="bedrock", input_tokens=10):
+                tracing.annotate(output_tokens=5)
+
+    record, = sink.records
+    assert record["trace_id"] == "t1"
+    assert record["pipeline"] == "query"
+    assert record["scenario"] == "manual_query"
+    assert [span["name"] for span in record["spans"]] == ["bedrock.answer", "generate_response"]
+    answer, = sink.spans("bedrock.answer")
+    assert answer["parent"] == "generate_response"
+    assert answer["kind"] == "bedrock"
+    assert answer["input_tokens"] == 10 and answer["output_tokens"] == 5
+    assert "parent" not in sink.spans("generate_response")[0]
+
+
+def test_errors_are_recorded_on_span_and_trace():
+    sink = tracing.InMemorySink()
+    with pytest.raises(ValueError):
+        with tracing.trace("query", sink=sink):
+            with tracing.span("search"):
+                raise ValueError("boom")
+
+    record, = sink.records
+    assert record["error"] == "ValueError"
+    assert record["spans"][0]["error"] == "ValueError"
+
+
+def test_span_outside_trace_is_not_recorded():
+    sink = tracing.InMemorySink()
+    with tracing.span("orphan") as span:
+        tracing.annotate(hits=3)
+    assert span.attributes == {"hits": 3}
+    assert tracing.current_trace_id() is None
+    assert sink.records == []
+
+
+def test_bind_carries_trace_into_other_threads():
+    sink = tracing.InMemorySink()
+
+    def work():
+        with tracing.span("bedrock.embed", kind="bedrock"):
+            pass
+
+    with tracing.trace("ingest", sink=sink):
+        with tracing.span("index"):
+            bound = threading.Thread(target=tracing.bind(work))
+            unbound = threading.Thread(target=work)
+            bound.start(), unbound.start()
+            bound.join(), unbound.join()
+
+    embed, = sink.spans("bedrock.embed")
+    assert embed["parent"] == "index"
+
+
+def test_repeated_spans_are_capped_per_name():
+    sink = tracing.InMemorySink()
+    with tracing.trace("ingest", sink=sink):
+        for _ in range(tracing.MAX_SPANS_PER_NAME + 5):
+            with tracing.span("bedrock.embed"):
+                pass
+        with tracing.span("index"):
+            pass
+
+    assert len(sink.spans("bedrock.embed")) == tracing.MAX_SPANS_PER_NAME
+    assert len(sink.spans("index")) == 1
+    assert sink.records[0]["dropped_spans"] == 5
+
+
+def test_memory_sink_clear():
+    sink = tracing.InMemorySink()
+    with tracing.trace("query", sink=sink):
+        pass
+    sink.clear()
+    assert sink.records == [] and sink.spans() == []
+
+
+def test_emf_sink_emits_metrics_with_units():
+    lines = []
+    sink = tracing.EMFSink("TestNamespace", print_fn=lines.append)
+    with tracing.trace("query", trace_id="t2", sink=sink):
+        with tracing.span("opensearch.search", kind="retriever", took_ms=3, hits=2, response_bytes=100):
+            pass
+        for tokens in (4, 6):
+            with tracing.span("bedrock.embed", input_tokens=tokens):
+                pass
+
+    document = json.loads(lines[0])
+    directive, = document["_aws"]["CloudWatchMetrics"]
+    assert directive["Namespace"] == "TestNamespace"
+    assert directive["Dimensions"] == [["Pipeline"]]
+    units = {metric["Name"]: metric["Unit"] for metric in directive["Metrics"]}
+    assert units["request.duration_ms"] == "Milliseconds"
+    assert units["opensearch.search.response_bytes"] == "Bytes"
+    assert units["opensearch.search.hits"] == "Count"
+    assert document["Pipeline"] == "query"
+    assert document["trace_id"] == "t2"
+    assert document["opensearch.search.took_ms"] == 3
+    # 같은 span이 여러 번이면 값 배열
+    assert document["bedrock.embed.input_tokens"] == [4, 6]
+
+
+def test_create_sink():
+    assert isinstance(tracing.create_sink("emf"), tracing.EMFSink)
+    assert isinstance(tracing.create_sink("memory"), tracing.InMemorySink)
+    assert tracing.create_sink("none") is None
+    with pytest.raises(ValueError):
+        tracing.create_sink("xray")
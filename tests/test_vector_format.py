@@ -0,0 +1,65 @@
+# tests/test_vector_format.py
+
+import json
+
+import pytest
+
+from vector_format import (TITAN_V1_DIMENSION, VectorConfig, build_index_body, embedding_request_body, encode_vector,
+                           validate, vector_config_from_env)
+
+TITAN_V1 = "amazon.titan-embed-text-v1"
+TITAN_V2 = "amazon.titan-embed-text-v2:0"
+
+
+@pytest.mark.parametrize("config", [
+    VectorConfig(TITAN_V1, TITAN_V1_DIMENSION),
+    VectorConfig(TITAN_V1, TITAN_V1_DIMENSION, "fp16"),
+    VectorConfig(TITAN_V2, 256, "int8"),
+    VectorConfig(TITAN_V2, 1024, "fp16"),
+])
+def test_valid_configs(config):
+    validate(config)
+
+
+@pytest.mark.parametrize("config, message", [
+    (VectorConfig(TITAN_V1, 256), "1536"),
+    (VectorConfig(TITAN_V1, 1024), "EMBEDDING_DIMENSION=1024"),
+    (VectorConfig(TITAN_V2, 1536), "256"),
+    (VectorConfig(TITAN_V1, TITAN_V1_DIMENSION, "int8"), "int8"),
+    (VectorConfig(TITAN_V2, 256, "binary"), "binary"),
+])
+def test_invalid_configs_raise_value_error(config, message):
+    with pytest.raises(ValueError, match=message):
+        validate(config)
+
+
+def test_config_from_env_rejects_reduced_dimension_for_titan_v1(monkeypatch):
+    monkeypatch.delenv("BEDROCK_MODEL_ID", raising=False)
+    monkeypatch.setenv("EMBEDDING_DIMENSION", "256")
+
+    with pytest.raises(ValueError):
+        vector_config_from_env("BEDROCK_MODEL_ID")
+
+
+def test_request_body_sets_dimension_only_for_titan_v2():
+    assert json.loads(embedding_request_body(VectorConfig(TITAN_V1, 1536), "oil")) == {"inputText": "oil"}
+    assert json.loads(embedding_request_body(VectorConfig(TITAN_V2, 256), "oil")) == {
+        "inputText": "oil", "dimensions": 256, "normalize": True}
+
+
+def test_int8_encoding_scales_and_clamps():
+    config = VectorConfig(TITAN_V2, 256, "int8")
+
+    assert encode_vector(config, [1.0, -1.0, 0.5, 0.0, 1.2]) == [127, -127, 64, 0, 127]
+    assert encode_vector(VectorConfig(TITAN_V2, 256), [0.5]) == [0.5]
+
+
+@pytest.mark.parametrize("quantization, data_type, engine", [("none", None, "faiss"), ("fp16", None, "faiss"),
+                                                             ("int8", "byte", "lucene")])
+def test_index_mapping_matches_config(quantization, data_type, engine):
+    body = build_index_body(VectorConfig(TITAN_V2, 512, quantization))
+
+    embedding = body["mappings"]["properties"]["embedding"]
+    assert embedding["dimension"] == 512
+    assert embedding.get("data_type") == data_type
+    assert embedding["method"]["engine"] == engine
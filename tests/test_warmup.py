@@ -0,0 +1,32 @@
+# tests/test_warmup.py
+
+import pytest
+
+
+def _record_embedded(fake_pipeline, monkeypatch):
+    module = fake_pipeline.module
+    embedded = []
+    original = module._embed_query
+
+    def embed_query(text):
+        embedded.append(text)
+        return original(text)
+
+    monkeypatch.setattr(module, '_embed_query', embed_query)
+    return embedded
+
+
+@pytest.mark.parametrize("queries, expected", [
+    (["엔진 오일", " ", 3, "타이어 압력"], ["엔진 오일", "타이어 압력"]),
+    ("엔진 오일 점검", ["엔진 오일 점검"]),
+    ({"query": "엔진 오일"}, ["warmup"]),
+    (None, ["warmup"]),
+])
+def test_warm_up_embeds_each_query_once(fake_pipeline, monkeypatch, queries, expected):
+    embedded = _record_embedded(fake_pipeline, monkeypatch)
+
+    result = fake_pipeline.module.warm_up(queries)
+
+    assert embedded == expected
+    assert result["queries"] == len([text for text in expected if text != "warmup"])
+    assert "bedrock_embedding" not in result["errors"]